@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Define a PageArchive class allows spiders to keep every fetched response body
+in an append-only compressed archive for offline re-extraction.
+'''
+
+# 导入模块：
+import os
+import json
+import mmap
+import time
+import zlib
+import threading
+
+from settings import ARCHIVE_LEVEL, save_path
+
+
+# 类定义：
+class PageArchive(object):
+    # 文档字符串
+    '''
+    PageArchive class appends every response body as an independently zlib
+    compressed blob to `<name>.arc`, and its metadata (url, status, proxy,
+    fetch time, poi id, page kind, offset and length) as a json line to the
+    sidecar index `<name>.idx`.
+
+    A single page is read back by slicing a memory map of the archive at its
+    offset, so nothing else has to be decompressed.
+
+    :Usage:
+        archive = PageArchive()
+        spider = MafengwoSpider(archive=archive)
+        ...
+        html = archive.read(poi_id=1318, kind='resort')
+
+    '''
+
+    # 初始化方法
+    def __init__(self, archive_dir=None, name='pages', level=ARCHIVE_LEVEL):
+        # 文档字符串
+        '''
+        Initialize a new instance of the PageArchive, loads the sidecar index.
+
+        :Args:
+         - archive_dir : a str of directory holding the archive, defaults to
+           `archive` in `save_path`.
+         - name : a str of archive file name without extension.
+         - level : an int of zlib compression level.
+
+        '''
+        # 方法实现
+        if archive_dir is None:
+            archive_dir = os.path.join(save_path, 'archive')
+        if not os.path.exists(archive_dir):
+            os.makedirs(archive_dir)
+        self.data_path = os.path.join(archive_dir, name+'.arc')
+        self.index_path = os.path.join(archive_dir, name+'.idx')
+        self.level = level
+        self.lock = threading.Lock()
+        self.by_url = dict()
+        self.by_poi = dict()
+        self.view = None
+        self.data_file = None
+        self.index_file = None
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        self._register(json.loads(line))
+                    except ValueError:
+                        # 写入中断留下的残缺行直接跳过
+                        continue
+
+
+    # 页面归档方法
+    def append(self, url, body, status=None, proxy=None, poi_id=None,
+               kind=None, fetched_at=None):
+        # 文档字符串
+        '''
+        Appends a response body and its metadata into the archive.
+
+        :Args:
+         - url : a str of response's final url.
+         - body : bytes of response body.
+         - status : an int of HTTP status code.
+         - proxy : a str of proxy url the response came through.
+         - poi_id : an int of poi id the page belongs to.
+         - kind : a str of page kind, such as search, resort or location.
+         - fetched_at : a float of fetch timestamp, defaults to `time.time()`.
+
+        :Returns:
+         - a dict of the archived page's index entry.
+        '''
+        # 方法实现
+        blob = zlib.compress(body, self.level)
+        with self.lock:
+            if self.data_file is None:
+                self.data_file = open(self.data_path, 'ab')
+                self.index_file = open(self.index_path, 'a', encoding='utf-8')
+            self.data_file.seek(0, os.SEEK_END)
+            offset = self.data_file.tell()
+            self.data_file.write(blob)
+            self.data_file.flush()
+            entry = {
+                'url': url, 'status': status, 'proxy': proxy,
+                'poi_id': poi_id, 'kind': kind,
+                'fetched_at': time.time() if fetched_at is None else fetched_at,
+                'offset': offset, 'length': len(blob),
+            }
+            # 先写数据再写索引，中断时索引不会指向残缺数据
+            self.index_file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self.index_file.flush()
+            self._register(entry)
+        return entry
+
+
+    # 索引查询方法
+    def entries(self, url=None, poi_id=None, kind='resort'):
+        # 文档字符串
+        '''
+        Returns all index entries of given url, or of given poi id and page
+        kind, oldest first.
+        '''
+        # 方法实现
+        if url is not None:
+            return list(self.by_url.get(url, ()))
+        return list(self.by_poi.get((kind, poi_id), ()))
+
+
+    # 页面读取方法
+    def read(self, url=None, poi_id=None, kind='resort', entry=None):
+        # 文档字符串
+        '''
+        Reads the latest archived body of given url, or of given poi id and
+        page kind.
+
+        :Args:
+         - url : a str of page url.
+         - poi_id : an int of poi id.
+         - kind : a str of page kind, used together with `poi_id`.
+         - entry : an index entry to read instead of looking one up.
+
+        :Returns:
+         - bytes of the page body, or None if the page was never archived.
+        '''
+        # 方法实现
+        if entry is None:
+            found = self.entries(url, poi_id, kind)
+            if not found:
+                return None
+            entry = found[-1]
+        end = entry['offset'] + entry['length']
+        with self.lock:
+            if self.view is None or len(self.view) < end:
+                self._remap()
+            blob = self.view[entry['offset']:end]
+        return zlib.decompress(blob)
+
+
+    # 关闭方法
+    def close(self):
+        with self.lock:
+            for obj in (self.view, self.data_file, self.index_file):
+                if obj is not None:
+                    obj.close()
+            self.view = self.data_file = self.index_file = None
+
+
+    def _register(self, entry):
+        self.by_url.setdefault(entry['url'], list()).append(entry)
+        if entry.get('poi_id') is not None:
+            key = (entry.get('kind'), entry['poi_id'])
+            self.by_poi.setdefault(key, list()).append(entry)
+
+
+    def _remap(self):
+        # 归档文件追加后需要重新映射才能读到新数据
+        if self.view is not None:
+            self.view.close()
+        with open(self.data_path, 'rb') as file:
+            self.view = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
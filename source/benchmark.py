@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Benchmarks MafengwoSpider end to end against local stand-ins of the Mafengwo
+website and the IPProxyPool API, and reports throughput, latency percentiles,
+retries and peak RSS.
+'''
+
+# 导入模块：
+import os
+import re
+import json
+import time
+import sys
+import random
+import logging
+import argparse
+import resource
+import tempfile
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import fixtures
+from proxy import SpiderProxy
+from spider import MafengwoSpider
+from logger import setup_logging
+from metrics import registry as metrics
+
+
+# 全局变量：
+logger = logging.getLogger(__name__)
+
+
+# 类定义：
+class QuietServer(ThreadingHTTPServer):
+    # 文档字符串
+    '''
+    QuietServer class doesn't print the tracebacks of connections the client
+    dropped, such as the spider closing a ban page or abandoning a hedged
+    request, they are expected under injected faults. Other errors are still
+    reported.
+    '''
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super(QuietServer, self).handle_error(request, client_address)
+
+
+class MockSite(object):
+    # 文档字符串
+    '''
+    MockSite class serves synthetic search pages, resort pages and location
+    API responses. Every port it listens on acts as an HTTP proxy, requests
+    sent through it for Mafengwo urls are answered locally.
+
+    :Usage:
+        with MockSite(proxies=4, latency=0.05, ban_rate=0.01) as site:
+            print(site.proxy_urls)
+
+    '''
+
+    # 初始化方法
+    def __init__(self, proxies=4, latency=0.02, jitter=0.005, error_rate=0.0,
+                 ban_rate=0.0, seed=None):
+        # 文档字符串
+        '''
+        Initialize a new instance of the MockSite.
+
+        :Args:
+         - proxies : an int of ports to listen on, each one is a proxy.
+         - latency : mean seconds before a response is sent.
+         - jitter : standard deviation of latency in seconds.
+         - error_rate : a float of probability to answer with HTTP 503.
+         - ban_rate : a float of probability to answer with a captcha page.
+         - seed : an optional random seed of injected latencies and faults.
+
+        '''
+        # 方法实现
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.ban_rate = ban_rate
+        self.random = random.Random(seed)
+        self.counts = dict()
+        self.lock = threading.Lock()
+        self.servers = [self._start(self._handler()) for _ in range(proxies)]
+        self.proxy_urls = ['127.0.0.1:%s' % server.server_port for server in self.servers]
+
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+
+    # 响应生成方法
+    def respond(self, url):
+        # 文档字符串
+        '''
+        Chooses the response of an url with injected latency and faults.
+
+        :Returns:
+         - a tuple of (status, content type, body bytes).
+        '''
+        # 方法实现
+        parsed = urlparse(url)
+        query = parse_qs(parsed.query)
+        with self.lock:
+            delay = max(0.0, self.random.gauss(self.latency, self.jitter))
+            fault = self.random.random()
+        time.sleep(delay)
+        if fault < self.error_rate:
+            self.count('error')
+            return 503, 'text/html', b'Service Unavailable'
+        if fault < self.error_rate + self.ban_rate:
+            self.count('ban')
+            return 200, 'text/html', fixtures.BAN_PAGE.encode('utf-8')
+
+        match = re.match(r'/poi/(\d+)\.html$', parsed.path)
+        if parsed.path.endswith('/search/s.php'):
+            self.count('search')
+            page = int(query.get('p', ['1'])[0])
+            body = fixtures.render_search(page, query.get('q', ['海南'])[0])
+        elif match:
+            self.count('resort')
+            body = fixtures.render_resort(int(match[1]))
+        elif parsed.path.endswith('poiLocationApi'):
+            self.count('location')
+            poi_id = int(json.loads(query['params'][0])['poi_id'])
+            return 200, 'application/json', fixtures.render_location(poi_id).encode('utf-8')
+        else:
+            self.count('missing')
+            return 404, 'text/html', b'Not Found'
+        return 200, 'text/html', body.encode('utf-8')
+
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status, content_type, body = site.respond(self.path)
+                self.send_response(status)
+                self.send_header('Content-Type', content_type + '; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+    @staticmethod
+    def _start(handler):
+        server = QuietServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+    def close(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class MockProxyPool(MockSite):
+    # 文档字符串
+    '''
+    MockProxyPool class answers IPProxyPool API requests with the proxies of a
+    :class:`MockSite`, deleted proxies are handed out again on the next query.
+    '''
+
+    # 初始化方法
+    def __init__(self, site):
+        self.site = site
+        self.counts = dict()
+        self.lock = threading.Lock()
+        self.servers = [self._start(self._handler())]
+        self.api_url = 'http://127.0.0.1:%s/' % self.servers[0].server_port
+
+
+    def respond(self, url):
+        parsed = urlparse(url)
+        if parsed.path == '/delete':
+            self.count('delete')
+            body = {'deleteNum': 1}
+        else:
+            self.count('query')
+            count = int(parse_qs(parsed.query).get('count', ['20'])[0])
+            body = [[url.split(':')[0], int(url.split(':')[1]), 10]
+                    for url in self.site.proxy_urls[:count]]
+        return 200, 'application/json', json.dumps(body).encode('utf-8')
+
+
+# 函数定义：
+def benchmark(pages=2, proxies=4, latency=0.02, jitter=0.005, error_rate=0.0,
+              ban_rate=0.0, seed=None, hedge=True, sticky=False, area_name='海南'):
+    # 文档字符串
+    '''
+    Runs MafengwoSpider over `pages` mock search pages (15 resorts each)
+    inside a temporary working directory, so dumped data never replaces the
+    real one.
+
+    :Returns:
+     - a dict of benchmark report.
+    '''
+    # 方法实现
+    cwd, api_url = os.getcwd(), SpiderProxy.api_url
+    metrics.reset()
+    with MockSite(proxies, latency, jitter, error_rate, ban_rate, seed) as site, \
+            MockProxyPool(site) as pool, tempfile.TemporaryDirectory() as workdir:
+        SpiderProxy.api_url = pool.api_url
+        os.chdir(workdir)
+        spider = None
+        try:
+            spider = MafengwoSpider(area_name)
+            spider.hedge_requests = hedge
+            spider.sticky = sticky
+            start = time.perf_counter()
+            error = None
+            try:
+                spider.run(1, pages)
+            except ValueError as e:
+                error = str(e)
+            elapsed = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+            SpiderProxy.api_url = api_url
+            if spider and spider.hedge_pool:
+                spider.hedge_pool.shutdown(wait=False)
+
+    fetched = metrics.total('fetch_total', result='ok')
+    p50, p99 = (metrics.quantile('fetch_seconds', q) for q in (0.5, 0.99))
+    return {
+        'elapsed': round(elapsed, 3),
+        'resorts': len(spider.data),
+        'expected': pages * 15,
+        'pages': fetched,
+        'pages_per_sec': round(fetched / elapsed, 2) if elapsed else None,
+        'p50_ms': round(p50 * 1000, 1) if p50 is not None else None,
+        'p99_ms': round(p99 * 1000, 1) if p99 is not None else None,
+        'failed_fetches': metrics.total('fetch_total') - fetched,
+        'retries': metrics.total('retries_total'),
+        'injected': dict(site.counts),
+        'proxy_api': dict(pool.counts),
+        # Linux下ru_maxrss的单位是KB
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'error': error,
+    }
+
+
+# 测试代码：
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pages', type=int, default=2)
+    parser.add_argument('--proxies', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--jitter', type=float, default=0.005)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--ban-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--no-hedge', dest='hedge', action='store_false')
+    parser.add_argument('--sticky', action='store_true')
+    parser.add_argument('--log-level', default='WARNING')
+    parser.add_argument('--output', default=None, help='also write the report as JSON')
+    args = parser.parse_args()
+
+    setup_logging(args.log_level)
+    report = benchmark(args.pages, args.proxies, args.latency, args.jitter,
+                       args.error_rate, args.ban_rate, args.seed,
+                       args.hedge, args.sticky)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
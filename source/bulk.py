@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Turns a crawled resorts dataset into node and relationship CSV files for the
+Neo4j offline bulk importer (`neo4j-admin import`), the fast path to build the
+knowledge graph of :meth:`MafengwoSaver.graph_builder` from scratch.
+'''
+
+# 导入模块：
+import os
+import csv
+import logging
+import argparse
+
+from export import READ_FORMATS, read_records
+from record import Resort, LOCATE_FIELDS
+from settings import save_path, file_name
+
+
+# 全局变量：
+logger = logging.getLogger(__name__)
+# 各属性在导入文件表头中的类型，未列出的均为字符串
+PROPERTY_TYPES = {'poi_id': 'int', 'areaId': 'int', 'lat': 'float', 'lng': 'float'}
+RESORT_FIELDS = Resort.FIELDS
+
+
+# 函数定义：
+def header(fields, id_field, id_space):
+    columns = list()
+    for field in fields:
+        if field == id_field:
+            columns.append(f'{field}:ID({id_space})')
+        elif field in PROPERTY_TYPES:
+            columns.append(f'{field}:{PROPERTY_TYPES[field]}')
+        else:
+            columns.append(field)
+    return columns + [':LABEL']
+
+
+def build_import_files(name=file_name, fmt='json', out_dir=None):
+    # 文档字符串
+    '''
+    Streams a dumped dataset into three import files: `locate.csv` of locate
+    nodes deduplicated by `areaId`, `resort.csv` of resort nodes deduplicated
+    by `poi_id`, and `isLocateOf.csv` of the edges between them.
+
+    :Args:
+     - name : a str of data file name without extension.
+     - fmt : a str of data file format, see :func:`read_records`.
+     - out_dir : a str of directory to write files into, defaults to
+       `neo4j-import` in `save_path`.
+
+    :Returns:
+     - a str of the `neo4j-admin import` command loading the files into an
+       empty database (Neo4j 4.x syntax, Neo4j 5 uses
+       `neo4j-admin database import full` with the same options).
+    '''
+    # 方法实现
+    if fmt not in READ_FORMATS:
+        raise RuntimeError('数据格式指定有误，请输入json、jsonl、jsonl.gz或者snap')
+    out_dir = out_dir or os.path.join(save_path, 'neo4j-import')
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    paths = {key: os.path.join(out_dir, key+'.csv')
+             for key in ('locate', 'resort', 'isLocateOf')}
+
+    areas, resorts, edges = set(), set(), 0
+    with open(paths['locate'], 'w', encoding='utf-8', newline='') as locate_file, \
+            open(paths['resort'], 'w', encoding='utf-8', newline='') as resort_file, \
+            open(paths['isLocateOf'], 'w', encoding='utf-8', newline='') as edge_file:
+        locates, resort_rows, edge_rows = (csv.writer(f) for f in
+                                           (locate_file, resort_file, edge_file))
+        locates.writerow(header(LOCATE_FIELDS, 'areaId', 'locate'))
+        resort_rows.writerow(header(RESORT_FIELDS, 'poi_id', 'resort'))
+        edge_rows.writerow([':START_ID(locate)', ':END_ID(resort)', ':TYPE'])
+
+        for item in read_records(os.path.join(save_path, name+'.'+fmt), fmt):
+            if item.get('poi_id') is None or item.get('areaId') is None:
+                logger.warning('>>> skipping record without poi_id or areaId: %s',
+                               item.get('resortName'))
+                continue
+            if item['poi_id'] in resorts:
+                continue
+            resorts.add(item['poi_id'])
+            resort_rows.writerow([item.get(key) for key in RESORT_FIELDS] + ['resort'])
+            if item['areaId'] not in areas:
+                areas.add(item['areaId'])
+                locates.writerow([item.get(key) for key in LOCATE_FIELDS] + ['locate'])
+            edge_rows.writerow([item['areaId'], item['poi_id'], 'isLocateOf'])
+            edges += 1
+
+    logger.info('>>> import files: %s locates, %s resorts, %s edges.',
+                len(areas), len(resorts), edges)
+    # 介绍等字段含有换行，需要开启multiline-fields
+    command = ['neo4j-admin import', '--database=neo4j', '--id-type=INTEGER',
+               '--multiline-fields=true',
+               f"--nodes={paths['locate']}", f"--nodes={paths['resort']}",
+               f"--relationships={paths['isLocateOf']}"]
+    # spatial.build_nearby生成的邻近关系文件一并导入
+    nearby = os.path.join(out_dir, 'nearby.csv')
+    if os.path.exists(nearby):
+        command.append(f'--relationships={nearby}')
+    return ' '.join(command)
+
+
+# 测试代码：
+if __name__ == '__main__':
+    from logger import setup_logging
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--name', default=file_name)
+    parser.add_argument('--fmt', default='json')
+    parser.add_argument('--out-dir', default=None)
+    args = parser.parse_args()
+    setup_logging()
+    print(build_import_files(args.name, args.fmt, args.out_dir))
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Defines persistent local caches keyed by poi_id, which let spiders avoid
+refetching data crawled recently.
+'''
+
+# 导入模块：
+import os
+import math
+import time
+import sqlite3
+
+from settings import FRESH_WINDOW, LOCATION_TTL, RECRAWL_BUDGET, PRIOR_INTERVAL, \
+    save_path
+
+
+# 类定义：
+
+# sqlite缓存基类
+class SqliteCache(object):
+    # 文档字符串
+    '''
+    SqliteCache class is the base of poi_id keyed caches persisted in a local
+    sqlite file and preloaded into memory.
+
+    Subclasses define `TABLE_SQL`, `SELECT_SQL` and `DEFAULT_FILE`.
+    '''
+    # 类静态成员定义
+    TABLE_SQL = None
+    SELECT_SQL = None
+    DEFAULT_FILE = None
+    # 初始化方法
+    def __init__(self, db_path=None):
+        # 文档字符串
+        '''
+        Initialize a new instance of the SqliteCache, loads all entries into
+        memory.
+
+        :Args:
+         - db_path : a str of sqlite file path, defaults to `DEFAULT_FILE` in
+           `save_path`.
+
+        '''
+        # 方法实现
+        if db_path is None:
+            if not os.path.exists(save_path):
+                os.makedirs(save_path)
+            db_path = os.path.join(save_path, self.DEFAULT_FILE)
+        self.connector = sqlite3.connect(db_path, check_same_thread=False)
+        self.connector.execute(self.TABLE_SQL)
+        self.connector.commit()
+        self.entries = {row[0]: tuple(row[1:])
+                        for row in self.connector.execute(self.SELECT_SQL)}
+
+
+    # 持久化方法
+    def persist(self, sql, row):
+        self.connector.execute(sql, row)
+        self.connector.commit()
+
+
+    # 关闭方法
+    def close(self):
+        self.connector.close()
+
+
+# 新鲜度索引类
+class FreshnessIndex(SqliteCache):
+    # 文档字符串
+    '''
+    FreshnessIndex class keeps the last fetch time and content hash of every
+    crawled poi, so spiders can skip or deprioritize resorts crawled within a
+    given time window.
+
+    It also keeps every poi's change history, how many refetches found its
+    content changed, to estimate its change rate. Pois are recrawled in the
+    order of their probability of having changed since their last fetch, and
+    at most `budget` crawled pois are refetched per run.
+
+    :Usage:
+        index = FreshnessIndex(window=24*3600, budget=200)
+        spider = MafengwoSpider(freshness=index)
+
+    '''
+    # 类静态成员定义
+    TABLE_SQL = '''CREATE TABLE IF NOT EXISTS freshness(
+        poi_id     INTEGER PRIMARY KEY,
+        fetched_at REAL NOT NULL,
+        hash       TEXT
+        )'''
+    SELECT_SQL = 'SELECT poi_id, fetched_at, hash FROM freshness'
+    DEFAULT_FILE = 'freshness.db'
+    # 变化历史单独建表，兼容旧的索引文件
+    HISTORY_SQL = '''CREATE TABLE IF NOT EXISTS history(
+        poi_id     INTEGER PRIMARY KEY,
+        first_at   REAL NOT NULL,
+        checks     INTEGER NOT NULL,
+        changes    INTEGER NOT NULL
+        )'''
+    # 初始化方法
+    def __init__(self, db_path=None, window=FRESH_WINDOW, budget=RECRAWL_BUDGET,
+                 prior=PRIOR_INTERVAL):
+        # 文档字符串
+        '''
+        Initialize a new instance of the FreshnessIndex.
+
+        :Args:
+         - db_path : a str of sqlite file path, defaults to `freshness.db` in
+           `save_path`.
+         - window : seconds during which a crawled poi is considered fresh.
+         - budget : an int of crawled pois refetched per run at most, None
+           means no limit. Never crawled pois don't count.
+         - prior : seconds between two changes assumed for a poi without
+           history, it weighs as one observed change.
+
+        '''
+        # 方法实现
+        super(FreshnessIndex, self).__init__(db_path)
+        self.window = window
+        self.budget = budget
+        self.prior = prior
+        self.connector.execute(self.HISTORY_SQL)
+        self.connector.commit()
+        self.history = {row[0]: tuple(row[1:]) for row in self.connector.execute(
+            'SELECT poi_id, first_at, checks, changes FROM history')}
+
+
+    # 查询方法
+    def get(self, poi_id):
+        # 文档字符串
+        '''
+        Returns a tuple of (fetched_at, hash) of given poi, or None if the poi
+        has never been crawled.
+        '''
+        # 方法实现
+        return self.entries.get(poi_id)
+
+
+    # 新鲜度判断方法
+    def is_fresh(self, poi_id, now=None):
+        # 文档字符串
+        '''
+        Checks whether given poi was crawled within the freshness window.
+
+        :Args:
+         - poi_id : an int of poi id.
+         - now : a float of current timestamp, defaults to `time.time()`.
+
+        :Returns:
+         - a bool of whether the poi is fresh.
+        '''
+        # 方法实现
+        entry = self.entries.get(poi_id)
+        if entry is None or not self.window:
+            return False
+        now = time.time() if now is None else now
+        return now - entry[0] < self.window
+
+
+    # 更新方法
+    def update(self, poi_id, hash_, fetched_at=None):
+        # 文档字符串
+        '''
+        Records a fetch of given poi.
+
+        :Args:
+         - poi_id : an int of poi id.
+         - hash_ : a str of fetched record's content hash.
+         - fetched_at : a float of fetch timestamp, defaults to `time.time()`.
+
+        :Returns:
+         - a bool of whether the content hash changed since the last fetch.
+        '''
+        # 方法实现
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        old = self.entries.get(poi_id)
+        changed = old is None or old[1] != hash_
+        if old is not None:
+            # 没有历史记录的旧条目，以上次爬取时间作为观察起点
+            first_at, checks, changes = self.history.get(poi_id, (old[0], 0, 0))
+            self.history[poi_id] = (first_at, checks + 1, changes + changed)
+        else:
+            self.history[poi_id] = (fetched_at, 0, 0)
+        self.entries[poi_id] = (fetched_at, hash_)
+        self.persist('INSERT OR REPLACE INTO freshness(poi_id, fetched_at, hash) '
+                     'VALUES (?, ?, ?)', (poi_id, fetched_at, hash_))
+        self.persist('INSERT OR REPLACE INTO history(poi_id, first_at, checks, changes) '
+                     'VALUES (?, ?, ?, ?)', (poi_id,) + self.history[poi_id])
+        return changed
+
+
+    # 变化率估计方法
+    def change_rate(self, poi_id):
+        # 文档字符串
+        '''
+        Estimates given poi's changes per second, as its observed changes over
+        its observed time, both smoothed by one change per `prior` seconds.
+        '''
+        # 方法实现
+        entry, history = self.entries.get(poi_id), self.history.get(poi_id)
+        if entry is None or history is None:
+            return 1 / self.prior
+        observed = max(entry[0] - history[0], 0)
+        return (history[2] + 1) / (observed + self.prior)
+
+
+    # 变化概率估计方法
+    def change_probability(self, poi_id, now=None):
+        # 文档字符串
+        '''
+        Estimates the probability that given poi changed since its last fetch,
+        modelling changes as a Poisson process of its change rate.
+
+        :Returns:
+         - a float between 0 and 1, 1 if the poi has never been crawled.
+        '''
+        # 方法实现
+        entry = self.entries.get(poi_id)
+        if entry is None:
+            return 1.0
+        now = time.time() if now is None else now
+        return 1 - math.exp(-self.change_rate(poi_id) * max(now - entry[0], 0))
+
+
+    # 排序方法
+    def order(self, links, key, now=None):
+        # 文档字符串
+        '''
+        Orders links so that never crawled pois come first, then the ones
+        most likely changed since their last fetch.
+
+        :Args:
+         - links : a list of links.
+         - key : a function mapping a link to its poi id.
+         - now : a float of current timestamp, defaults to `time.time()`.
+
+        :Returns:
+         - a new list of ordered links.
+        '''
+        # 方法实现
+        now = time.time() if now is None else now
+        def staleness(link):
+            poi_id = key(link)
+            if poi_id not in self.entries:
+                return (0, 0)
+            return (1, -self.change_probability(poi_id, now))
+        return sorted(links, key=staleness)
+
+
+# 景点坐标缓存类
+class LocationCache(SqliteCache):
+    # 文档字符串
+    '''
+    LocationCache class keeps every poi's coordinates fetched from location
+    API, entries older than `ttl` seconds are revalidated by fetching again.
+
+    :Usage:
+        locations = LocationCache(ttl=30*24*3600)
+        spider = MafengwoSpider(locations=locations)
+
+    '''
+    # 类静态成员定义
+    TABLE_SQL = '''CREATE TABLE IF NOT EXISTS location(
+        poi_id     INTEGER PRIMARY KEY,
+        lat        REAL,
+        lng        REAL,
+        fetched_at REAL NOT NULL
+        )'''
+    SELECT_SQL = 'SELECT poi_id, lat, lng, fetched_at FROM location'
+    DEFAULT_FILE = 'location.db'
+    # 初始化方法
+    def __init__(self, db_path=None, ttl=LOCATION_TTL):
+        # 文档字符串
+        '''
+        Initialize a new instance of the LocationCache.
+
+        :Args:
+         - db_path : a str of sqlite file path, defaults to `location.db` in
+           `save_path`.
+         - ttl : seconds before a cached coordinate needs revalidation, None
+           means cached coordinates never expire.
+
+        '''
+        # 方法实现
+        super(LocationCache, self).__init__(db_path)
+        self.ttl = ttl
+
+
+    # 查询方法
+    def get(self, poi_id, now=None):
+        # 文档字符串
+        '''
+        Returns a tuple of (lat, lng) of given poi, or None if the poi is not
+        cached or its entry expired.
+        '''
+        # 方法实现
+        entry = self.entries.get(poi_id)
+        if entry is None:
+            return None
+        now = time.time() if now is None else now
+        if self.ttl is not None and now - entry[2] >= self.ttl:
+            return None
+        return entry[0], entry[1]
+
+
+    # 更新方法
+    def update(self, poi_id, lat, lng, fetched_at=None):
+        # 文档字符串
+        '''
+        Caches given poi's coordinates.
+
+        :Args:
+         - poi_id : an int of poi id.
+         - lat : a float of latitude.
+         - lng : a float of longitude.
+         - fetched_at : a float of fetch timestamp, defaults to `time.time()`.
+        '''
+        # 方法实现
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        self.entries[poi_id] = (lat, lng, fetched_at)
+        self.persist('INSERT OR REPLACE INTO location(poi_id, lat, lng, fetched_at) '
+                     'VALUES (?, ?, ?, ?)', (poi_id, lat, lng, fetched_at))
@@ -10,17 +10,26 @@ from different website.
 
 
 # 导入模块：
-import json
 import os
-import pymysql
-
-from pymongo import MongoClient
-from py2neo import Node, Relationship, Graph
-from settings import NEO_CONF, MONGO_CONF, SQL_CONF, \
+import re
+import uuid
+import logging
+import itertools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from pool import ConnectionPool
+from record import Resort, content_hash, LOCATE_FIELDS
+from metrics import registry as metrics
+from profiling import Profiler, profiled
+from export import READ_FORMATS, read_records, batched, prefetch
+from settings import NEO_CONF, MONGO_CONF, SQL_CONF, SAVE_BATCH_SIZE, \
+                     SAVER_POOL_SIZE, SAVER_WORKERS, NEARBY_K, NEARBY_RADIUS, \
                      save_path, table_name, collection
 
 
 # 全局变量：
+logger = logging.getLogger(__name__)
 RESORT_SQL = '''CREATE TABLE IF NOT EXISTS {0}(
     poi_id INTEGER NOT NULL,
     resortName VARCHAR(60),
@@ -38,7 +47,13 @@ RESORT_SQL = '''CREATE TABLE IF NOT EXISTS {0}(
     item_time  VARCHAR(128),
     payAbstracts TEXT,
     source     VARCHAR(30),
-    timeStamp  VARCHAR(30)
+    timeStamp  VARCHAR(30),
+    contentHash CHAR(40)
+    );'''
+# 每个数据表最近一次写入的版本号
+META_SQL = '''CREATE TABLE IF NOT EXISTS meta(
+    name VARCHAR(64) NOT NULL PRIMARY KEY,
+    loadVersion CHAR(32)
     );'''
 
 
@@ -50,91 +65,486 @@ class BaseSaver(object):
     '''
     BaseSaver class allows users to save all infos data fetched from website.
 
+    MySQL connections come from a :class:`ConnectionPool`, MongoDB and Neo4j
+    drivers pool their connections themselves. Batches of `data_save` are
+    written by `workers` concurrent writer threads.
+
     :Usage:
+        with MafengwoSaver('mysql', workers=4) as saver:
+            saver.data_save('HainanResorts')
 
     '''
     # 数据存储器的静态成员定义
     SAVE_MODES = ('mongodb', 'neo4j', 'mysql')
+    # 可供查询的字段
+    READ_FIELDS = ('poi_id', 'areaId', 'resortName')
     # 初始化方法：
-    def __init__(self, save_mode="neo4j"):
+    def __init__(self, save_mode="neo4j", profiler=None,
+                 pool_size=SAVER_POOL_SIZE, workers=SAVER_WORKERS):
         # 文档字符串
         '''
         Initialize an instance of BaseSaver.
 
         :Args:
          - save_mode : a str of database to save data in.
+         - profiler : an optional :class:`Profiler`, defaults to one enabled
+           by the `PROFILE` setting.
+         - pool_size : an int of maximum database connections.
+         - workers : an int of concurrent writer threads, 1 writes in the
+           calling thread.
 
         '''
         # 方法实现
         if save_mode not in self.SAVE_MODES:
             raise RuntimeError('存储模式指定有误，请输入mongodb、neo4j或者mysql')
         self.save_mode = save_mode
+        self.profiler = profiler or Profiler()
+        self.closed = False
+        self.pool = None
+        # 并发写入线程，待完成的写入数量有上限，防止读取远快于写入时堆积
+        self.workers = workers
+        self.executor = None
+        self.pending = list()
+        self.slots = threading.BoundedSemaphore(max(workers, 1) * 2)
+        self.error = None
+        self.seen_lock = threading.Lock()
+        # 数据版本号，每次写入后递增，供读缓存判断是否失效
+        self.versions = itertools.count(1)
+        self.version = 0
+        # 增量同步写入的景点，以及邻近关系指向被删除景点的景点，供重建邻近关系
+        self.synced = set()
+        self.nearby_stale = set()
+        # 只导入所选存储模式的数据库驱动，未使用的驱动不必安装
         if self.save_mode == 'mongodb':
             # mongodb initialize
-            print('>>>> we are in mongodb.')
-            self.connector = MongoClient(**MONGO_CONF)[MONGO_CONF.get('authSource')]
+            from pymongo import MongoClient
+            logger.info('>>>> we are in mongodb.')
+            self.client = MongoClient(**{'maxPoolSize': pool_size, **MONGO_CONF})
+            self.connector = self.client[MONGO_CONF.get('authSource')]
         elif self.save_mode == 'neo4j':
             # neo4j initialize
-            print('>>>> we are in neo4j.')
+            from py2neo import Graph
+            logger.info('>>>> we are in neo4j.')
             self.connector = Graph(**NEO_CONF)
+            self.graph_schema()
         else:
             # mysql initialize
-            print('>>>> we are in mysql.')
-            self.connector = pymysql.connect(**SQL_CONF)
-            self.cursor = self.connector.cursor()
-            sql = RESORT_SQL.format(table_name)
-            print(sql)
-            self.cursor.execute(sql)
-            self.connector.commit()
+            import pymysql
+            logger.info('>>>> we are in mysql.')
+            # 连接默认不自动提交，归还时回滚以结束事务，读取才能看到其他进程的写入
+            self.pool = ConnectionPool(lambda: pymysql.connect(**SQL_CONF), pool_size,
+                                       reset=lambda conn: conn.rollback())
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                sql = RESORT_SQL.format(table_name)
+                logger.debug(sql)
+                cursor.execute(sql)
+                # 兼容旧表结构，补充内容哈希字段
+                cursor.execute(f"SHOW COLUMNS FROM {table_name} LIKE 'contentHash'")
+                if not cursor.fetchone():
+                    cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN contentHash CHAR(40)")
+                cursor.execute(META_SQL)
+                conn.commit()
 
 
     # 数据存储方法：
-    def data_save(self, file_name):
+    def data_save(self, file_name, delta=False, fmt='json',
+                  batch_size=SAVE_BATCH_SIZE):
         # 文档字符串
         '''
         Saves spider fetched data into different databases.
-        Wipes out the old data and saves the new fetched ones.
+        Wipes out the old data and saves the new fetched ones, or only writes
+        the changed records if `delta` is True.
+
+        The data file is parsed incrementally in a background thread and
+        records are written in batches while parsing continues, so memory use
+        doesn't grow with the file size.
 
         :Args:
          - file_name : a str of file name to fetch data from.
+         - delta : a bool of whether to write only inserts, updates and
+           tombstones by comparing records' content hashes.
+         - fmt : a str of data file format, `json`, `jsonl`, `jsonl.gz` or
+           `snap`.
+         - batch_size : an int of records written per batch.
 
         '''
         # 方法实现
-        # 此处可以拓展成任意文件类型，其他文件类型的数据转换成json再写即可
-        file_path = os.path.join(save_path, file_name+'.json')
+        if fmt not in READ_FORMATS:
+            raise RuntimeError('数据格式指定有误，请输入json、jsonl、jsonl.gz或者snap')
+        file_path = os.path.join(save_path, file_name+'.'+fmt)
         if not os.access(file_path, os.F_OK):
             raise RuntimeError(f'数据文件{file_path}不存在，请检查数据！')
-        with open(file_path, 'r', encoding='utf-8') as file:
-            self.json_data = json.load(file, encoding='utf-8')
+        batches = prefetch(batched(read_records(file_path, fmt), batch_size))
+
+        try:
+            if delta:
+                # 存量哈希只查询一次，各批次共享已见集合，最后统一删除缺失的记录
+                stored, seen = self.stored_hashes(), set()
+                for batch in batches:
+                    self.submit(self.data_sync, batch, False, stored, seen)
+                results = self.drain()
+                tombstones = [p for p in stored if p not in seen]
+                self.data_delete(tombstones)
+                logger.info('>>> delta saved: %s inserts, %s updates, %s tombstones.',
+                            sum(r[0] for r in results), sum(r[1] for r in results),
+                            len(tombstones))
+                self.refresh_nearby()
+            else:
+                # 删除原始数据，一定要小心使用
+                self.data_clean()
+                # 保存新数据
+                for batch in batches:
+                    self.submit(self.data_write, batch)
+                self.drain()
+        finally:
+            # 写入失败时取消剩余的写入并停止读取线程，存储器之后还能继续使用
+            self.abort()
+            batches.close()
+        # 写入过程中缓存的查询结果可能不完整，全部写完后再更新一次版本
+        self.touch()
+        self.profiler.dump()
+
+
+    # 并发写入方法：
+    def submit(self, func, *args):
+        # 文档字符串
+        '''
+        Runs a write, such as :meth:`data_write` of a batch, on a writer
+        thread. Blocks while too many writes are pending, and raises the error
+        of an earlier failed write.
+
+        :Returns:
+         - a :class:`Future` of the write's result.
+        '''
+        # 方法实现
+        if self.error:
+            raise self.error
+        if self.workers <= 1:
+            future = Future()
+            future.set_result(func(*args))
+            return future
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix='saver')
+        self.slots.acquire()
+        future = self.executor.submit(func, *args)
+        future.add_done_callback(self._write_done)
+        self.pending.append(future)
+        return future
+
+
+    def _write_done(self, future):
+        self.slots.release()
+        if not future.cancelled() and future.exception() and not self.error:
+            self.error = future.exception()
+
+
+    def drain(self):
+        # 文档字符串
+        '''
+        Waits for all pending writes.
 
+        :Returns:
+         - a list of the writes' results in submission order.
+        '''
+        # 方法实现
+        pending, self.pending = self.pending, list()
+        try:
+            return [future.result() for future in pending]
+        finally:
+            self.error = None
+
+
+    def abort(self):
+        # 文档字符串
+        '''
+        Cancels the pending writes which haven't started, waits for the
+        running ones and forgets the error of a failed write, so the saver
+        can be used again after a failed load.
+        '''
+        # 方法实现
+        pending, self.pending = self.pending, list()
+        for future in pending:
+            future.cancel()
+        wait(pending)
+        self.error = None
+
+
+    # 数据清除方法：
+    def data_clean(self):
+        # 文档字符串
+        '''
+        Wipes out all the old data saved in the database.
+        '''
+        # 方法实现
         if self.save_mode == 'mongodb':
-            print('>>> we are saving to mongodb.')
-            # 删除原始数据
+            logger.info('>>> we are cleaning mongodb.')
             self.connector.drop_collection(collection)
-            # 保存新数据
-            self.connector[collection].insert_many(self.json_data)
         elif self.save_mode == 'neo4j':
-            print('>>> we are saving to neo4j.')
-            # 删除原始数据, 一定要小心使用
+            logger.info('>>> we are cleaning neo4j.')
             self.graph_cleaner()
-            # 保存新数据
-            self.graph_builder()
         else:
-            print('>>> we are saving to mysql.')
-            # 删除原始数据，一定要小心使用
-            self.cursor.execute(f"DELETE FROM {table_name}")
-            # 准备sql语句
-            data_key = self.json_data[0].keys()
-            sql_key = ','.join(data_key)
-            sql_value = ', '.join([f'%({key})s' for key in data_key])
-            # 保存新数据
-            sql = '''
-            INSERT INTO {0}({1})
-            VALUES ({2});
-            '''.format(table_name, sql_key, sql_value)
-            print(sql)
-            self.cursor.executemany(sql, self.json_data)
-            self.connector.commit()
+            logger.info('>>> we are cleaning mysql.')
+            with self.pool.connection() as conn:
+                conn.cursor().execute(f"DELETE FROM {table_name}")
+                conn.commit()
+        self.touch()
+
+
+    # 数据写入方法：
+    def data_write(self, data):
+        # 文档字符串
+        '''
+        Appends a batch of records into the database without touching the data
+        already saved.
+
+        :Args:
+         - data : a list of dict formatted records.
+
+        '''
+        # 方法实现
+        if not data:
+            return
+        with metrics.timer('stage_seconds', stage='save', backend=self.save_mode):
+            if self.save_mode == 'mongodb':
+                logger.info('>>> we are saving to mongodb.')
+                # insert_many会往记录中写入_id，这里传入副本以免污染调用方数据
+                self.connector[collection].insert_many([dict(d) for d in data])
+            elif self.save_mode == 'neo4j':
+                logger.info('>>> we are saving to neo4j.')
+                self.graph_builder(data)
+            else:
+                logger.info('>>> we are saving to mysql.')
+                # 准备sql语句，表结构固定，记录的额外字段不写入
+                data_key = [key for key in data[0].keys() if key in Resort.FIELDS]
+                sql_key = ','.join(data_key)
+                sql_value = ', '.join([f'%({key})s' for key in data_key])
+                sql = '''
+                INSERT INTO {0}({1})
+                VALUES ({2});
+                '''.format(table_name, sql_key, sql_value)
+                logger.debug(sql)
+                with self.pool.connection() as conn, self.profiler.stage('executemany'):
+                    conn.cursor().executemany(sql, data)
+                    conn.commit()
+        metrics.inc('records_saved_total', len(data), backend=self.save_mode)
+        self.touch()
+
+
+    # 增量数据同步方法：
+    def data_sync(self, data, tombstone=True, stored=None, seen=None):
+        # 文档字符串
+        '''
+        Compares records' content hashes against the stored ones and writes
+        only the new and changed records into the database.
+
+        :Args:
+         - data : a list of dict formatted records.
+         - tombstone : a bool of whether to delete stored records missing
+           from `data`, only makes sense when `data` is a full dataset.
+         - stored : an optional dict of stored content hashes, queried from
+           the database if not given.
+         - seen : an optional set of poi ids already synced, shared between
+           the batches of one dataset; records seen before are skipped and
+           the poi ids of `data` are added to it.
+
+        :Returns:
+         - a tuple of inserted, updated and deleted records number.
+        '''
+        # 方法实现
+        if stored is None:
+            stored = self.stored_hashes()
+        if seen is None:
+            seen = set()
+        inserts, updates = list(), list()
+        for item in data:
+            # 多个写入线程共享同一个已见集合
+            with self.seen_lock:
+                if item['poi_id'] in seen:
+                    continue
+                seen.add(item['poi_id'])
+            if not item.get('contentHash'):
+                item['contentHash'] = content_hash(item)
+            old_hash = stored.get(item['poi_id'])
+            if item['poi_id'] not in stored:
+                inserts.append(item)
+            elif old_hash != item['contentHash']:
+                updates.append(item)
+        tombstones = [p for p in stored if p not in seen] if tombstone else []
+        logger.info('>>> delta: %s inserts, %s updates, %s tombstones.',
+                    len(inserts), len(updates), len(tombstones))
+
+        # 更新的记录先删除再插入
+        self.data_delete([item['poi_id'] for item in updates] + tombstones)
+        self.data_write(inserts + updates)
+        with self.seen_lock:
+            self.synced.update(item['poi_id'] for item in inserts + updates)
+        return len(inserts), len(updates), len(tombstones)
+
+
+    # 邻近关系更新方法：
+    def refresh_nearby(self):
+        # 文档字符串
+        '''
+        Recomputes the nearby relationships invalidated by the delta syncs
+        since the last refresh, only Neo4j stores them. Called once a delta
+        load is finished, rather than per batch.
+        '''
+        # 方法实现
+        with self.seen_lock:
+            poi_ids, self.synced = self.synced, set()
+        if self.save_mode == 'neo4j':
+            self.graph_refresh(poi_ids)
+
+
+    # 内容哈希查询方法：
+    def stored_hashes(self):
+        # 文档字符串
+        '''
+        Loads the content hashes of the records saved in the database.
+
+        :Returns:
+         - a dict mapping poi_id to its stored content hash.
+        '''
+        # 方法实现
+        if self.save_mode == 'mongodb':
+            cursor = self.connector[collection].find(
+                {}, {'poi_id': 1, 'contentHash': 1, '_id': 0})
+            return {doc['poi_id']: doc.get('contentHash') for doc in cursor}
+        elif self.save_mode == 'neo4j':
+            return self.graph_hashes()
+        else:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT poi_id, contentHash FROM {table_name}")
+                return dict(cursor.fetchall())
+
+
+    # 数据删除方法：
+    def data_delete(self, poi_ids):
+        # 文档字符串
+        '''
+        Deletes the records of given poi ids from the database.
+
+        :Args:
+         - poi_ids : a list of int poi ids.
+        '''
+        # 方法实现
+        if not poi_ids:
+            return
+        if self.save_mode == 'mongodb':
+            self.connector[collection].delete_many({'poi_id': {'$in': poi_ids}})
+        elif self.save_mode == 'neo4j':
+            self.graph_deleter(poi_ids)
+        else:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                for i in range(0, len(poi_ids), 500):
+                    chunk = poi_ids[i:i+500]
+                    holders = ', '.join(['%s'] * len(chunk))
+                    cursor.execute(
+                        f"DELETE FROM {table_name} WHERE poi_id IN ({holders})", chunk)
+                conn.commit()
+        self.touch()
+
+
+    # 数据版本更新方法：
+    def touch(self):
+        # 文档字符串
+        '''
+        Marks the saved data as changed: bumps the in-process version and
+        writes a new load version into the database, so the read caches of
+        other processes notice the change as well.
+        '''
+        # 方法实现
+        self.version = next(self.versions)
+        load_version = uuid.uuid4().hex
+        if self.save_mode == 'mongodb':
+            self.connector['meta'].update_one({'_id': collection},
+                                              {'$set': {'loadVersion': load_version}},
+                                              upsert=True)
+        elif self.save_mode == 'neo4j':
+            self.graph_stamp(load_version)
+        else:
+            with self.pool.connection() as conn:
+                conn.cursor().execute("INSERT INTO meta(name, loadVersion) VALUES (%s, %s) "
+                                      "ON DUPLICATE KEY UPDATE loadVersion = VALUES(loadVersion)",
+                                      (table_name, load_version))
+                conn.commit()
+
+
+    # 数据版本查询方法：
+    def load_version(self):
+        # 文档字符串
+        '''
+        Reads the load version written by the last :meth:`touch` of any
+        process.
+
+        :Returns:
+         - a str of load version, or None if the data was never written.
+        '''
+        # 方法实现
+        if self.save_mode == 'mongodb':
+            doc = self.connector['meta'].find_one({'_id': collection})
+            return doc.get('loadVersion') if doc else None
+        elif self.save_mode == 'neo4j':
+            return self.graph_version()
+        else:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT loadVersion FROM meta WHERE name = %s", (table_name,))
+                row = cursor.fetchone()
+                return row[0] if row else None
+
+
+    # 数据查询方法：
+    def data_read(self, field, value, prefix=False):
+        # 文档字符串
+        '''
+        Reads the records whose `field` equals `value` from the database.
+
+        :Args:
+         - field : a str of field name, one of `READ_FIELDS`.
+         - value : the value to match.
+         - prefix : matches the records whose `field` starts with the str
+           `value` if True.
+
+        :Returns:
+         - a list of dict formatted records.
+        '''
+        # 方法实现
+        if field not in self.READ_FIELDS:
+            raise RuntimeError('查询字段指定有误，请输入poi_id、areaId或者resortName')
+        if self.save_mode == 'mongodb':
+            query = {'$regex': '^' + re.escape(value)} if prefix else value
+            return list(self.connector[collection].find({field: query}, {'_id': 0}))
+        elif self.save_mode == 'neo4j':
+            return self.graph_reader(field, value, prefix)
+        else:
+            if prefix:
+                # 转义LIKE通配符
+                value = re.sub(r'([\\%_])', r'\\\1', value) + '%'
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT * FROM {table_name} WHERE {field} "
+                               f"{'LIKE' if prefix else '='} %s", (value,))
+                columns = [column[0] for column in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+    # 知识图谱约束方法：
+    def graph_schema(self):
+        pass
+
+
+    # 知识图谱版本写入方法：
+    def graph_stamp(self, load_version):
+        pass
+
+
+    # 知识图谱版本查询方法：
+    def graph_version(self):
+        return None
 
 
     # 知识图谱删除方法：
@@ -142,25 +552,83 @@ class BaseSaver(object):
         pass
 
 
+    # 知识图谱哈希查询方法：
+    def graph_hashes(self):
+        return dict()
+
+
+    # 知识图谱局部删除方法：
+    def graph_deleter(self, poi_ids):
+        pass
+
+
     # 知识图谱生成方法：
-    def graph_builder(self):
+    def graph_builder(self, data):
         pass
 
 
+    # 邻近关系生成方法：
+    def graph_nearby(self, edges, batch_size=SAVE_BATCH_SIZE, sources=None):
+        pass
+
+
+    # 邻近关系局部更新方法：
+    def graph_refresh(self, poi_ids):
+        pass
+
+
+    # 知识图谱查询方法：
+    def graph_reader(self, field, value, prefix=False):
+        return list()
+
+
+    # 数据存储器关闭方法：
+    def close(self):
+        # 文档字符串
+        '''
+        Waits for pending writes, stops the writer threads and closes the
+        database connections. Closing twice does nothing.
+        '''
+        # 方法实现
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.drain()
+        finally:
+            if self.executor:
+                self.executor.shutdown()
+            logger.info('>>>> closing %s.', self.save_mode)
+            if self.save_mode == 'mongodb':
+                self.client.close()
+            elif self.save_mode == 'mysql':
+                self.pool.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
     # 数据存储器退出方法：
     def __del__(self):
         # 文档字符串
         '''
         The deconstructor of BaseSaver class.
 
-        Deconstructs an instance of BaseSaver, closes Databases.
+        Closes the saver if it wasn't closed explicitly, prefer closing with
+        :meth:`close` or a with statement since it runs at an unknown time.
         '''
         # 方法实现
-        print(f'>>>> closing {self.save_mode}.')
-        if self.save_mode == 'mongodb':
-            self.connector.client.close()
-        elif self.save_mode == 'mysql':
-            self.connector.close()
+        if getattr(self, 'closed', True):
+            return
+        try:
+            self.close()
+        except Exception as e:
+            logger.error('>>>> closing %s failed: %s', self.save_mode, e)
 
 
 # 马蜂窝数据存储器子类：
@@ -177,6 +645,30 @@ class MafengwoSaver(BaseSaver):
     '''
     # 数据存储器静态成员定义
 
+    # 知识图谱约束方法
+    def graph_schema(self):
+        # 文档字符串
+        '''
+        Makes areaId unique among locate nodes, so concurrent writers merge
+        into a single locate node per area.
+        '''
+        # 方法实现
+        self.connector.run("create constraint locate_areaId if not exists "
+                           "for (n:locate) require n.areaId is unique")
+
+
+    # 知识图谱版本写入方法
+    def graph_stamp(self, load_version):
+        self.connector.run("merge (v:meta {name: $name}) set v.loadVersion = $version",
+                           name=collection, version=load_version)
+
+
+    # 知识图谱版本查询方法
+    def graph_version(self):
+        return self.connector.run("match (v:meta {name: $name}) return v.loadVersion",
+                                  name=collection).evaluate()
+
+
     # 知识图谱删除方法
     def graph_cleaner(self):
         # 文档字符串
@@ -184,36 +676,158 @@ class MafengwoSaver(BaseSaver):
         Breaks down knowledge graph of mafengwo resorts data in Graph Database
         Neo4j.
 
-        Detachs isLocateOf relationship, then deletes locate nodes and resort
-        nodes.
+        Detachs isLocateOf and nearby relationships, then deletes locate nodes
+        and resort nodes.
+        '''
+        self.connector.run("match (n) where n:locate or n:resort detach delete n")
+
+
+    # 知识图谱哈希查询方法
+    def graph_hashes(self):
+        # 文档字符串
+        '''
+        Loads the content hashes of resort nodes in Graph Database Neo4j.
+
+        :Returns:
+         - a dict mapping poi_id to its stored content hash.
+        '''
+        # 方法实现
+        cursor = self.connector.run("match (m:resort) "
+                                    "return m.poi_id as poi_id, m.contentHash as hash")
+        return {row['poi_id']: row['hash'] for row in cursor}
+
+
+    # 知识图谱查询方法
+    def graph_reader(self, field, value, prefix=False):
+        # 文档字符串
         '''
-        self.connector.run("match (n:locate)-[]->(m:resort) detach delete n, m")
+        Reads the properties of resort nodes matching a field in Graph
+        Database Neo4j, see :meth:`BaseSaver.data_read`.
+
+        :Returns:
+         - a list of dict formatted records.
+        '''
+        # 方法实现
+        condition = 'starts with' if prefix else '='
+        cursor = self.connector.run(f"match (m:resort) where m.{field} {condition} $value "
+                                    "return properties(m) as m", value=value)
+        return [dict(row['m']) for row in cursor]
+
+
+    # 知识图谱局部删除方法
+    def graph_deleter(self, poi_ids):
+        # 文档字符串
+        '''
+        Deletes the resort nodes of given poi ids in Graph Database Neo4j,
+        and their locate nodes once no other resort is located in them.
+
+        :Args:
+         - poi_ids : a list of int poi ids.
+        '''
+        # 方法实现
+        cursor = self.connector.run("match (n:locate)-[:isLocateOf]->(m:resort) "
+                                    "where m.poi_id in $ids return distinct n.areaId as areaId",
+                                    ids=poi_ids)
+        areas = [row['areaId'] for row in cursor]
+        # 邻近关系指向被删除景点的景点，稍后由graph_refresh重建
+        cursor = self.connector.run("match (a:resort)-[:nearby]->(m:resort) "
+                                    "where m.poi_id in $ids return distinct a.poi_id as poi_id",
+                                    ids=poi_ids)
+        stale = [row['poi_id'] for row in cursor]
+        with self.seen_lock:
+            self.nearby_stale.update(stale)
+        self.connector.run("match (m:resort) where m.poi_id in $ids detach delete m",
+                           ids=poi_ids)
+        self.connector.run("match (n:locate) where n.areaId in $areas "
+                           "and not (n)-[:isLocateOf]->() delete n", areas=areas)
 
 
     # 知识图谱生成方法
-    def graph_builder(self):
+    @profiled('graph_builder')
+    def graph_builder(self, data):
         # 文档字符串
         '''
         Builds a knowledge graph of mafengwo resorts data in Graph Database Neo4j.
 
-        Creates locate nodes and resort nodes, then creates isLocateOf relationship
-        between them.
+        Merges one locate node per areaId, the graph model of
+        :func:`bulk.build_import_files`, creates resort nodes, then creates
+        isLocateOf relationship between them.
+
+        :Args:
+         - data : a list of dict formatted resorts' info data.
         '''
         # 方法实现
-        for info in self.json_data:
-            print('>> saving:', info)
-            areaInfo = {
-                'address': info['address'], 'areaId': info['areaId'],
-                'areaName': info['areaName'], 'lat': info['lat'],
-                'lng': info['lng'], 'source': info['source'],
-                'timeStamp': info['timeStamp']
-            }
-            areaNode = Node("locate", **areaInfo)
+        from py2neo import Node, Relationship
+        for info in data:
+            logger.debug('>> saving: %s', info['poi_id'])
+            areaNode = Node("locate", **{key: info.get(key) for key in LOCATE_FIELDS})
+            self.connector.merge(areaNode, "locate", "areaId")
             resortNode = Node("resort", **info)
-            self.connector.create(areaNode | resortNode)
+            self.connector.create(resortNode)
             self.connector.merge(Relationship(areaNode, 'isLocateOf', resortNode))
 
 
+    # 邻近关系生成方法
+    @profiled('graph_nearby')
+    def graph_nearby(self, edges, batch_size=SAVE_BATCH_SIZE, sources=None):
+        # 文档字符串
+        '''
+        Replaces the nearby relationships between resort nodes in Graph
+        Database Neo4j, merging them in batches of `batch_size`.
+
+        :Args:
+         - edges : a list of (poi id, neighbor poi id, distance in km) tuples,
+           see :func:`spatial.build_nearby`.
+         - sources : an optional list of poi ids, only their outgoing nearby
+           relationships are replaced if given, otherwise all of them.
+        '''
+        # 方法实现
+        if sources is None:
+            self.connector.run("match (:resort)-[r:nearby]->(:resort) delete r")
+        else:
+            self.connector.run("match (a:resort)-[r:nearby]->(:resort) "
+                               "where a.poi_id in $ids delete r", ids=sources)
+        for i in range(0, len(edges), batch_size):
+            rows = [{'start': a, 'end': b, 'distance': round(d, 3)}
+                    for a, b, d in edges[i:i+batch_size]]
+            self.connector.run("unwind $rows as row "
+                               "match (a:resort {poi_id: row.start}), "
+                               "(b:resort {poi_id: row.end}) "
+                               "merge (a)-[r:nearby]->(b) set r.distance = row.distance",
+                               rows=rows)
+
+
+    # 邻近关系局部更新方法
+    def graph_refresh(self, poi_ids):
+        # 文档字符串
+        '''
+        Recomputes the nearby relationships a delta sync invalidated in Graph
+        Database Neo4j: those of the written resorts, of resorts whose
+        neighbors were deleted, and of resorts that now have a written resort
+        as neighbor. Does nothing if the graph has no nearby relationships.
+
+        :Args:
+         - poi_ids : a set of poi ids inserted or updated by the sync.
+        '''
+        # 方法实现
+        from spatial import SpatialIndex
+        with self.seen_lock:
+            stale, self.nearby_stale = self.nearby_stale, set()
+        if not poi_ids and not stale:
+            return
+        if not stale and not self.connector.run(
+                "match (:resort)-[r:nearby]->(:resort) return count(r) > 0").evaluate():
+            return
+        cursor = self.connector.run("match (m:resort) where m.lat is not null and m.lng is not null "
+                                    "return m.poi_id as poi_id, m.lat as lat, m.lng as lng")
+        index = SpatialIndex.from_records(row.data() for row in cursor)
+        edges = list(index.neighbors(NEARBY_K, NEARBY_RADIUS))
+        sources = set(poi_ids) | stale | {a for a, b, _ in edges if b in poi_ids}
+        edges = [edge for edge in edges if edge[0] in sources]
+        self.graph_nearby(edges, sources=list(sources))
+        logger.info('>>> nearby relationships of %s resorts refreshed.', len(sources))
+
+
 
 
 # class DataSaver(object):
@@ -337,5 +951,7 @@ class MafengwoSaver(BaseSaver):
 
 # 测试代码：
 if __name__ == '__main__':
-    saver = MafengwoSaver('mysql')
-    saver.data_save('HainanResorts')
+    from logger import setup_logging
+    setup_logging()
+    with MafengwoSaver('mysql') as saver:
+        saver.data_save('HainanResorts')
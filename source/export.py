@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Defines record writers of the export formats spiders dump their data in:
+compressed JSON lines, CSV/TSV, a compact binary snapshot and the columnar
+Parquet and Arrow IPC formats. Every writer takes records one by one and
+writes them in row groups, so a crawl can export while it runs.
+
+Also defines incremental readers of the formats savers load data from.
+'''
+
+# 导入模块：
+import csv
+import gzip
+import json
+import pickle
+import threading
+from queue import Queue, Full
+
+from settings import EXPORT_ROW_GROUP
+
+
+# 全局变量：
+# 列式格式中的类型化字段，其余字段均为字符串
+COLUMN_TYPES = {'poi_id': 'int64', 'areaId': 'int64',
+                'lat': 'float64', 'lng': 'float64'}
+FORMATS = ('jsonl.gz', 'csv', 'tsv', 'snap', 'parquet', 'arrow')
+# 可以增量读取的格式
+READ_FORMATS = ('json', 'jsonl', 'jsonl.gz', 'snap')
+SNAPSHOT_MAGIC = b'MFWSNAP1'
+READ_CHUNK = 1 << 16
+
+
+# 类定义：
+class RecordWriter(object):
+    # 文档字符串
+    '''
+    RecordWriter base class buffers written records and hands them to
+    `write_group` every `row_group` records.
+
+    :Usage:
+        with open_writer('parquet', path, Resort.FIELDS) as writer:
+            for item in data:
+                writer.write(item)
+
+    '''
+
+    # 初始化方法
+    def __init__(self, path, fields, row_group=EXPORT_ROW_GROUP):
+        # 文档字符串
+        '''
+        Initialize a new instance of the RecordWriter.
+
+        :Args:
+         - path : a str of output file path.
+         - fields : a sequence of field names, the columns in order.
+         - row_group : an int of records per written group.
+
+        '''
+        # 方法实现
+        self.path = path
+        self.fields = list(fields)
+        self.row_group = row_group
+        self.rows = list()
+        self.written = 0
+
+
+    def write(self, item):
+        self.rows.append(item)
+        if len(self.rows) >= self.row_group:
+            self.flush()
+
+
+    def flush(self):
+        if self.rows:
+            rows, self.rows = self.rows, list()
+            self.write_group(rows)
+            self.written += len(rows)
+
+
+    def write_group(self, rows):
+        raise NotImplementedError
+
+
+    def close(self):
+        self.flush()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class JsonlWriter(RecordWriter):
+    # 文档字符串
+    '''
+    JsonlWriter class writes one JSON record per line into a gzip file.
+    '''
+
+    def __init__(self, path, fields, row_group=EXPORT_ROW_GROUP):
+        super(JsonlWriter, self).__init__(path, fields, row_group)
+        self.file = gzip.open(path, 'wt', encoding='utf-8')
+
+
+    def write_group(self, rows):
+        self.file.write(''.join(json.dumps({key: row.get(key) for key in self.fields},
+                                           ensure_ascii=False) + '\n'
+                                for row in rows))
+
+
+    def close(self):
+        super(JsonlWriter, self).close()
+        self.file.close()
+
+
+class CsvWriter(RecordWriter):
+    # 文档字符串
+    '''
+    CsvWriter class writes records as CSV with a header line, or TSV if
+    `delimiter` is a tab. Missing values are written as empty fields.
+    '''
+
+    def __init__(self, path, fields, row_group=EXPORT_ROW_GROUP, delimiter=','):
+        super(CsvWriter, self).__init__(path, fields, row_group)
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.file, delimiter=delimiter)
+        self.writer.writerow(self.fields)
+
+
+    def write_group(self, rows):
+        self.writer.writerows([row.get(key) for key in self.fields] for row in rows)
+        self.file.flush()
+
+
+    def close(self):
+        super(CsvWriter, self).close()
+        self.file.close()
+
+
+class SnapshotWriter(RecordWriter):
+    # 文档字符串
+    '''
+    SnapshotWriter class writes a compact binary snapshot: a magic header, the
+    pickled field names, then every row group pickled as a list of value
+    tuples. Only load snapshots written by yourself.
+    '''
+
+    def __init__(self, path, fields, row_group=EXPORT_ROW_GROUP):
+        super(SnapshotWriter, self).__init__(path, fields, row_group)
+        self.file = open(path, 'wb')
+        self.file.write(SNAPSHOT_MAGIC)
+        pickle.dump(tuple(self.fields), self.file, pickle.HIGHEST_PROTOCOL)
+
+
+    def write_group(self, rows):
+        pickle.dump([tuple(row.get(key) for key in self.fields) for row in rows],
+                    self.file, pickle.HIGHEST_PROTOCOL)
+        self.file.flush()
+
+
+    def close(self):
+        super(SnapshotWriter, self).close()
+        self.file.close()
+
+
+class ArrowWriter(RecordWriter):
+    # 文档字符串
+    '''
+    ArrowWriter class writes records as Parquet row groups, or as Arrow IPC
+    record batches if `fmt` is `arrow`. `poi_id`, `areaId`, `lat` and `lng`
+    are typed columns, the others are strings.
+
+    Requires the optional `pyarrow` package.
+    '''
+
+    def __init__(self, path, fields, row_group=EXPORT_ROW_GROUP, fmt='parquet'):
+        super(ArrowWriter, self).__init__(path, fields, row_group)
+        try:
+            import pyarrow
+        except ImportError:
+            raise RuntimeError('导出parquet或者arrow格式需要安装pyarrow')
+        self.pa = pyarrow
+        self.schema = pyarrow.schema([(key, COLUMN_TYPES.get(key, 'string'))
+                                      for key in self.fields])
+        if fmt == 'parquet':
+            import pyarrow.parquet
+            self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        else:
+            import pyarrow.ipc
+            self.writer = pyarrow.ipc.new_file(path, self.schema)
+
+
+    def write_group(self, rows):
+        columns = list()
+        for field in self.schema:
+            values = [row.get(field.name) for row in rows]
+            if field.name in COLUMN_TYPES:
+                cast = int if COLUMN_TYPES[field.name] == 'int64' else float
+                values = [None if v in (None, '') else cast(v) for v in values]
+            else:
+                values = [None if v is None else str(v) for v in values]
+            columns.append(self.pa.array(values, type=field.type))
+        self.writer.write_table(self.pa.Table.from_arrays(columns, schema=self.schema))
+
+
+    def close(self):
+        super(ArrowWriter, self).close()
+        self.writer.close()
+
+
+# 函数定义：
+def open_writer(save_mode, path, fields, row_group=EXPORT_ROW_GROUP):
+    # 文档字符串
+    '''
+    Opens the record writer of an export format.
+
+    :Args:
+     - save_mode : a str of format, one of `FORMATS`.
+     - path : a str of output file path.
+     - fields : a sequence of field names.
+     - row_group : an int of records per written group.
+
+    :Returns:
+     - a :class:`RecordWriter`.
+    '''
+    # 方法实现
+    if save_mode == 'jsonl.gz':
+        return JsonlWriter(path, fields, row_group)
+    if save_mode in ('csv', 'tsv'):
+        return CsvWriter(path, fields, row_group, '\t' if save_mode == 'tsv' else ',')
+    if save_mode == 'snap':
+        return SnapshotWriter(path, fields, row_group)
+    if save_mode in ('parquet', 'arrow'):
+        return ArrowWriter(path, fields, row_group, save_mode)
+    raise RuntimeError('导出格式指定有误，请输入jsonl.gz、csv、tsv、snap、parquet或者arrow')
+
+
+def iter_json_array(file, chunk_size=READ_CHUNK):
+    # 文档字符串
+    '''
+    Parses a JSON array of records incrementally, reading `chunk_size`
+    characters at a time, so memory use doesn't grow with the file size.
+
+    :Args:
+     - file : a text file object positioned at the array.
+     - chunk_size : an int of characters read at a time.
+
+    :Returns:
+     - a generator of parsed records.
+    '''
+    # 方法实现
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+
+    def skip():
+        # 跳过空白字符，必要时继续读入，返回当前字符
+        nonlocal buffer, pos, eof
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if eof:
+                raise ValueError('JSON数组不完整')
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+
+    if skip() != '[':
+        raise ValueError('数据文件不是JSON数组')
+    pos += 1
+    first = True
+    while True:
+        char = skip()
+        if char == ']':
+            return
+        if not first:
+            if char != ',':
+                raise ValueError(f'JSON数组格式有误：{char!r}')
+            pos += 1
+            skip()
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # 记录跨越了缓冲区末尾，读入更多内容后重试
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            if not first:
+                # 逗号已经跳过，重试时不再要求逗号
+                first = True
+            continue
+        first = False
+        pos = end
+        yield item
+
+
+def read_records(path, fmt):
+    # 文档字符串
+    '''
+    Reads records of a data file one by one without loading the whole file.
+
+    :Args:
+     - path : a str of data file path.
+     - fmt : a str of file format, one of `READ_FORMATS`.
+
+    :Returns:
+     - a generator of dict formatted records.
+    '''
+    # 方法实现
+    if fmt == 'json':
+        with open(path, 'r', encoding='utf-8') as file:
+            yield from iter_json_array(file)
+    elif fmt in ('jsonl', 'jsonl.gz'):
+        opener = gzip.open if fmt == 'jsonl.gz' else open
+        with opener(path, 'rt', encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+    elif fmt == 'snap':
+        with open(path, 'rb') as file:
+            if file.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                raise ValueError(f'{path}不是数据快照文件')
+            fields = pickle.load(file)
+            while True:
+                try:
+                    rows = pickle.load(file)
+                except EOFError:
+                    return
+                for row in rows:
+                    yield dict(zip(fields, row))
+    else:
+        raise RuntimeError('数据格式指定有误，请输入json、jsonl、jsonl.gz或者snap')
+
+
+def batched(records, size):
+    batch = list()
+    for item in records:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = list()
+    if batch:
+        yield batch
+
+
+def prefetch(iterable, depth=2):
+    # 文档字符串
+    '''
+    Consumes an iterable in a background thread, keeping up to `depth` items
+    ready, so producing the next items overlaps with using the current one.
+    Exceptions of the iterable are raised in the consumer.
+
+    :Returns:
+     - a generator of the iterable's items.
+    '''
+    # 方法实现
+    queue, stopped, done = Queue(depth), threading.Event(), object()
+
+    def put(value):
+        while not stopped.is_set():
+            try:
+                queue.put(value, timeout=0.1)
+                return
+            except Full:
+                continue
+
+    def produce():
+        try:
+            for item in iterable:
+                if stopped.is_set():
+                    return
+                put((item, None))
+        except Exception as e:
+            put((done, e))
+            return
+        put((done, None))
+
+    threading.Thread(target=produce, name='prefetch', daemon=True).start()
+    try:
+        while True:
+            item, error = queue.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stopped.set()
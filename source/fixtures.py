@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Renders synthetic Mafengwo pages, shaped like the live search pages, resort
+pages and location API responses, for offline benchmarks, and builds the
+fixture corpus parsers are measured on.
+'''
+
+# 导入模块：
+import os
+import sys
+import json
+import random
+
+
+# 全局变量：
+AREAS = ((10030, '三亚'), (10031, '海口'), (12937, '万宁'), (14357, '陵水'))
+BAN_PAGE = ('<html><head><title>访问过于频繁</title></head><body>'
+            '<form action="/captcha" method="post"><img src="/captcha/image">'
+            '<p>访问过于频繁，请输入验证码后继续访问</p></form></body></html>')
+
+SEARCH_TEMPLATE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{area} - 马蜂窝搜索</title></head>
+<body><div class="wrapper"><div class="s-nav">搜索结果</div>
+<div class="att-list"><ul>
+{items}
+</ul></div>
+<div class="m-pagination"><span class="pg-current">{page}</span></div>
+</div></body></html>'''
+
+SEARCH_ITEM = '''<li><div class="clearfix">
+<div class="flt1"><a href="{link}" target="_blank"><img src="//images.mafengwo.net/{poi_id}.jpg" alt=""></a></div>
+<div class="ct-text"><h3><a href="{link}" target="_blank">{kind} - {name}</a></h3>
+<ul><li>地址：<a>{area}{name}</a></li><li>点评（{reviews}）</li></ul></div>
+</div></li>'''
+
+RESORT_TEMPLATE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{name} - 马蜂窝</title></head>
+<body>
+<div class="row row-top"><div class="wrapper">
+<div class="crumb"><div class="item"><div class="drop"><span class="hd">
+<a href="http://www.mafengwo.cn/travel-scenic-spot/mafengwo/{area_id}.html">{area}</a>
+</span></div></div></div>
+<div class="title"><h1>{name}</h1></div>
+</div></div>
+<div data-anchor="overview">
+{detail}
+<div class="mod mod-location">
+<div class="mhd">景点位置</div>
+<div class="mbd"><div data-api="/poi/pagelet/poiLocationApi" data-params='{{"poi_id":"{poi_id}"}}'></div>
+<p class="sub">{address}</p></div>
+</div>
+<div class="mod mod-reviews"><ul>{reviews}</ul></div>
+</div>
+</body></html>'''
+
+DETAIL_TEMPLATE = '''<div class="mod mod-detail">
+<div class="summary">{introduction}</div>
+{baseinfo}
+<dl><dt>交通</dt><dd>{trans}</dd></dl>
+<dl><dt>门票</dt><dd><div>{tickets}</div></dd></dl>
+<dl><dt>开放时间</dt><dd>{open}</dd></dl>
+</div>'''
+
+BASEINFO_TEMPLATE = '''<ul class="baseinfo clearfix">
+<li class="tel"><div class="label">电话</div><div class="content">{tel}</div></li>
+<li class="item-site"><div class="label">网址</div><div class="content"><a>{site}</a></div></li>
+<li class="item-time"><div class="label">用时参考</div><div class="content">{hours}</div></li>
+</ul>'''
+
+
+# 函数定义：
+def resort_link(poi_id):
+    return f'http://www.mafengwo.cn/poi/{poi_id}.html'
+
+
+def render_search(page, area='海南', size=15, base_poi=1000):
+    # 文档字符串
+    '''
+    Renders a search result page listing `size` resorts, whose poi ids are
+    numbered from `base_poi` on by page.
+
+    :Returns:
+     - a str of page HTML.
+    '''
+    # 方法实现
+    items = list()
+    for i in range(size):
+        poi_id = base_poi + (page - 1) * size + i
+        items.append(SEARCH_ITEM.format(link=resort_link(poi_id), poi_id=poi_id,
+                                        kind='景点', name=f'景点{poi_id}',
+                                        area=area, reviews=poi_id % 997))
+    return SEARCH_TEMPLATE.format(area=area, page=page, items='\n'.join(items))
+
+
+def render_resort(poi_id, detail=True, baseinfo=True):
+    # 文档字符串
+    '''
+    Renders a resort page, its text lengths vary with the poi id like the live
+    pages do.
+
+    :Args:
+     - poi_id : an int of resort's poi id.
+     - detail : a bool of whether the page has a `mod-detail` block, small
+       resorts' pages come without one.
+     - baseinfo : a bool of whether `mod-detail` has a baseinfo list.
+
+    :Returns:
+     - a str of page HTML.
+    '''
+    # 方法实现
+    rand = random.Random(poi_id)
+    area_id, area = AREAS[poi_id % len(AREAS)]
+    name = f'景点{poi_id}'
+    reviews = ''.join(f'<li class="rev-item"><p class="rev-txt">{"不错的景点，值得一去。" * rand.randint(1, 8)}</p></li>'
+                      for _ in range(rand.randint(5, 15)))
+    info = BASEINFO_TEMPLATE.format(
+        tel='0898-' + str(rand.randint(10000000, 99999999)),
+        site=f'http://www.example.com/{poi_id}',
+        hours=f'{rand.randint(1, 5)}小时')
+    block = DETAIL_TEMPLATE.format(
+        introduction=f'{name}位于{area}，' + '沙滩细软，海水清澈，是热门的度假胜地。' * rand.randint(2, 30),
+        baseinfo=info if baseinfo else '',
+        trans='可乘坐公交车或出租车前往。' * rand.randint(1, 10),
+        tickets=f'成人票{rand.randint(0, 300)}元，儿童半价。',
+        open='08:00-18:00')
+    return RESORT_TEMPLATE.format(
+        name=name, poi_id=poi_id, area_id=area_id, area=area,
+        detail=block if detail else '',
+        address=f'海南省{area}市{name}路{rand.randint(1, 999)}号',
+        reviews=reviews)
+
+
+def render_location(poi_id):
+    # 文档字符串
+    '''
+    Renders a poiLocationApi response of given resort.
+
+    :Returns:
+     - a str of JSON.
+    '''
+    # 方法实现
+    rand = random.Random(poi_id)
+    poi = {'id': poi_id, 'lat': round(18 + rand.random() * 2, 6),
+           'lng': round(108.6 + rand.random() * 2.4, 6)}
+    return json.dumps({'data': {'controller_data': {'poi': poi}, 'html': ''}})
+
+
+def corpus(poi_id=1318):
+    # 文档字符串
+    '''
+    Builds the fixture corpus of every page shape the parsers meet.
+
+    :Returns:
+     - a dict mapping fixture name to page HTML.
+    '''
+    # 方法实现
+    return {
+        'search': render_search(1),
+        'resort': render_resort(poi_id),
+        'resort_no_detail': render_resort(poi_id, detail=False),
+        'resort_no_baseinfo': render_resort(poi_id, baseinfo=False),
+        'ban': BAN_PAGE,
+    }
+
+
+# 测试代码：
+if __name__ == '__main__':
+    # python fixtures.py <dir>，把语料写成html文件便于查看
+    folder = sys.argv[1] if len(sys.argv) > 1 else 'fixtures'
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    for name, html in corpus().items():
+        with open(os.path.join(folder, name+'.html'), 'w', encoding='utf-8') as file:
+            file.write(html)
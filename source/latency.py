@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Define a LatencyTracker class which keeps every proxy's observed latencies and
+derives adaptive request timeouts and hedging delays from their percentiles.
+'''
+
+# 导入模块：
+import threading
+from collections import deque
+
+from settings import TIMEOUT, LATENCY_WINDOW, LATENCY_MIN_SAMPLES, \
+                     TIMEOUT_MARGIN, TIMEOUT_FLOOR
+
+
+# 类定义：
+class LatencyTracker(object):
+    # 文档字符串
+    '''
+    LatencyTracker class records two latencies of every successful request:
+    `head`, the time until response headers arrived (connect plus time to
+    first byte), and `total`, the time until the whole body was read.
+
+    Samples are kept per key (a proxy url) in a sliding window and also under
+    the global key `ALL`.
+
+    :Usage:
+        tracker = LatencyTracker()
+        tracker.record(proxy_url, head, total)
+        timeout = tracker.timeout(proxy_url)
+
+    '''
+    # 类静态成员定义
+    ALL = '*'
+    # 初始化方法
+    def __init__(self, window=LATENCY_WINDOW, min_samples=LATENCY_MIN_SAMPLES,
+                 margin=TIMEOUT_MARGIN, floor=TIMEOUT_FLOOR):
+        # 文档字符串
+        '''
+        Initialize a new instance of the LatencyTracker.
+
+        :Args:
+         - window : an int of samples kept per key.
+         - min_samples : an int of samples needed before percentiles are used.
+         - margin : a number percentiles are multiplied by to get timeouts.
+         - floor : seconds a derived timeout never goes below.
+
+        '''
+        # 方法实现
+        self.window = window
+        self.min_samples = min_samples
+        self.margin = margin
+        self.floor = floor
+        self.samples = dict()
+        self.lock = threading.Lock()
+
+
+    # 采样记录方法
+    def record(self, key, head, total):
+        # 文档字符串
+        '''
+        Records a successful request's latencies in seconds.
+        '''
+        # 方法实现
+        with self.lock:
+            for k in (key, self.ALL):
+                if k not in self.samples:
+                    self.samples[k] = {'head': deque(maxlen=self.window),
+                                       'total': deque(maxlen=self.window)}
+                self.samples[k]['head'].append(head)
+                self.samples[k]['total'].append(total)
+
+
+    # 分位数计算方法
+    def percentile(self, key, kind, q):
+        # 文档字符串
+        '''
+        Computes the q-th percentile of a key's `head` or `total` latencies.
+
+        :Returns:
+         - a float of seconds, or None if there are not enough samples.
+        '''
+        # 方法实现
+        with self.lock:
+            values = sorted(self.samples.get(key, {}).get(kind, ()))
+        if len(values) < self.min_samples:
+            return None
+        index = min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))
+        return values[index]
+
+
+    # 超时计算方法
+    def timeout(self, key, ceiling=TIMEOUT, q=95):
+        # 文档字符串
+        '''
+        Derives a (connect, read) timeout tuple for requests through `key`
+        from its latency percentiles, falling back to the global ones and then
+        to `ceiling`. Derived timeouts are clamped into [floor, ceiling].
+
+        :Args:
+         - key : a str of proxy url.
+         - ceiling : a tuple of (connect, read) timeout upper bounds.
+         - q : a number of percentile to derive timeouts from.
+
+        :Returns:
+         - a tuple of (connect, read) timeouts in seconds.
+        '''
+        # 方法实现
+        if not isinstance(ceiling, (tuple, list)):
+            ceiling = (ceiling, ceiling)
+        result = list()
+        for kind, limit in zip(('head', 'total'), ceiling):
+            value = self.percentile(key, kind, q)
+            if value is None:
+                value = self.percentile(self.ALL, kind, q)
+            if value is None:
+                result.append(limit)
+            else:
+                result.append(min(limit, max(self.floor, value * self.margin)))
+        return tuple(result)
+
+
+    # 对冲延迟方法
+    def hedge_delay(self, q=95):
+        # 文档字符串
+        '''
+        Returns the global q-th percentile of total latency, after which a
+        hedged request is sent, or None if there are not enough samples.
+        '''
+        # 方法实现
+        return self.percentile(self.ALL, 'total', q)
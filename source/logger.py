@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Configures leveled and rate limited logging for the spiders and savers.
+'''
+
+# 导入模块：
+import time
+import logging
+import threading
+
+from settings import LOG_LEVEL, LOG_RATE, LOG_PERIOD
+
+
+# 类定义：
+class RateLimitFilter(logging.Filter):
+    # 文档字符串
+    '''
+    RateLimitFilter class lets at most `rate` records of the same message
+    template through every `period` seconds, and reports how many records were
+    dropped when the next period starts. Warnings and errors are never dropped.
+    '''
+
+    # 初始化方法
+    def __init__(self, rate=LOG_RATE, period=LOG_PERIOD):
+        super(RateLimitFilter, self).__init__()
+        self.rate = rate
+        self.period = period
+        self.windows = dict()
+        self.lock = threading.Lock()
+
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self.lock:
+            start, count, dropped = self.windows.get(key, (now, 0, 0))
+            if now - start >= self.period:
+                if dropped:
+                    record.msg = f'{record.msg} [{dropped} similar records suppressed]'
+                start, count, dropped = now, 0, 0
+            if count >= self.rate:
+                self.windows[key] = (start, count, dropped + 1)
+                return False
+            self.windows[key] = (start, count + 1, dropped)
+        return True
+
+
+# 函数定义：
+def setup_logging(level=LOG_LEVEL, rate=LOG_RATE, period=LOG_PERIOD):
+    # 文档字符串
+    '''
+    Sends log records of all modules to stderr at given level, through a
+    :class:`RateLimitFilter`.
+
+    :Args:
+     - level : a str or int of logging level.
+     - rate : an int of records allowed per message template and period.
+     - period : seconds of a rate limiting period.
+    '''
+    # 方法实现
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(
+        '%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    handler.addFilter(RateLimitFilter(rate, period))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Defines a Metrics registry of counters, gauges and latency histograms, which
+can be exposed as Prometheus text format through a local HTTP endpoint or
+periodic snapshot files.
+'''
+
+# 导入模块：
+import os
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from settings import METRICS_PORT, METRICS_SNAPSHOT, METRICS_INTERVAL
+
+
+# 全局变量：
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf'))
+logger = logging.getLogger(__name__)
+
+
+# 类定义：
+class Metrics(object):
+    # 文档字符串
+    '''
+    Metrics class keeps labeled counters, gauges and histograms in memory.
+
+    :Usage:
+        registry.inc('fetch_total', stage='resort', result='ok')
+        with registry.timer('stage_seconds', stage='parse'):
+            ...
+        print(registry.render())
+
+    '''
+
+    # 初始化方法
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counters = dict()
+        self.gauges = dict()
+        self.histograms = dict()
+        self.lock = threading.Lock()
+
+
+    # 计数方法
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+
+    # 仪表方法
+    def set(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.gauges[key] = value
+
+
+    # 直方图采样方法
+    def observe(self, name, value, **labels):
+        # 文档字符串
+        '''
+        Records a sample, such as a latency in seconds, into a histogram.
+        '''
+        # 方法实现
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    hist[0][i] += 1
+                    break
+            hist[1] += value
+            hist[2] += 1
+
+
+    # 计时方法
+    @contextmanager
+    def timer(self, name, **labels):
+        # 文档字符串
+        '''
+        Observes the wall time spent inside the context into a histogram.
+        '''
+        # 方法实现
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+
+    # 计数查询方法
+    def total(self, name, **labels):
+        # 文档字符串
+        '''
+        Sums the counters of given name whose labels match `labels`.
+        '''
+        # 方法实现
+        with self.lock:
+            return sum(v for (n, l), v in self.counters.items()
+                       if n == name and set(labels.items()) <= set(l))
+
+
+    # 分位数估计方法
+    def quantile(self, name, q, **labels):
+        # 文档字符串
+        '''
+        Estimates the q-quantile (0~1) of the histograms of given name whose
+        labels match `labels`, by linear interpolation inside buckets.
+
+        :Returns:
+         - a float, or None if there is no sample.
+        '''
+        # 方法实现
+        counts = [0] * len(self.buckets)
+        with self.lock:
+            for (n, l), hist in self.histograms.items():
+                if n == name and set(labels.items()) <= set(l):
+                    counts = [a + b for a, b in zip(counts, hist[0])]
+        total = sum(counts)
+        if not total:
+            return None
+        rank, seen, lower = q * total, 0, 0.0
+        for bound, count in zip(self.buckets, counts):
+            if count and seen + count >= rank:
+                if bound == float('inf'):
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return lower
+
+
+    # 文本导出方法
+    def render(self):
+        # 文档字符串
+        '''
+        Renders all metrics in Prometheus text exposition format.
+        '''
+        # 方法实现
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+        lines = list()
+        with self.lock:
+            for kind, table in (('counter', self.counters), ('gauge', self.gauges)):
+                for name in sorted({n for n, _ in table}):
+                    lines.append(f'# TYPE {name} {kind}')
+                    for (n, labels), value in sorted(table.items(), key=str):
+                        if n == name:
+                            lines.append(f'{name}{fmt(labels)} {value}')
+            for name in sorted({n for n, _ in self.histograms}):
+                lines.append(f'# TYPE {name} histogram')
+                for (n, labels), (counts, total, num) in sorted(self.histograms.items(), key=str):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(self.buckets, counts):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else bound
+                        lines.append(f'{name}_bucket{fmt(labels, [("le", le)])} {cumulative}')
+                    lines.append(f'{name}_sum{fmt(labels)} {total}')
+                    lines.append(f'{name}_count{fmt(labels)} {num}')
+        return '\n'.join(lines) + '\n'
+
+
+    # 快照方法
+    def snapshot(self, path):
+        # 文档字符串
+        '''
+        Writes the rendered metrics into a file atomically.
+        '''
+        # 方法实现
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(path + '.tmp', 'w', encoding='utf-8') as file:
+            file.write(self.render())
+        os.replace(path + '.tmp', path)
+
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+
+# 全局默认指标注册表
+registry = Metrics()
+
+
+# 函数定义：
+def serve(port=METRICS_PORT, metrics=registry):
+    # 文档字符串
+    '''
+    Serves the metrics in Prometheus text format at http://127.0.0.1:port/metrics
+    from a daemon thread. Does nothing if `port` is None, and only logs a
+    warning if the port can't be bound, metrics are never worth stopping
+    the crawl for.
+
+    :Returns:
+     - the running :class:`ThreadingHTTPServer`, or None if not serving.
+    '''
+    # 方法实现
+    if port is None:
+        return None
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = metrics.render().encode('utf-8')
+            self.send_response(200 if self.path == '/metrics' else 404)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    except OSError as e:
+        logger.warning('>> metrics not served, port %s unavailable: %s', port, e)
+        return None
+    threading.Thread(target=server.serve_forever, name='metrics-http',
+                     daemon=True).start()
+    logger.info('>> metrics served at http://127.0.0.1:%s/metrics', server.server_port)
+    return server
+
+
+def start_snapshots(path=METRICS_SNAPSHOT, interval=METRICS_INTERVAL,
+                    metrics=registry):
+    # 文档字符串
+    '''
+    Writes a metrics snapshot file every `interval` seconds from a daemon
+    thread. Does nothing if `path` is None.
+
+    :Returns:
+     - a :class:`threading.Event`, set it to stop writing snapshots, or None
+       if not writing snapshots.
+    '''
+    # 方法实现
+    if path is None:
+        return None
+    stopped = threading.Event()
+
+    def loop():
+        while not stopped.wait(interval):
+            metrics.snapshot(path)
+        metrics.snapshot(path)
+
+    threading.Thread(target=loop, name='metrics-snapshot', daemon=True).start()
+    return stopped
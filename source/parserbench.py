@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Microbenchmarks MafengwoSpider's page validators and resort parser over the
+fixture corpus, reporting parses/sec and allocations per page, and compares
+them with a saved baseline to catch regressions.
+'''
+
+# 导入模块：
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from types import SimpleNamespace
+
+import fixtures
+from spider import MafengwoSpider
+from settings import save_path
+
+
+# 全局变量：
+BASELINE = os.path.join(save_path, 'parser_baseline.json')
+
+
+# 类定义：
+class BenchSpider(MafengwoSpider):
+    # 文档字符串
+    '''
+    BenchSpider class runs MafengwoSpider's parsing logic without any proxy
+    or network access, coordinates come from the fixture location API.
+    '''
+
+    def get_location(self, poi_id, poi):
+        poi = json.loads(fixtures.render_location(poi_id))['data']['controller_data']['poi']
+        return poi['lat'], poi['lng']
+
+
+# 函数定义：
+def cases(spider):
+    # 文档字符串
+    '''
+    Pairs every extraction path with the fixture it runs on.
+
+    :Returns:
+     - a dict mapping case name to a callable without arguments.
+    '''
+    # 方法实现
+    pages = fixtures.corpus()
+    page = {name: SimpleNamespace(text=html) for name, html in pages.items()}
+    return {
+        'get_links.valid_search': lambda: spider.valid_search(page['search']),
+        'valid_resort': lambda: spider.valid_resort(page['resort']),
+        'valid_resort.ban': lambda: spider.valid_resort(page['ban']),
+        'parse_resort': lambda: spider.parse_resort(pages['resort']),
+        'parse_resort.no_detail': lambda: spider.parse_resort(pages['resort_no_detail']),
+        'parse_resort.no_baseinfo': lambda: spider.parse_resort(pages['resort_no_baseinfo']),
+    }
+
+
+def measure(func, seconds=1.0, repeat=3):
+    # 文档字符串
+    '''
+    Measures a parse path's throughput and allocations.
+
+    Throughput is the best of `repeat` runs of about `seconds` each. The
+    allocations are peak bytes traced by :mod:`tracemalloc` during a single
+    call, memory libxml2 allocates itself is not traced.
+
+    :Returns:
+     - a dict of `per_sec` and `alloc_kb`.
+    '''
+    # 方法实现
+    func()
+    best = 0.0
+    for _ in range(repeat):
+        calls, start = 0, time.perf_counter()
+        while True:
+            func()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= seconds:
+                break
+        best = max(best, calls / elapsed)
+
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        func()
+        peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    return {'per_sec': round(best, 1), 'alloc_kb': round(peak / 1024, 1)}
+
+
+def compare(results, baseline, tolerance):
+    # 文档字符串
+    '''
+    Finds cases whose throughput dropped more than `tolerance` below the
+    baseline.
+
+    :Returns:
+     - a list of (case, baseline per_sec, current per_sec) tuples.
+    '''
+    # 方法实现
+    slower = list()
+    for name, row in results.items():
+        if name in baseline:
+            before = baseline[name]['per_sec']
+            if row['per_sec'] < before * (1 - tolerance):
+                slower.append((name, before, row['per_sec']))
+    return slower
+
+
+# 测试代码：
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seconds', type=float, default=1.0)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save', action='store_true',
+                        help='save the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed throughput drop against the baseline')
+    args = parser.parse_args()
+
+    results = dict()
+    for name, func in cases(BenchSpider()).items():
+        results[name] = measure(func, args.seconds)
+        print(f"{name:28s} {results[name]['per_sec']:10.1f}/s "
+              f"{results[name]['alloc_kb']:8.1f}KB")
+
+    if args.save:
+        folder = os.path.dirname(args.baseline)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+        print(f'baseline saved to {args.baseline}')
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as file:
+            slower = compare(results, json.load(file), args.tolerance)
+        for name, before, after in slower:
+            print(f'REGRESSION {name}: {before:.1f}/s -> {after:.1f}/s')
+        sys.exit(1 if slower else 0)
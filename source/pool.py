@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Define a ConnectionPool class which shares a bounded number of database
+connections between writer threads.
+'''
+
+# 导入模块：
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+
+from settings import SAVER_POOL_SIZE, SAVER_POOL_TIMEOUT
+
+
+# 全局变量：
+logger = logging.getLogger(__name__)
+
+
+# 类定义：
+class ConnectionPool(object):
+    # 文档字符串
+    '''
+    ConnectionPool class creates connections on demand up to `size`, hands
+    each one to a single thread at a time and keeps released connections for
+    reuse. Every released connection is reset, such as rolled back, so its
+    next user neither inherits an open transaction nor reads from an old
+    snapshot; a connection which fails to reset is dropped.
+
+    :Usage:
+        pool = ConnectionPool(lambda: pymysql.connect(**SQL_CONF),
+                              reset=lambda conn: conn.rollback())
+        with pool.connection() as conn:
+            ...
+        pool.close()
+
+    '''
+
+    # 初始化方法
+    def __init__(self, factory, size=SAVER_POOL_SIZE, reset=None,
+                 close=lambda conn: conn.close(), timeout=SAVER_POOL_TIMEOUT):
+        # 文档字符串
+        '''
+        Initialize a new instance of the ConnectionPool.
+
+        :Args:
+         - factory : a function opening a new connection.
+         - size : an int of maximum open connections.
+         - reset : an optional function bringing a connection back to a clean
+           state whenever it is released, such as a rollback.
+         - close : a function closing a connection.
+         - timeout : seconds to wait for a free connection before raising.
+
+        '''
+        # 方法实现
+        self.factory = factory
+        self.size = size
+        self.reset = reset
+        self.closer = close
+        self.timeout = timeout
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+        self.closed = False
+
+
+    def acquire(self):
+        if self.closed:
+            raise RuntimeError('连接池已关闭')
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            create = self.created < self.size
+            if create:
+                self.created += 1
+        if create:
+            try:
+                return self.factory()
+            except Exception:
+                with self.lock:
+                    self.created -= 1
+                raise
+        try:
+            return self.idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise RuntimeError(f'等待数据库连接超时（{self.timeout}秒）')
+
+
+    def release(self, conn):
+        if self.closed:
+            self.discard(conn)
+            return
+        try:
+            if self.reset:
+                self.reset(conn)
+        except Exception as e:
+            logger.debug('>>> resetting connection failed: %s', e)
+            self.discard(conn)
+        else:
+            self.idle.put(conn)
+
+
+    def discard(self, conn):
+        with self.lock:
+            self.created -= 1
+        try:
+            self.closer(conn)
+        except Exception as e:
+            logger.debug('>>> closing connection failed: %s', e)
+
+
+    # 连接借用方法
+    @contextmanager
+    def connection(self):
+        # 文档字符串
+        '''
+        Borrows a connection for the code inside the context.
+        '''
+        # 方法实现
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+
+    def close(self):
+        self.closed = True
+        while True:
+            try:
+                self.discard(self.idle.get_nowait())
+            except queue.Empty:
+                break
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Defines an opt-in Profiler class which times crawl and save stages and
+optionally runs cProfile around them, writing profiles into `save_path` so two
+runs can be compared.
+'''
+
+# 导入模块：
+import os
+import sys
+import json
+import time
+import logging
+import pstats
+import cProfile
+import threading
+import functools
+from contextlib import contextmanager
+
+from settings import PROFILE, PROFILE_MODE, save_path
+
+
+# 全局变量：
+logger = logging.getLogger(__name__)
+
+
+# 类定义：
+class Profiler(object):
+    # 文档字符串
+    '''
+    Profiler class accumulates calls, wall time and CPU time of every stage.
+    In `cprofile` mode it also collects a cProfile profile per stage. Nested
+    stages are only timed, their calls show up in the outer stage's profile.
+
+    :Usage:
+        profiler = Profiler(enabled=True)
+        with profiler.stage('parse_resort'):
+            ...
+        profiler.dump()
+
+    '''
+    # 类静态成员定义
+    MODES = ('timer', 'cprofile')
+    # 初始化方法
+    def __init__(self, enabled=PROFILE, mode=PROFILE_MODE, out_dir=None):
+        # 文档字符串
+        '''
+        Initialize a new instance of the Profiler.
+
+        :Args:
+         - enabled : a bool of whether stages are profiled at all.
+         - mode : `timer` for wall and CPU timers only, `cprofile` to also
+           collect cProfile profiles.
+         - out_dir : a str of directory to write profiles into, defaults to
+           `profiles` in `save_path`.
+
+        '''
+        # 方法实现
+        if mode not in self.MODES:
+            raise RuntimeError('性能分析模式指定有误，请输入timer或者cprofile')
+        self.enabled = enabled
+        self.mode = mode
+        self.out_dir = out_dir or os.path.join(save_path, 'profiles')
+        self.stats = dict()
+        self.profiles = dict()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+
+    # 阶段统计方法
+    @contextmanager
+    def stage(self, name):
+        # 文档字符串
+        '''
+        Times the code inside the context as stage `name`.
+        '''
+        # 方法实现
+        if not self.enabled:
+            yield
+            return
+        profile = None
+        if self.mode == 'cprofile' and not getattr(self.local, 'active', False):
+            profile = cProfile.Profile()
+            self.local.active = True
+        wall, cpu = time.perf_counter(), time.thread_time()
+        if profile:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+                self.local.active = False
+            wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+            with self.lock:
+                calls, total_wall, total_cpu = self.stats.get(name, (0, 0.0, 0.0))
+                self.stats[name] = (calls + 1, total_wall + wall, total_cpu + cpu)
+                if profile:
+                    if name in self.profiles:
+                        self.profiles[name].add(profile)
+                    else:
+                        self.profiles[name] = pstats.Stats(profile)
+
+
+    # 结果输出方法
+    def dump(self, tag=None):
+        # 文档字符串
+        '''
+        Writes `stages.json` with every stage's calls, wall and CPU time, and a
+        `<stage>.prof` pstats file per stage in cprofile mode.
+
+        :Args:
+         - tag : a str of sub directory name, defaults to current time.
+
+        :Returns:
+         - a str of the directory written, or None if profiling is disabled.
+        '''
+        # 方法实现
+        if not self.enabled:
+            return None
+        folder = os.path.join(self.out_dir, tag or time.strftime('%Y%m%d-%H%M%S'))
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        with self.lock:
+            summary = {name: {'calls': calls, 'wall': wall, 'cpu': cpu}
+                       for name, (calls, wall, cpu) in self.stats.items()}
+            for name, stats in self.profiles.items():
+                stats.dump_stats(os.path.join(folder, name+'.prof'))
+        with open(os.path.join(folder, 'stages.json'), 'w', encoding='utf-8') as file:
+            json.dump(summary, file, indent=2)
+        logger.info('>>> profiles written to %s', folder)
+        return folder
+
+
+# 函数定义：
+def profiled(stage):
+    # 文档字符串
+    '''
+    Decorates a method so it runs inside `self.profiler.stage(stage)` when
+    the instance has an enabled profiler.
+    '''
+    # 方法实现
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = getattr(self, 'profiler', None)
+            if profiler is None or not profiler.enabled:
+                return method(self, *args, **kwargs)
+            with profiler.stage(stage):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def compare(old_dir, new_dir):
+    # 文档字符串
+    '''
+    Compares the per call wall and CPU time of every stage between two dumped
+    runs.
+
+    :Returns:
+     - a dict mapping stage name to a dict of old, new and ratio per call
+       wall time.
+    '''
+    # 方法实现
+    def load(folder):
+        with open(os.path.join(folder, 'stages.json'), encoding='utf-8') as file:
+            return json.load(file)
+
+    old, new = load(old_dir), load(new_dir)
+    result = dict()
+    for name in sorted(set(old) & set(new)):
+        before = old[name]['wall'] / max(old[name]['calls'], 1)
+        after = new[name]['wall'] / max(new[name]['calls'], 1)
+        result[name] = {'old': before, 'new': after,
+                        'ratio': after / before if before else None}
+    return result
+
+
+# 测试代码：
+if __name__ == '__main__':
+    # python profiling.py <old run dir> <new run dir>
+    for name, row in compare(sys.argv[1], sys.argv[2]).items():
+        ratio = f"{row['ratio']:.2f}x" if row['ratio'] else '-'
+        print(f"{name:20s} {row['old']*1000:10.2f}ms {row['new']*1000:10.2f}ms {ratio}")
@@ -9,11 +9,17 @@ Define a SpiderProxy class allows users to use IPProxyPool API for their spider.
 # 导入模块：
 import requests
 import json
+import time
 import random
+import logging
 
-from settings import TIMEOUT, PROXY_COUNT, PROXY_MAX
+from retry import RetryPolicy, BreakerBoard
+from metrics import registry as metrics
+from settings import TIMEOUT, PROXY_COUNT, PROXY_MAX, \
+                     PROXY_BREAKER_THRESHOLD, PROXY_BREAKER_COOLDOWN
 
 # 全局变量：
+logger = logging.getLogger(__name__)
 # TIMEOUT = (6, 6)
 
 
@@ -38,6 +44,9 @@ class SpiderProxy(object):
         # 方法实现
         self.proxies = list()
         self.counter = dict()
+        # 连续失败的代理会被熔断一段时间
+        self.breakers = BreakerBoard(PROXY_BREAKER_THRESHOLD, PROXY_BREAKER_COOLDOWN)
+        self.retry = RetryPolicy(budget=None)
         self.get_proxy()
 
 
@@ -47,8 +56,9 @@ class SpiderProxy(object):
         '''
         Sends HTTP Requests to IPProxyPool API.
 
-        If Timeout exception occured, retries HTTP Request 10 times;
-        If retry exceeded 10 times or other exceptions occured, raise exception.
+        If Timeout or ConnectionError exception occured, retries HTTP Request
+        with exponential backoff; If retry exceeded maximum times, raise
+        exception.
 
         :Args:
          - url : a str of IPProxyPool API Url.
@@ -58,7 +68,6 @@ class SpiderProxy(object):
          - html : a json of IPProxyPool API data.
         '''
         # 方法实现
-        str_proxies = None
         num = 1
         while True:
             try:
@@ -66,21 +75,16 @@ class SpiderProxy(object):
                 # print(response.encoding)
                 response.raise_for_status()
                 response.encoding = 'utf-8'
-                str_proxies = response.text
-                print('>> Request IPProxyPool API Success.')
-            except requests.exceptions.Timeout:
-                print(f'>> Timeout Occured: {num} times.')
-                num += 1
-                if num > 10:
-                    print('>> Exceed Timeout maximum retry times.')
+                logger.debug('>> Request IPProxyPool API Success.')
+                return json.loads(response.text)
+            except (requests.exceptions.Timeout,
+                    requests.exceptions.ConnectionError) as e:
+                logger.warning('>> Exception Occured: %s times. %s', num, e)
+                if not self.retry.backoff(num):
+                    logger.error('>> Exceed maximum retry times.')
                     # 日志记录
-                    raise RuntimeError('Exceed Timeout maximum retry times.')
-            finally:
-                if str_proxies:
-                    break
-                # timeout retry pause.
-                # time.sleep(1)
-        return json.loads(str_proxies)
+                    raise RuntimeError('Exceed maximum retry times.')
+                num += 1
 
 
     # 获取代理IP方法
@@ -88,25 +92,25 @@ class SpiderProxy(object):
         # 文档字符串
 
         # 方法实现
-        print('>>> getting proxies from IPProxyPool.')
+        logger.info('>>> getting proxies from IPProxyPool.')
         raw_proxies = list()
         ac_num = PROXY_COUNT
         for type_num in range(2):
             raw_proxies.extend(self.request_api(self.api_url, types=type_num,
                                                 count=ac_num, country='国内'))
-            print(f'>> acquired types = {type_num} proxies number:', len(raw_proxies))
+            logger.debug('>> acquired types = %s proxies number: %s', type_num, len(raw_proxies))
             if len(raw_proxies) == PROXY_COUNT:
                 break
             ac_num = PROXY_COUNT - len(raw_proxies)
-        print('>>> acquired proxy number:', len(raw_proxies))
+        logger.info('>>> acquired proxy number: %s', len(raw_proxies))
 
         for proxy in raw_proxies:
             url = '%s:%s' % (proxy[0], proxy[1])
             self.proxies.append(url)
             self.counter[url] = PROXY_MAX
-        print(self.proxies)
-        print(self.counter)
-        print('>>> success getting proxies.')
+        metrics.inc('proxy_acquired_total', len(raw_proxies))
+        metrics.set('proxy_pool_size', len(self.proxies))
+        logger.debug('>>> success getting proxies.')
 
 
     def delete_proxy(self, url):
@@ -119,37 +123,79 @@ class SpiderProxy(object):
          - url : a str of url composed of ip and port.
         '''
         # 方法实现
-        print('>>> delete proxy:', url)
+        logger.info('>>> delete proxy: %s', url)
         ip= url.split(':')[0]
-        print('>>> delete ip:', ip)
         self.request_api(''.join([self.api_url, 'delete']), ip=ip)
         for i in range(len(self.proxies)-1, -1, -1):
             if self.proxies[i] == url:
                 self.proxies.pop(i)
         self.counter.pop(url)
-        print(self.proxies)
-        print('>>> success deleting proxy:', url)
+        self.breakers.discard(url)
+        metrics.inc('proxy_deleted_total')
+        metrics.set('proxy_pool_size', len(self.proxies))
+        logger.debug('>>> success deleting proxy: %s', url)
 
 
-    def pop_proxy(self):
+    def pop_proxy(self, exclude=None):
         # 文档字符串
+        '''
+        Picks a random proxy whose circuit breaker lets requests through, waits
+        for the shortest cooldown if all proxies are broken.
+
+        :Args:
+         - exclude : an optional url not to pick, such as the proxy already
+           in use. Returns None instead of waiting if no other proxy is
+           available.
 
+        :Returns:
+         - url : a str of url composed of ip and port.
+        '''
         # 方法实现
         while True:
             if len(self.proxies) == 0:
                 self.get_proxy()
 
-            url = random.choice(self.proxies)
+            candidates = [url for url in self.proxies
+                          if url != exclude and self.breakers.available(url)]
+            if not candidates:
+                if exclude is not None:
+                    return None
+                # 半开状态的熔断器剩余冷却时间为0，至少等待1秒，避免空转
+                wait = min(self.breakers.remaining(url) for url in self.proxies) or 1
+                logger.warning('>>> all proxies are broken, waiting %.1fs.', wait)
+                time.sleep(wait)
+                continue
+
+            url = random.choice(candidates)
             self.counter[url] -= 1
 
             if self.counter[url] <= 0:
                 self.delete_proxy(url)
-            else:
+            elif self.breakers.acquire(url):
                 break
 
         return url
 
 
+    def reuse_proxy(self, url):
+        # 文档字符串
+        '''
+        Uses a held proxy again if it is still in the pool, has uses left and
+        its circuit breaker lets requests through.
+
+        :Args:
+         - url : a str of url composed of ip and port.
+
+        :Returns:
+         - url if the proxy can be reused, otherwise None.
+        '''
+        # 方法实现
+        if self.counter.get(url, 0) <= 1 or not self.breakers.acquire(url):
+            return None
+        self.counter[url] -= 1
+        return url
+
+
 # 测试代码：
 if __name__ == '__main__':
     proxyer = SpiderProxy()
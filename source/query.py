@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Defines a cached read API over the saver layer, which serves resort lookups
+from an in-process LRU cache and only queries the database on misses.
+'''
+
+# 导入模块：
+import time
+import pickle
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+
+from metrics import registry as metrics
+from settings import QUERY_CACHE_BYTES, QUERY_PREFIX_LIMIT, QUERY_VERSION_INTERVAL
+
+
+# 全局变量：
+logger = logging.getLogger(__name__)
+
+
+# 类定义：
+class LRUCache(object):
+    # 文档字符串
+    '''
+    LRUCache class keeps values up to a total of `max_bytes`, evicting the
+    least recently used ones first. Sizes are estimated as the length of a
+    value's pickle.
+    '''
+
+    # 初始化方法
+    def __init__(self, max_bytes=QUERY_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.entries:
+                return default
+            self.entries.move_to_end(key)
+            return self.entries[key][0]
+
+
+    def put(self, key, value):
+        size = len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[1]
+            # 超过容量的单个值不缓存
+            if size > self.max_bytes:
+                return
+            self.entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                self.size -= self.entries.popitem(last=False)[1][1]
+                metrics.inc('query_cache_evicted_total')
+
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class ResortQuery(object):
+    # 文档字符串
+    '''
+    ResortQuery class looks resorts up by poi id, area id and name prefix
+    through a :class:`BaseSaver`, caching every result. The cache is dropped
+    whenever the data changes, such as a new `data_save` load: at once for
+    writes of the same saver, and within `interval` seconds for writes of
+    other processes, by comparing the load version stored in the database.
+
+    Returned records are copies, changing them doesn't affect the cache.
+
+    :Usage:
+        with MafengwoSaver('mysql') as saver:
+            query = ResortQuery(saver)
+            query.by_poi(1318)
+            query.by_area(10030)
+            query.by_prefix('亚龙湾')
+
+    '''
+
+    # 初始化方法
+    def __init__(self, saver, max_bytes=QUERY_CACHE_BYTES,
+                 interval=QUERY_VERSION_INTERVAL):
+        # 文档字符串
+        '''
+        Initialize a new instance of the ResortQuery.
+
+        :Args:
+         - saver : a :class:`BaseSaver` to read records from.
+         - max_bytes : an int of the cache's size limit in bytes.
+         - interval : seconds between two checks of the load version in the
+           database, None only notices the writes of `saver`.
+
+        '''
+        # 方法实现
+        self.saver = saver
+        self.cache = LRUCache(max_bytes)
+        self.interval = interval
+        self.invalidate()
+
+
+    def invalidate(self):
+        self.cache.clear()
+        self.version = self.saver.version
+        self.load_version = self.saver.load_version() if self.interval is not None else None
+        self.checked = time.time()
+
+
+    def changed(self):
+        # 文档字符串
+        '''
+        Checks whether the data changed since the cache was filled, the
+        database is queried at most once every `interval` seconds.
+        '''
+        # 方法实现
+        if self.saver.version != self.version:
+            return True
+        if self.interval is None or time.time() - self.checked < self.interval:
+            return False
+        self.checked = time.time()
+        return self.saver.load_version() != self.load_version
+
+
+    def lookup(self, key, load):
+        # 文档字符串
+        '''
+        Returns the cached result of `key`, or loads and caches it.
+
+        :Args:
+         - key : a tuple of query kind and value.
+         - load : a function reading the result from the database.
+        '''
+        # 方法实现
+        if self.changed():
+            logger.info('>>> saver data changed, dropping %s cached results.', len(self.cache))
+            self.invalidate()
+        missing = object()
+        result = self.cache.get(key, missing)
+        if result is missing:
+            metrics.inc('query_cache_total', result='miss', kind=key[0])
+            result = load()
+            self.cache.put(key, result)
+        else:
+            metrics.inc('query_cache_total', result='hit', kind=key[0])
+        return result
+
+
+    # 按景点ID查询方法
+    def by_poi(self, poi_id):
+        # 文档字符串
+        '''
+        Looks a resort up by its poi id.
+
+        :Returns:
+         - a dict of resort's info data, or None if there is no such resort.
+        '''
+        # 方法实现
+        def load():
+            rows = self.saver.data_read('poi_id', poi_id)
+            return rows[0] if rows else None
+        item = self.lookup(('poi', poi_id), load)
+        return dict(item) if item else None
+
+
+    # 按地区ID查询方法
+    def by_area(self, area_id):
+        # 文档字符串
+        '''
+        Looks up the resorts of an area, the resorts are cached by poi id as
+        well.
+
+        :Returns:
+         - a list of dicts of resorts' info data.
+        '''
+        # 方法实现
+        def load():
+            rows = self.saver.data_read('areaId', area_id)
+            for item in rows:
+                self.cache.put(('poi', item['poi_id']), item)
+            return rows
+        return [dict(item) for item in self.lookup(('area', area_id), load)]
+
+
+    # 按名称前缀查询方法
+    def by_prefix(self, prefix, limit=QUERY_PREFIX_LIMIT):
+        # 文档字符串
+        '''
+        Looks up the resorts whose name starts with `prefix`, sorted by name.
+
+        :Returns:
+         - a list of at most `limit` dicts of resorts' info data.
+        '''
+        # 方法实现
+        def load():
+            rows = self.saver.data_read('resortName', prefix, prefix=True)
+            return sorted(rows, key=lambda item: item.get('resortName') or '')
+        return [dict(item) for item in self.lookup(('prefix', prefix), load)[:limit]]
+
+
+# 测试代码：
+if __name__ == '__main__':
+    from logger import setup_logging
+    from database import MafengwoSaver
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('save_mode', choices=MafengwoSaver.SAVE_MODES)
+    parser.add_argument('--poi', type=int)
+    parser.add_argument('--area', type=int)
+    parser.add_argument('--prefix')
+    args = parser.parse_args()
+    setup_logging()
+    with MafengwoSaver(args.save_mode) as saver:
+        query = ResortQuery(saver)
+        if args.poi is not None:
+            print(query.by_poi(args.poi))
+        if args.area is not None:
+            for item in query.by_area(args.area):
+                print(item['poi_id'], item['resortName'])
+        if args.prefix:
+            for item in query.by_prefix(args.prefix):
+                print(item['poi_id'], item['resortName'])
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Defines helpers shared by spiders and savers to handle parsed resort records.
+'''
+
+# 导入模块：
+import sys
+import json
+import logging
+import hashlib
+
+
+# 全局变量：
+logger = logging.getLogger(__name__)
+# 不参与内容哈希计算的管理字段
+HASH_EXCLUDE = ('timeStamp', 'contentHash', '_id')
+# 取值重复度高的字段，驻留后所有记录共享同一个字符串对象
+INTERNED = ('areaName', 'source')
+# 知识图谱中地区节点的字段，同一地区的景点共享一个地区节点
+LOCATE_FIELDS = ('areaId', 'areaName', 'source', 'timeStamp')
+# 旧版本数据中的字段名
+ALIASES = {'item-site': 'item_site', 'item-time': 'item_time'}
+# 已经提示过的未知字段
+UNKNOWN_FIELDS = set()
+
+
+# 类定义：
+class Resort(object):
+    # 文档字符串
+    '''
+    Resort class is a compact record of a parsed resort. Fields are kept in
+    `__slots__` instead of a per record dict, and it supports the read and
+    write mapping operations the spiders and savers use, so `dict(resort)`
+    gives the plain dict format. Keys outside `FIELDS`, such as baseinfo
+    items the parser doesn't know yet, are kept in an `extra` dict.
+
+    :Usage:
+        resort = Resort.from_dict(item)
+        resort['lat'] = 18.2
+        json.dumps(dict(resort))
+
+    '''
+    # 类静态成员定义
+    FIELDS = ('resortName', 'poi_id', 'introduction', 'areaName', 'areaId',
+              'address', 'lat', 'lng', 'openInfo', 'ticketsInfo', 'transInfo',
+              'tel', 'item_site', 'item_time', 'payAbstracts', 'source',
+              'timeStamp', 'contentHash')
+    __slots__ = FIELDS + ('extra',)
+    # 初始化方法
+    def __init__(self, **fields):
+        # 没有额外字段的记录不占用字典
+        self.extra = None
+        for key in self.FIELDS:
+            self[key] = fields.get(key)
+        for key in fields:
+            if key not in self.FIELDS:
+                self[key] = fields[key]
+
+
+    @classmethod
+    def from_dict(cls, item):
+        # 文档字符串
+        '''
+        Packs a dict formatted record, legacy keys in `ALIASES` are renamed
+        and other keys outside `FIELDS` are kept in `extra`.
+        '''
+        # 方法实现
+        resort = cls()
+        for key, value in item.items():
+            resort[ALIASES.get(key, key)] = value
+        return resort
+
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if self.extra is None:
+            raise KeyError(key)
+        return self.extra[key]
+
+
+    def __setitem__(self, key, value):
+        if key in self.FIELDS:
+            if key in INTERNED and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(self, key, value)
+            return
+        if key not in UNKNOWN_FIELDS:
+            UNKNOWN_FIELDS.add(key)
+            logger.warning('>>> unknown resort field %r%s.', key,
+                           ' kept as extra' if isinstance(key, str) else ' dropped')
+        # 非字符串的键无法存入数据库
+        if isinstance(key, str):
+            if self.extra is None:
+                self.extra = dict()
+            self.extra[key] = value
+
+
+    def get(self, key, default=None):
+        if key in self.FIELDS:
+            return getattr(self, key, default)
+        return self.extra.get(key, default) if self.extra else default
+
+
+    def keys(self):
+        return self.FIELDS + tuple(self.extra) if self.extra else self.FIELDS
+
+
+    def items(self):
+        return ((key, self[key]) for key in self.keys())
+
+
+    def __iter__(self):
+        return iter(self.keys())
+
+
+    def __len__(self):
+        return len(self.keys())
+
+
+    def __contains__(self, key):
+        return key in self.FIELDS or bool(self.extra) and key in self.extra
+
+
+    def __repr__(self):
+        return f'Resort({dict(self)!r})'
+
+
+# 函数定义：
+def content_hash(item):
+    # 文档字符串
+    '''
+    Computes a stable content hash over a record's business fields.
+
+    Administrative fields listed in `HASH_EXCLUDE` are ignored, so two crawls
+    of an unchanged resort produce the same hash.
+
+    :Args:
+     - item : a dict of parsed record.
+
+    :Returns:
+     - a str of hex sha1 digest.
+    '''
+    # 方法实现
+    fields = {str(k): v for k, v in item.items() if k not in HASH_EXCLUDE}
+    raw = json.dumps(fields, ensure_ascii=False, sort_keys=True,
+                     separators=(',', ':'))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def dump_record(item):
+    # 文档字符串
+    '''
+    Serializes a dict or :class:`Resort` record into a JSON line.
+    '''
+    # 方法实现
+    return json.dumps(dict(item), ensure_ascii=False)
+
+
+def load_resort(line):
+    # 文档字符串
+    '''
+    Restores a :class:`Resort` from a JSON line written by :func:`dump_record`.
+    '''
+    # 方法实现
+    return Resort.from_dict(json.loads(line))
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Re-extracts the resorts dataset offline from a PageArchive, running the
+MafengwoSpider parsing logic on all CPU cores.
+'''
+
+# 导入模块：
+import os
+import json
+import time
+import logging
+import argparse
+import multiprocessing
+
+from lxml import etree
+from archive import PageArchive
+from cache import LocationCache
+from spider import MafengwoSpider
+from settings import file_name, save_path
+
+
+# 类定义：
+class ReplaySpider(MafengwoSpider):
+    # 文档字符串
+    '''
+    ReplaySpider class parses archived Mafengwo pages instead of fetching
+    them, location API responses are also read from the archive. Resorts
+    whose coordinates came from the location cache while crawling have no
+    archived location response, their coordinates are read from the cache.
+
+    :Usage:
+        spider = ReplaySpider(PageArchive())
+        item = spider.replay_resort(1318)
+
+    '''
+
+    # 初始化方法
+    def __init__(self, archive, locations=None):
+        # 文档字符串
+        '''
+        Initialize a new instance of the ReplaySpider, its proxy pool is never
+        used so it is never created.
+
+        :Args:
+         - archive : a :class:`PageArchive` to read pages from.
+         - locations : an optional :class:`LocationCache` read when a resort
+           has no archived location response.
+
+        '''
+        # 方法实现
+        super(ReplaySpider, self).__init__(None, archive=archive, locations=locations)
+
+
+    # 解析归档景点方法
+    def replay_resort(self, poi_id):
+        # 文档字符串
+        '''
+        Parses the latest valid archived page of given resort.
+
+        :Args:
+         - poi_id : an int of resort's poi id.
+
+        :Returns:
+         - item : a :class:`Resort` of parsed resort's info data, or None if no archived
+           page of the resort can be parsed.
+        '''
+        # 方法实现
+        for entry in reversed(self.archive.entries(poi_id=poi_id, kind='resort')):
+            html = self.archive.read(entry=entry).decode('utf-8', 'replace')
+            test = etree.HTML(html).xpath(('//div[@class="row row-top" '
+                                           'or @data-anchor="overview"]'))
+            # 归档中可能有被封禁时的页面，跳过后尝试更早的归档
+            if len(test) != 2:
+                continue
+            try:
+                item = self.parse_resort(html)
+            except (LookupError, ValueError, TypeError) as e:
+                logger.warning('>>> replay resort %s failed: %s', poi_id, e)
+                continue
+            item['timeStamp'] = time.strftime("%Y-%m-%d %H:%M:%S",
+                                              time.localtime(entry['fetched_at']))
+            return item
+        return None
+
+
+    # 获取景点坐标方法
+    def get_location(self, poi_id, poi):
+        # 文档字符串
+        '''
+        Gets given resort's coordinates from archived location API responses,
+        or from the location cache if none is archived.
+
+        :Raises:
+         - LookupError : if neither the archive nor the cache holds the
+           coordinates.
+        '''
+        # 方法实现
+        for entry in reversed(self.archive.entries(poi_id=poi_id, kind='location')):
+            try:
+                apiData = json.loads(self.archive.read(entry=entry))['data']
+                return (apiData['controller_data']['poi']['lat'],
+                        apiData['controller_data']['poi']['lng'])
+            except (KeyError, TypeError, ValueError):
+                continue
+        # 爬取时命中坐标缓存的景点没有归档坐标响应
+        location = self.locations.get(poi_id) if self.locations else None
+        if location:
+            return location
+        raise LookupError(f'no archived location of poi {poi_id}')
+
+
+# 全局变量：
+logger = logging.getLogger(__name__)
+# 重放结果默认写入单独的文件，不覆盖爬取的数据
+REPLAY_OUTPUT = file_name + 'Replay'
+# 每个工作进程各自打开归档文件
+_worker_spider = None
+
+
+# 函数定义：
+def _init_worker(archive_dir, name, location_db):
+    global _worker_spider
+    _worker_spider = ReplaySpider(PageArchive(archive_dir, name),
+                                  open_locations(location_db))
+
+
+def open_locations(location_db):
+    # 重放时缓存的坐标不会过期；缓存文件不存在时不创建
+    if location_db and os.path.exists(location_db):
+        return LocationCache(location_db, ttl=None)
+    return None
+
+
+def _replay_chunk(poi_ids):
+    return [_worker_spider.replay_resort(poi_id) for poi_id in poi_ids]
+
+
+def replay(archive_dir=None, name='pages', processes=None, output=REPLAY_OUTPUT,
+           chunk_size=16, location_db=None):
+    # 文档字符串
+    '''
+    Re-extracts every archived resort in parallel and dumps the dataset in the
+    same json format as :meth:`BaseSpider.dump_data`.
+
+    :Args:
+     - archive_dir : a str of archive directory, see :class:`PageArchive`.
+     - name : a str of archive file name without extension.
+     - processes : an int of worker processes, defaults to CPU count.
+     - output : a str of output file name without extension, defaults to a
+       file apart from the crawled dataset.
+     - chunk_size : an int of resorts parsed per task.
+     - location_db : a str of location cache file read for resorts without
+       archived coordinates, defaults to `location.db` in `save_path`.
+
+    :Returns:
+     - spider : the :class:`ReplaySpider` holding replayed data.
+    '''
+    # 方法实现
+    start = time.time()
+    location_db = location_db or os.path.join(save_path, LocationCache.DEFAULT_FILE)
+    spider = ReplaySpider(PageArchive(archive_dir, name))
+    poi_ids = [poi_id for kind, poi_id in spider.archive.by_poi if kind == 'resort']
+    chunks = [poi_ids[i:i+chunk_size] for i in range(0, len(poi_ids), chunk_size)]
+    logger.info('>>>> replaying %s resorts.', len(poi_ids))
+
+    with multiprocessing.Pool(processes, _init_worker,
+                              (archive_dir, name, location_db)) as pool:
+        for items in pool.imap(_replay_chunk, chunks):
+            spider.data.extend(item for item in items if item)
+
+    logger.info('>>>> replayed %s of %s resorts in %.1fs.',
+                len(spider.data), len(poi_ids), time.time()-start)
+    spider.dump_data('json', output)
+    spider.archive.close()
+    return spider
+
+
+# 测试代码：
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--archive-dir', default=None)
+    parser.add_argument('--name', default='pages')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--output', default=REPLAY_OUTPUT)
+    parser.add_argument('--location-db', default=None)
+    args = parser.parse_args()
+    replay(args.archive_dir, args.name, args.processes, args.output,
+           location_db=args.location_db)
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Defines a RetryPolicy class with exponential backoff, jitter and a global retry
+budget, and CircuitBreaker classes which stop requests to failing proxies or
+hosts for a cooldown period.
+'''
+
+# 导入模块：
+import time
+import random
+import threading
+
+from settings import RETRY_TRIES, RETRY_BASE_DELAY, RETRY_MAX_DELAY, \
+                     RETRY_BUDGET
+
+
+# 类定义：
+
+# 重试策略类
+class RetryPolicy(object):
+    # 文档字符串
+    '''
+    RetryPolicy class decides whether a failed request may be retried and how
+    long to wait before retrying.
+
+    Delays grow exponentially with "full jitter", every retry consumes the
+    global budget shared by all requests using the same policy.
+
+    :Usage:
+        policy = RetryPolicy()
+        attempt = 1
+        while not do_request():
+            if not policy.backoff(attempt):
+                break
+            attempt += 1
+
+    '''
+
+    # 初始化方法
+    def __init__(self, max_tries=RETRY_TRIES, base_delay=RETRY_BASE_DELAY,
+                 max_delay=RETRY_MAX_DELAY, factor=2, budget=RETRY_BUDGET,
+                 jitter=True):
+        # 文档字符串
+        '''
+        Initialize a new instance of the RetryPolicy.
+
+        :Args:
+         - max_tries : an int of maximum tries of a single request.
+         - base_delay : seconds to wait before the first retry.
+         - max_delay : seconds a single wait is capped at.
+         - factor : a number the delay is multiplied by on every retry.
+         - budget : an int of retries allowed in total, None for unlimited.
+         - jitter : a bool of whether to randomize delays.
+
+        '''
+        # 方法实现
+        self.max_tries = max_tries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.budget = budget
+        self.jitter = jitter
+        self.spent = 0
+        self.lock = threading.Lock()
+
+
+    # 退避时间计算方法
+    def delay(self, attempt):
+        # 文档字符串
+        '''
+        Computes the wait before retrying after the `attempt`-th failed try.
+        '''
+        # 方法实现
+        ceiling = min(self.max_delay, self.base_delay * self.factor ** (attempt - 1))
+        return random.uniform(0, ceiling) if self.jitter else ceiling
+
+
+    # 重试判断方法
+    def should_retry(self, attempt):
+        # 文档字符串
+        '''
+        Checks whether a request failed `attempt` times may be retried.
+        '''
+        # 方法实现
+        if attempt >= self.max_tries:
+            return False
+        return self.budget is None or self.spent < self.budget
+
+
+    # 退避方法
+    def backoff(self, attempt):
+        # 文档字符串
+        '''
+        Consumes one retry from the budget and sleeps before the retry.
+
+        :Args:
+         - attempt : an int of tries already failed.
+
+        :Returns:
+         - a bool of whether the caller may retry.
+        '''
+        # 方法实现
+        with self.lock:
+            if not self.should_retry(attempt):
+                return False
+            self.spent += 1
+        time.sleep(self.delay(attempt))
+        return True
+
+
+    # 预算判断方法
+    def exhausted(self):
+        return self.budget is not None and self.spent >= self.budget
+
+
+# 熔断器类
+class CircuitBreaker(object):
+    # 文档字符串
+    '''
+    CircuitBreaker class opens after `threshold` consecutive failures, stays
+    open for `cooldown` seconds, then lets a single trial request through
+    (half-open). The trial's success closes it and its failure opens it again.
+    '''
+    # 类静态成员定义
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+    # 初始化方法
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0
+
+
+    # 可用性判断方法
+    def available(self, now=None):
+        # 文档字符串
+        '''
+        Checks without side effects whether a request may go through.
+        '''
+        # 方法实现
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN:
+            return False
+        now = time.time() if now is None else now
+        return now - self.opened_at >= self.cooldown
+
+
+    # 请求放行方法
+    def acquire(self, now=None):
+        # 文档字符串
+        '''
+        Lets a request go through if possible, an open breaker past its
+        cooldown turns half-open and lets only this trial request through.
+
+        :Returns:
+         - a bool of whether the request may go through.
+        '''
+        # 方法实现
+        if not self.available(now):
+            return False
+        if self.state == self.OPEN:
+            self.state = self.HALF_OPEN
+        return True
+
+
+    # 剩余冷却时间方法
+    def remaining(self, now=None):
+        if self.state != self.OPEN:
+            return 0
+        now = time.time() if now is None else now
+        return max(0, self.cooldown - (now - self.opened_at))
+
+
+    def success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+
+
+    def failure(self, now=None):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+            self.state = self.OPEN
+            self.opened_at = time.time() if now is None else now
+
+
+    # 试探请求放弃方法
+    def release(self):
+        # 文档字符串
+        '''
+        Gives back the trial of a half-open breaker whose request was
+        abandoned without an outcome, so the next request becomes the trial.
+        Otherwise the breaker would stay half-open forever.
+        '''
+        # 方法实现
+        if self.state == self.HALF_OPEN:
+            # 冷却时间已过，回到打开状态后立即可以再次试探
+            self.state = self.OPEN
+
+
+# 熔断器集合类
+class BreakerBoard(object):
+    # 文档字符串
+    '''
+    BreakerBoard class keeps a CircuitBreaker for every key, such as a proxy
+    url or a host name.
+    '''
+
+    # 初始化方法
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.breakers = dict()
+        self.lock = threading.Lock()
+
+
+    def get(self, key):
+        with self.lock:
+            breaker = self.breakers.get(key)
+            if breaker is None:
+                breaker = self.breakers[key] = CircuitBreaker(self.threshold,
+                                                              self.cooldown)
+            return breaker
+
+
+    def available(self, key):
+        return self.get(key).available()
+
+
+    def acquire(self, key):
+        with self.lock:
+            breaker = self.breakers.get(key)
+            return breaker is None or breaker.acquire()
+
+
+    def remaining(self, key):
+        return self.get(key).remaining()
+
+
+    def success(self, key):
+        self.get(key).success()
+
+
+    def failure(self, key):
+        self.get(key).failure()
+
+
+    def release(self, key):
+        with self.lock:
+            breaker = self.breakers.get(key)
+            if breaker is not None:
+                breaker.release()
+
+
+    def discard(self, key):
+        with self.lock:
+            self.breakers.pop(key, None)
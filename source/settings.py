@@ -65,3 +65,109 @@ TIMEOUT = (4, 4)
 PROXY_COUNT = 20
 PROXY_MAX = 60
 PROXY_PUNISH = PROXY_MAX / 5
+
+
+# 数据流式入库配置变量
+SINK_BATCH_SIZE = 20
+SINK_FLUSH_INTERVAL = 5
+
+
+# 增量爬取配置变量（秒）
+FRESH_WINDOW = 24 * 60 * 60
+LOCATION_TTL = 30 * 24 * 60 * 60
+# 每次爬取最多请求的已爬景点数，None为不限；变化率的先验为每PRIOR_INTERVAL秒变化一次
+RECRAWL_BUDGET = None
+PRIOR_INTERVAL = 7 * 24 * 60 * 60
+
+
+# 原始页面归档配置变量
+ARCHIVE_LEVEL = 6
+
+
+# 响应流式读取配置变量
+MAX_PAGE_SIZE = 2 * 1024 * 1024
+PAGE_CHUNK_SIZE = 16 * 1024
+BAN_MARKERS = (b'/captcha', '访问过于频繁'.encode('utf-8'))
+
+
+# 重试与熔断配置变量
+RETRY_TRIES = 10
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 30
+RETRY_BUDGET = 2000
+PROXY_BREAKER_THRESHOLD = 3
+PROXY_BREAKER_COOLDOWN = 60
+HOST_BREAKER_THRESHOLD = 10
+HOST_BREAKER_COOLDOWN = 30
+
+
+# 自适应超时与对冲请求配置变量
+ADAPTIVE_TIMEOUT = True
+LATENCY_WINDOW = 50
+LATENCY_MIN_SAMPLES = 10
+TIMEOUT_MARGIN = 2
+TIMEOUT_FLOOR = 0.5
+HEDGE_REQUESTS = True
+HEDGE_WORKERS = 4
+
+
+# 代理会话粘滞配置变量
+STICKY_SESSION = False
+STICKY_RUN = 1
+
+
+# 指标与日志配置变量
+# 指标HTTP端口和快照文件默认关闭，需要时设置为例如9108和save_path + '/metrics.prom'
+METRICS_PORT = None
+METRICS_SNAPSHOT = None
+METRICS_INTERVAL = 30
+LOG_LEVEL = 'INFO'
+LOG_RATE = 20
+LOG_PERIOD = 10
+
+
+# 性能分析配置变量
+PROFILE = False
+PROFILE_MODE = 'cprofile'
+
+
+# 内存上限配置变量，超出条数的链接和景点记录溢出到临时文件
+SPILL_LINKS = 100000
+SPILL_RECORDS = 5000
+SPILL_DIR = None
+
+
+# 数据导出配置变量，EXPORT_MODES中的格式在爬取过程中按行组边爬边写
+EXPORT_MODES = ()
+EXPORT_ROW_GROUP = 1000
+
+
+# 数据增量入库配置变量
+SAVE_BATCH_SIZE = 500
+
+
+# 数据库连接池与并发写入配置变量
+SAVER_POOL_SIZE = 4
+SAVER_POOL_TIMEOUT = 60
+SAVER_WORKERS = 2
+
+
+# 空间索引配置变量，网格单元以度为单位，邻近半径以公里为单位
+SPATIAL_CELL = 0.1
+NEARBY_K = 5
+NEARBY_RADIUS = 20.0
+
+
+# 全文索引配置变量，汉字按1到TEXT_NGRAM个字的n-gram切分
+TEXT_FIELDS = ('introduction', 'transInfo', 'ticketsInfo', 'openInfo')
+TEXT_NGRAM = 2
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+# 读缓存配置变量
+QUERY_CACHE_BYTES = 64 * 1024 * 1024
+QUERY_PREFIX_LIMIT = 50
+# 检查数据库中数据版本的间隔秒数，其他进程写入后缓存最多延迟这么久失效；
+# None表示只检查本进程的写入
+QUERY_VERSION_INTERVAL = 5
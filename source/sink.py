@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Define a SaverSink class allows spiders to stream their parsed records straight
+into a BaseSaver backend in micro batches.
+'''
+
+# 导入模块：
+import time
+import logging
+import threading
+
+from metrics import registry as metrics
+from settings import SINK_BATCH_SIZE, SINK_FLUSH_INTERVAL
+
+
+# 全局变量：
+logger = logging.getLogger(__name__)
+
+
+# 类定义：
+class SaverSink(object):
+    # 文档字符串
+    '''
+    SaverSink class buffers spider parsed records and flushes them into a
+    BaseSaver backend whenever the buffer reaches `batch_size` records or
+    `flush_interval` seconds have passed since the last flush.
+
+    :Usage:
+        saver = MafengwoSaver('mongodb')
+        with SaverSink(saver) as sink:
+            spider = MafengwoSpider(sink=sink)
+            spider.run()
+
+    '''
+
+    # 初始化方法
+    def __init__(self, saver, batch_size=SINK_BATCH_SIZE,
+                 flush_interval=SINK_FLUSH_INTERVAL, clean=False, delta=False):
+        # 文档字符串
+        '''
+        Initialize a new instance of the SaverSink.
+
+        :Args:
+         - saver : a :class:`BaseSaver` instance to write records into.
+         - batch_size : an int of records number that triggers a flush.
+         - flush_interval : seconds between two time triggered flushes, None
+           disables the background flusher.
+         - clean : wipes out the old data in the database before the first
+           flush if True.
+         - delta : writes only new and changed records by comparing their
+           content hashes if True. The stored hashes are loaded once, at
+           the first flush, and kept up to date in memory.
+
+        '''
+        # 方法实现
+        self.saver = saver
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.clean = clean
+        self.delta = delta
+        self.stored = None
+        self.buffer = list()
+        self.written = 0
+        self.last_flush = time.time()
+        self.lock = threading.RLock()
+        self.closed = threading.Event()
+        self.flusher = None
+        if self.flush_interval:
+            self.flusher = threading.Thread(target=self._flush_loop,
+                                            name='saver-sink', daemon=True)
+            self.flusher.start()
+
+
+    # 记录写入方法
+    def put(self, item):
+        # 文档字符串
+        '''
+        Buffers a parsed record, flushes the buffer if it is full or stale.
+
+        :Args:
+         - item : a dict of parsed record.
+        '''
+        # 方法实现
+        with self.lock:
+            if self.closed.is_set():
+                raise RuntimeError('SaverSink已关闭，无法写入数据')
+            self.buffer.append(item)
+            if len(self.buffer) >= self.batch_size or self._is_stale():
+                self.flush()
+
+
+    # 缓冲区刷新方法
+    def flush(self):
+        # 文档字符串
+        '''
+        Writes all buffered records into the saver backend.
+        '''
+        # 方法实现
+        with self.lock:
+            self.last_flush = time.time()
+            if not self.buffer:
+                return
+            batch, self.buffer = self.buffer, list()
+            if self.clean:
+                self.saver.data_clean()
+                self.clean = False
+            try:
+                if self.delta:
+                    if self.stored is None:
+                        self.stored = self.saver.stored_hashes()
+                    self.saver.data_sync(batch, tombstone=False, stored=self.stored)
+                    # data_sync只写入批次中第一次出现的记录
+                    self.stored.update((item['poi_id'], item['contentHash'])
+                                       for item in reversed(batch))
+                else:
+                    self.saver.data_write(batch)
+            except Exception:
+                # 写入失败时把数据放回缓冲区，等待下一次刷新
+                self.buffer[:0] = batch
+                raise
+            self.written += len(batch)
+            metrics.inc('sink_flushed_total', len(batch))
+            logger.info('>>> sink flushed %s records, %s in total.', len(batch), self.written)
+
+
+    # 关闭方法
+    def close(self):
+        # 文档字符串
+        '''
+        Flushes the remaining records and stops the background flusher.
+        '''
+        # 方法实现
+        if self.closed.is_set():
+            return
+        with self.lock:
+            self.flush()
+            self.closed.set()
+        if self.flusher:
+            self.flusher.join()
+        if self.delta:
+            self.saver.refresh_nearby()
+        # 流式入库不经过data_save，在这里输出存储阶段的性能分析结果
+        profiler = getattr(self.saver, 'profiler', None)
+        if profiler:
+            profiler.dump()
+
+
+    def _is_stale(self):
+        return (self.flush_interval is not None
+                and time.time() - self.last_flush >= self.flush_interval)
+
+
+    def _flush_loop(self):
+        # 后台定时刷新，保证爬取变慢时数据也能及时入库
+        while not self.closed.wait(self.flush_interval):
+            with self.lock:
+                if self.closed.is_set():
+                    break
+                if self._is_stale():
+                    try:
+                        self.flush()
+                    except Exception as e:
+                        logger.error('>>> sink flush failed: %s', e)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Builds a grid spatial index over crawled resorts' coordinates, answers
+k-nearest and within-radius queries with vectorized NumPy haversine distances,
+and exports the nearby relationships as a lookup file and Neo4j edges.
+'''
+
+# 导入模块：
+import os
+import csv
+import json
+import math
+import logging
+import argparse
+
+import numpy as np
+
+from export import read_records
+from settings import save_path, file_name, SPATIAL_CELL, NEARBY_K, NEARBY_RADIUS
+
+
+# 全局变量：
+logger = logging.getLogger(__name__)
+EARTH_RADIUS = 6371.0088
+# 每度纬度对应的公里数
+KM_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+
+
+# 函数定义：
+def haversine(lat1, lng1, lat2, lng2):
+    # 文档字符串
+    '''
+    Computes great circle distances in kilometers between points given in
+    degrees, arguments are NumPy arrays broadcast against each other.
+    '''
+    # 方法实现
+    lat1, lng1, lat2, lng2 = (np.radians(v) for v in (lat1, lng1, lat2, lng2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+# 类定义：
+class SpatialIndex(object):
+    # 文档字符串
+    '''
+    SpatialIndex class buckets points into a grid of `cell` degrees, so a
+    query only computes distances to points in the cells around it.
+
+    :Usage:
+        index = SpatialIndex.from_records(read_records(path, 'json'))
+        index.nearest(18.23, 109.64, k=5)
+        index.within(18.23, 109.64, radius=10)
+
+    '''
+
+    # 初始化方法
+    def __init__(self, ids, lats, lngs, cell=SPATIAL_CELL):
+        # 文档字符串
+        '''
+        Initialize a new instance of the SpatialIndex.
+
+        :Args:
+         - ids : a sequence of point ids, such as poi ids.
+         - lats : a sequence of latitudes in degrees.
+         - lngs : a sequence of longitudes in degrees.
+         - cell : grid cell size in degrees.
+
+        '''
+        # 方法实现
+        self.ids = np.asarray(ids)
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lngs = np.asarray(lngs, dtype=np.float64)
+        self.cell = cell
+        rows = np.floor(self.lats / cell).astype(np.int64)
+        cols = np.floor(self.lngs / cell).astype(np.int64)
+        self.cells = dict()
+        for index, key in enumerate(zip(rows.tolist(), cols.tolist())):
+            self.cells.setdefault(key, list()).append(index)
+        self.cells = {key: np.array(value) for key, value in self.cells.items()}
+        self.max_lat = float(np.abs(self.lats).max()) if len(self.lats) else 0.0
+        # 数据范围的单元行列边界
+        self.extent = ((int(rows.min()), int(rows.max()), int(cols.min()), int(cols.max()))
+                       if len(self.lats) else None)
+
+
+    @classmethod
+    def from_records(cls, records, cell=SPATIAL_CELL):
+        # 文档字符串
+        '''
+        Builds an index of records' `poi_id`, `lat` and `lng`, records
+        without coordinates or with a poi id seen before are skipped.
+        '''
+        # 方法实现
+        ids, lats, lngs, seen = list(), list(), list(), set()
+        for item in records:
+            if item.get('lat') is None or item.get('lng') is None \
+                    or item.get('poi_id') in seen:
+                continue
+            seen.add(item['poi_id'])
+            ids.append(item['poi_id'])
+            lats.append(float(item['lat']))
+            lngs.append(float(item['lng']))
+        return cls(ids, lats, lngs, cell)
+
+
+    def __len__(self):
+        return len(self.ids)
+
+
+    def key(self, lat, lng):
+        return (math.floor(lat / self.cell), math.floor(lng / self.cell))
+
+
+    def cell_km(self, lat):
+        # 查询点与数据之间网格单元的最小宽度（公里），经度方向随纬度升高而变窄
+        top = min(max(self.max_lat, abs(lat)) + self.cell, 89.0)
+        return self.cell * KM_PER_DEGREE * max(math.cos(math.radians(top)), 0.01)
+
+
+    def bounds(self, key):
+        # 覆盖数据范围所需的最小和最大环数，查询单元可以在数据范围之外
+        row, col = key
+        rmin, rmax, cmin, cmax = self.extent
+        near = max(rmin - row, row - rmax, cmin - col, col - cmax, 0)
+        far = max(abs(row - rmin), abs(row - rmax), abs(col - cmin), abs(col - cmax))
+        return near, far
+
+
+    def ring(self, key, radius):
+        # 返回与给定单元相距不超过radius个单元的所有点的下标
+        row, col = key
+        if (2 * radius + 1) ** 2 > len(self.cells):
+            # 环比数据范围大时直接遍历非空单元
+            found = [members for (r, c), members in self.cells.items()
+                     if abs(r - row) <= radius and abs(c - col) <= radius]
+        else:
+            found = [self.cells[(r, c)]
+                     for r in range(row - radius, row + radius + 1)
+                     for c in range(col - radius, col + radius + 1)
+                     if (r, c) in self.cells]
+        return np.concatenate(found) if found else np.array([], dtype=np.int64)
+
+
+    # 半径查询方法
+    def within(self, lat, lng, radius=NEARBY_RADIUS):
+        # 文档字符串
+        '''
+        Finds the points within `radius` kilometers of a location.
+
+        :Returns:
+         - a list of (id, distance in km) tuples, nearest first.
+        '''
+        # 方法实现
+        if not len(self):
+            return list()
+        key = self.key(lat, lng)
+        cells = math.ceil(radius / self.cell_km(lat))
+        candidates = self.ring(key, min(cells, self.bounds(key)[1]))
+        distances = haversine(lat, lng, self.lats[candidates], self.lngs[candidates])
+        mask = distances <= radius
+        order = np.argsort(distances[mask])
+        return [(self.ids[i].item(), float(d)) for i, d in
+                zip(candidates[mask][order], distances[mask][order])]
+
+
+    # 最近邻查询方法
+    def nearest(self, lat, lng, k=NEARBY_K):
+        # 文档字符串
+        '''
+        Finds the `k` points nearest to a location.
+
+        :Returns:
+         - a list of (id, distance in km) tuples, nearest first.
+        '''
+        # 方法实现
+        if not len(self):
+            return list()
+        lats, lngs = np.array([lat]), np.array([lng])
+        rows = self.batch_nearest(self.key(lat, lng), lats, lngs, k)
+        return rows[0]
+
+
+    def batch_nearest(self, key, lats, lngs, k, exclude=None, radius=None):
+        # 文档字符串
+        '''
+        Finds the `k` nearest points of several locations in the same cell in
+        one distance matrix. The searched ring of cells grows until every
+        location's k-th distance is within the ring, so no closer point can
+        be outside it, or until it covers all the data.
+
+        :Args:
+         - key : a tuple of the locations' cell.
+         - lats, lngs : arrays of the locations' coordinates.
+         - k : an int of neighbors per location.
+         - exclude : an optional array of point indexes, one per location,
+           left out of that location's neighbors.
+         - radius : an optional distance cap in kilometers.
+
+        :Returns:
+         - a list per location of (id, distance in km) tuples, nearest first.
+        '''
+        # 方法实现
+        near, far = self.bounds(key)
+        cell_km = self.cell_km(float(np.abs(lats).max()))
+        ring = max(near, 1)
+        while True:
+            candidates = self.ring(key, ring)
+            distances = haversine(lats[:, None], lngs[:, None],
+                                  self.lats[candidates][None, :],
+                                  self.lngs[candidates][None, :])
+            if exclude is not None:
+                distances[candidates[None, :] == exclude[:, None]] = np.inf
+            count = min(k, len(candidates))
+            kth = (np.partition(distances, count - 1, axis=1)[:, count - 1]
+                   if count else np.full(len(lats), np.inf))
+            covered = ring * cell_km
+            if ring >= far or (count == k and kth.max() <= covered) \
+                    or (radius is not None and radius <= covered):
+                break
+            ring += 1
+
+        result = list()
+        for row in distances:
+            order = np.argsort(row)[:k]
+            result.append([(self.ids[candidates[i]].item(), float(row[i]))
+                           for i in order
+                           if np.isfinite(row[i]) and (radius is None or row[i] <= radius)])
+        return result
+
+
+    # 全量邻近关系计算方法
+    def neighbors(self, k=NEARBY_K, radius=NEARBY_RADIUS):
+        # 文档字符串
+        '''
+        Computes every point's `k` nearest other points within `radius`
+        kilometers, one distance matrix per grid cell.
+
+        :Returns:
+         - a generator of (id, neighbor id, distance in km) tuples.
+        '''
+        # 方法实现
+        for key, members in self.cells.items():
+            rows = self.batch_nearest(key, self.lats[members], self.lngs[members],
+                                      k, exclude=members, radius=radius)
+            for index, row in zip(members, rows):
+                for neighbor, distance in row:
+                    yield self.ids[index].item(), neighbor, distance
+
+
+# 函数定义：
+def build_nearby(name=file_name, fmt='json', k=NEARBY_K, radius=NEARBY_RADIUS,
+                 out_dir=None):
+    # 文档字符串
+    '''
+    Computes nearby relationships of a dumped dataset and writes them as a
+    lookup file `nearby.json` in `save_path`, mapping every poi id to its
+    [neighbor poi id, distance in km] pairs, and as `nearby.csv`, a
+    relationship file for `neo4j-admin import` next to the files of
+    :func:`bulk.build_import_files`.
+
+    :Returns:
+     - a list of (poi id, neighbor poi id, distance in km) edges.
+    '''
+    # 方法实现
+    index = SpatialIndex.from_records(read_records(os.path.join(save_path, name+'.'+fmt), fmt))
+    edges = list(index.neighbors(k, radius))
+    out_dir = out_dir or os.path.join(save_path, 'neo4j-import')
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+
+    lookup = dict()
+    for poi_id, neighbor, distance in edges:
+        lookup.setdefault(str(poi_id), list()).append([neighbor, round(distance, 3)])
+    with open(os.path.join(save_path, 'nearby.json'), 'w', encoding='utf-8') as file:
+        json.dump(lookup, file)
+    with open(os.path.join(out_dir, 'nearby.csv'), 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow([':START_ID(resort)', ':END_ID(resort)', 'distance:float', ':TYPE'])
+        writer.writerows((a, b, round(d, 3), 'nearby') for a, b, d in edges)
+    logger.info('>>> %s nearby edges of %s resorts.', len(edges), len(index))
+    return edges
+
+
+# 测试代码：
+if __name__ == '__main__':
+    from logger import setup_logging
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--name', default=file_name)
+    parser.add_argument('--fmt', default='json')
+    parser.add_argument('--k', type=int, default=NEARBY_K)
+    parser.add_argument('--radius', type=float, default=NEARBY_RADIUS)
+    parser.add_argument('--neo4j', action='store_true',
+                        help='also merge the edges into Neo4j')
+    args = parser.parse_args()
+    setup_logging()
+    edges = build_nearby(args.name, args.fmt, args.k, args.radius)
+    if args.neo4j:
+        from database import MafengwoSaver
+        with MafengwoSaver('neo4j') as saver:
+            saver.graph_nearby(edges)
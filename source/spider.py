@@ -11,15 +11,50 @@ import re
 import json
 import time
 import random
+import logging
+import threading
+from collections import namedtuple, deque
+from contextlib import contextmanager, nullcontext
+from urllib.parse import urlparse, parse_qs
 
 import requests
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from lxml import etree
 from proxy import SpiderProxy
+from record import Resort, content_hash, dump_record, load_resort
+from spill import SpillList, SpillMap
+from export import FORMATS, open_writer, read_records
+from retry import RetryPolicy, BreakerBoard
+from latency import LatencyTracker
+from metrics import registry as metrics
+from profiling import Profiler, profiled
 from requests.exceptions import ProxyError, HTTPError, RequestException, \
                                 Timeout, ReadTimeout, TooManyRedirects
 
-from settings import PROXY_PUNISH, USER_AGENTS, TIMEOUT, save_path, file_name
+from settings import PROXY_PUNISH, USER_AGENTS, TIMEOUT, save_path, file_name, \
+                     BAN_MARKERS, MAX_PAGE_SIZE, PAGE_CHUNK_SIZE, \
+                     HOST_BREAKER_THRESHOLD, HOST_BREAKER_COOLDOWN, \
+                     ADAPTIVE_TIMEOUT, HEDGE_REQUESTS, HEDGE_WORKERS, \
+                     STICKY_SESSION, STICKY_RUN, SPILL_LINKS, SPILL_RECORDS, \
+                     EXPORT_MODES
 # 全局变量定义
+logger = logging.getLogger(__name__)
+
+
+# 异常定义：
+class BadPageError(RequestException):
+    '''
+    Raised while reading a response body which is recognized as a ban page,
+    misses expected markers or exceeds `MAX_PAGE_SIZE`.
+    '''
+
+
+# 爬取任务定义：所属阶段、链接和请求参数
+Task = namedtuple('Task', ('stage', 'url', 'params'))
+
+
+def load_task(line):
+    return Task(*json.loads(line))
 
 
 # 类定义：
@@ -30,13 +65,39 @@ class BaseSpider(object):
     '''
     BaseSpider class allows users to fetch all data from different websites.
 
+    It is a site agnostic crawl engine, a site spider only declares its page
+    stages in `PAGES`, its seed tasks in :meth:`seeds`, and the validators
+    and parsers named by `PAGES`. Stages are crawled in declaration order,
+    a parser returns the records of a page and the :class:`Task` of pages to
+    crawl in later stages. Retries, proxies, circuit breakers and failure
+    accounting are handled by the engine.
+
     :Usage:
+        class SiteSpider(BaseSpider):
+            PAGES = {
+                'list': {'validate': 'valid_list', 'parse': 'parse_list'},
+                'item': {'validate': 'valid_item', 'parse': 'parse_item',
+                         'hedge': True},
+            }
+
+            def seeds(self, pages):
+                for page in range(1, pages+1):
+                    yield Task('list', self.list_url, {'p': page})
+
+        SiteSpider().run(10)
 
     '''
     # 类静态成员定义
-    SAVE_MODES = ('json', 'txt')
+    SAVE_MODES = ('json', 'txt') + FORMATS
+    # 导出的字段顺序，None表示取第一条记录的字段
+    FIELDS = None
+    # 页面阶段：校验方法名、解析方法名，以及可选的host_key、expect、hedge和sticky请求选项
+    PAGES = dict()
+    # 连续失败超过该次数时认为网络不可用
+    MAX_FAILURES = 10
     # 初始化方法
-    def __init__(self, area_name='海南'):
+    def __init__(self, area_name='海南', archive=None, profiler=None,
+                 load_record=json.loads):
         # 文档字符串
         '''
         Initialize a new instance of the BaseSpider.
@@ -44,14 +105,240 @@ class BaseSpider(object):
         :Args:
          - area_name : a str of Chinese area name which data are located
          in.
+         - archive : an optional :class:`PageArchive` which every fetched
+         response body is appended into.
+         - profiler : an optional :class:`Profiler`, defaults to one enabled
+         by the `PROFILE` setting.
+         - load_record : a function restoring a record spilled to disk from
+         its JSON line.
 
         '''
         # 方法实现
         self.area_name = area_name
-        self.data = list()
+        self.file_name = file_name
+        # 超出内存上限的记录溢出到临时文件
+        self.data = SpillList(SPILL_RECORDS, dump_record, load_record)
+        # 每个阶段待爬取的任务
+        self.frontier = {stage: SpillList(SPILL_LINKS, json.dumps, load_task)
+                         for stage in self.PAGES}
+        self.failures = 0
+        # 边爬边写的导出格式和已打开的导出写入器
+        self.export_modes = EXPORT_MODES
+        self.exports = dict()
+        # 没有固定字段时，导出文件等到第一条记录再打开
+        self.export_paths = dict()
+        self.archive = archive
+        # 全局重试预算和按主机的熔断器
+        self.retry = RetryPolicy()
+        self.host_breakers = BreakerBoard(HOST_BREAKER_THRESHOLD,
+                                          HOST_BREAKER_COOLDOWN)
+        # 按代理统计的延迟，用于自适应超时和对冲请求
+        self.latency = LatencyTracker()
+        self.adaptive_timeout = ADAPTIVE_TIMEOUT
+        self.hedge_requests = HEDGE_REQUESTS
+        self.hedge_pool = None
+        # 每个代理一个连接池会话，粘滞模式下同一组请求复用同一个代理
+        self.sessions = dict()
+        # 对冲请求的工作线程也会取用会话
+        self.session_lock = threading.Lock()
+        self.sticky = STICKY_SESSION
+        self.sticky_run = STICKY_RUN
+        self.sticky_proxy = None
+        self.sticky_active = False
+        self.sticky_uses = 0
+        self.profiler = profiler or Profiler()
+        # 爬虫代理在第一次使用时才初始化，离线解析不会访问代理池
+        self._proxyer = None
+
+
+    @property
+    def proxyer(self):
+        if self._proxyer is None:
+            self._proxyer = SpiderProxy()
+        return self._proxyer
+
+
+    # 资源共享方法
+    def share(self, spider):
+        # 文档字符串
+        '''
+        Makes this spider use another spider's proxy pool, pooled sessions,
+        proxy latencies, host circuit breakers, retry budget and hedging
+        threads, so both are throttled as one crawler.
+
+        :Args:
+         - spider : a :class:`BaseSpider` to share resources with.
+        '''
+        # 方法实现
+        self._proxyer = spider.proxyer
+        self.sessions = spider.sessions
+        self.session_lock = spider.session_lock
+        self.latency = spider.latency
+        self.host_breakers = spider.host_breakers
+        self.retry = spider.retry
+        if spider.hedge_pool is None:
+            spider.hedge_pool = ThreadPoolExecutor(HEDGE_WORKERS)
+        self.hedge_pool = spider.hedge_pool
+
+
+    # 爬虫主程序
+    def run(self, *args):
+        # 文档字符串
+        '''
+        Main spider method, crawls every stage's pages starting from the seed
+        tasks, then dumps the data.
+
+        :Args:
+         - *args : arguments passed to :meth:`seeds`.
+        '''
+        # 方法实现
+        self.prepare()
+        # 导出文件在爬取过程中按行组写入，异常退出时也要写完文件尾
+        self.open_exports()
+        try:
+            self.crawl(*args)
+        finally:
+            self.close_exports()
+        self.finish()
+
+
+    def prepare(self):
+        pass
 
-        # 初始化爬虫代理
-        self.proxyer = SpiderProxy()
+
+    def finish(self):
+        self.dump_data('json')
+        self.profiler.dump()
+
+
+    # 种子任务方法
+    def seeds(self, *args):
+        # 文档字符串
+        '''
+        Generates the first tasks of a crawl, subclasses yield :class:`Task`.
+        '''
+        return ()
+
+
+    # 任务调度方法
+    def schedule(self, stage, tasks):
+        # 文档字符串
+        '''
+        Orders a stage's tasks once all of them are known, crawl order by
+        default.
+
+        :Returns:
+         - an iterable of tasks.
+        '''
+        return tasks
+
+
+    # 任务跳过方法
+    def skip(self, task):
+        # 文档字符串
+        '''
+        Decides whether a task is crawled, subclasses return a list of outputs
+        to use instead of fetching the page, such as cached records, or None
+        to fetch it.
+        '''
+        return None
+
+
+    def tasks(self, *args):
+        # 文档字符串
+        '''
+        Generates the tasks of a crawl in order, a stage's tasks are generated
+        after all tasks of the previous stages were stepped.
+
+        :Args:
+         - *args : arguments passed to :meth:`seeds`.
+        '''
+        # 方法实现
+        for task in self.seeds(*args):
+            self.frontier[task.stage].append(task)
+        for stage in self.PAGES:
+            yield from self.schedule(stage, self.frontier[stage])
+
+
+    def crawl(self, *args):
+        for task in self.tasks(*args):
+            if not self.step(task):
+                break
+
+
+    # 任务执行方法
+    def step(self, task):
+        # 文档字符串
+        '''
+        Crawls a task: fetches and validates its page, parses it, collects the
+        parsed records and queues the parsed tasks.
+
+        :Returns:
+         - a bool of whether the crawl should go on.
+
+        :Raises:
+         - ValueError : if more than `MAX_FAILURES` tasks failed in a row, or
+           the retry budget is exhausted.
+        '''
+        # 方法实现
+        outputs = self.skip(task)
+        if outputs is None:
+            logger.debug('>>>> getting %s page: %s', task.stage, task.url)
+            outputs = self.fetch_task(task)
+            if outputs is None:
+                return self.failed(task)
+            logger.info('>>>> Success getting %s %s.', task.stage, task.url)
+            self.failures = 0
+        stages = list(self.PAGES)
+        for output in outputs:
+            if isinstance(output, Task):
+                if stages.index(output.stage) <= stages.index(task.stage):
+                    raise RuntimeError(f'{task.stage}阶段只能生成后续阶段的任务')
+                self.frontier[output.stage].append(output)
+            else:
+                self.collect(output)
+        return True
+
+
+    def fetch_task(self, task):
+        # 文档字符串
+        '''
+        Fetches a task's page with the options of its stage in `PAGES`, and
+        parses it inside the same sticky session. Tasks are timed as metrics
+        rather than profiler stages, so the profiled stages inside them keep
+        their own profiles.
+
+        :Returns:
+         - a list of the parser's outputs, or None if the page can't be
+           fetched.
+        '''
+        # 方法实现
+        page = self.PAGES[task.stage]
+        session = self.sticky_session() if page.get('sticky') else nullcontext()
+        with metrics.timer('task_seconds', stage=task.stage), session:
+            content = self.fetch_page('GET', task.url, getattr(self, page['validate']),
+                                      host_key=page.get('host_key'), params=task.params,
+                                      expect=page.get('expect', ()),
+                                      hedge=page.get('hedge', False), timeout=TIMEOUT)
+            return getattr(self, page['parse'])(content) if content else None
+
+
+    def failed(self, task):
+        logger.warning('>>>> Failure getting %s %s.', task.stage, task.url)
+        # 重试预算用完后剩下的任务都会失败，不能把不完整的数据当作全量数据导出
+        if self.retry.exhausted():
+            raise ValueError('NetWork Unavailable! Retry budget exhausted.')
+        # 防止网络不可靠情况下，爬虫一直运行下去：
+        self.failures += 1
+        if self.failures > self.MAX_FAILURES:
+            raise ValueError('NetWork Unavailable!')
+        return True
+
+
+    # 数据收集方法
+    def collect(self, item):
+        self.data.append(item)
+        self.export(item)
 
 
     # HTTP请求头配置方法
@@ -61,102 +348,536 @@ class BaseSpider(object):
 
     #  HTTP请求代理配置方法
     def config_proxy(self):
-        self.proxy_url = self.proxyer.pop_proxy()
-        print('> proxy:', self.proxy_url)
+        # 粘滞会话中优先复用当前代理，直到它失败
+        if self.sticky_active and self.sticky_proxy:
+            self.proxy_url = self.proxyer.reuse_proxy(self.sticky_proxy)
+            if self.proxy_url is None:
+                self.release_sticky()
+        if not (self.sticky_active and self.sticky_proxy):
+            self.proxy_url = self.proxyer.pop_proxy()
+            if self.sticky_active:
+                self.sticky_proxy, self.sticky_uses = self.proxy_url, 0
+        logger.debug('> proxy: %s', self.proxy_url)
+        return self.proxy_dict(self.proxy_url)
+
+
+    # 粘滞会话方法
+    @contextmanager
+    def sticky_session(self):
+        # 文档字符串
+        '''
+        Routes all requests made inside the context through the same proxy and
+        its pooled connection until the proxy fails. The proxy is kept for
+        `sticky_run` consecutive sessions. Does nothing unless `sticky` is on.
+
+        :Usage:
+            with spider.sticky_session():
+                html = spider.request_html('GET', url)
+                ...
+        '''
+        # 方法实现
+        if not self.sticky:
+            yield
+            return
+        self.sticky_active = True
+        try:
+            yield
+        finally:
+            self.sticky_active = False
+            self.sticky_uses += 1
+            if self.sticky_uses >= self.sticky_run:
+                self.release_sticky()
+
+
+    def release_sticky(self):
+        self.sticky_proxy, self.sticky_uses = None, 0
+
+
+    # 连接池会话方法
+    def session_for(self, proxy_url):
+        # 文档字符串
+        '''
+        Returns the pooled :class:`requests.Session` of given proxy, so
+        consecutive requests through a proxy reuse its kept-alive connection.
+        Sessions of proxies removed from the pool are closed. Thread safe.
+        '''
+        # 方法实现
+        with self.session_lock:
+            session = self.sessions.get(proxy_url)
+            if session is None:
+                for url in [u for u in self.sessions if u not in self.proxyer.counter]:
+                    self.sessions.pop(url).close()
+                session = self.sessions[proxy_url] = requests.Session()
+                session.proxies = self.proxy_dict(proxy_url)
+            return session
+
+
+    @staticmethod
+    def proxy_dict(proxy_url):
         return {
-            'http': 'http://' + self.proxy_url,
-            'https': 'https://' + self.proxy_url
+            'http': 'http://' + proxy_url,
+            'https': 'https://' + proxy_url
          }
 
 
 
     # 数据存储方法
-    def dump_data(self, save_mode='json'):
+    def dump_data(self, save_mode='json', name=None):
         # 文档字符串
         '''
         Dump spider fetched data into a file specified by `save_mode` para.
 
         :Args:
-         - save_mode : file type to save spider fectched data.
+         - save_mode : file type to save spider fectched data, `json`, `txt`
+           or one of the export formats `jsonl.gz`, `csv`, `tsv`, `parquet`
+           and `arrow`.
+         - name : a str of file name without extension, defaults to
+           `self.file_name`.
 
         '''
         # 方法实现
+        name = name or self.file_name
         if save_mode not in self.SAVE_MODES:
-            raise RuntimeError('存储模式指定有误，请输入txt、json')
+            raise RuntimeError('存储模式指定有误，请输入txt、json、jsonl.gz、csv、tsv、parquet或者arrow')
         # create json file object:
         if not os.path.exists(save_path):
             os.makedirs(save_path)
-        file_path = os.path.join(save_path, file_name+'.'+save_mode)
+        file_path = os.path.join(save_path, name+'.'+save_mode)
         if save_mode == 'json':
+            # 逐条写出，不在内存中拼出整个数组
             with open(file_path, 'w', encoding='utf-8') as file:
-                json.dump(self.data, file, ensure_ascii=False)
+                file.write('[')
+                for index, item in enumerate(self.data):
+                    file.write((', ' if index else '') + dump_record(item))
+                file.write(']')
+        elif save_mode in FORMATS:
+            with open_writer(save_mode, file_path, self.export_fields()) as writer:
+                for item in self.data:
+                    writer.write(item)
         else:
             # 此处可以拓展其他文件存储类型
             pass
 
 
+    # 边爬边导出方法
+    def open_exports(self, save_modes=None, name=None):
+        # 文档字符串
+        '''
+        Opens a writer of every given export format, records passed to
+        :meth:`export` are written in row groups while the crawl runs.
+
+        Without `FIELDS` the writers are opened at the first exported record,
+        whose keys become the columns.
+
+        :Args:
+         - save_modes : a sequence of export formats, defaults to
+           `self.export_modes`.
+         - name : a str of file name without extension, defaults to
+           `self.file_name`.
+
+        '''
+        # 方法实现
+        name = name or self.file_name
+        if not os.path.exists(save_path):
+            os.makedirs(save_path)
+        for save_mode in save_modes or self.export_modes:
+            self.export_paths[save_mode] = os.path.join(save_path, name+'.'+save_mode)
+        if self.FIELDS:
+            self.open_writers(self.FIELDS)
+
+
+    def open_writers(self, fields):
+        for save_mode, file_path in self.export_paths.items():
+            self.exports[save_mode] = open_writer(save_mode, file_path, fields)
+        self.export_paths = dict()
+
+
+    def export(self, item):
+        if self.export_paths:
+            self.open_writers(self.export_fields(item))
+        for writer in self.exports.values():
+            writer.write(item)
+
+
+    def close_exports(self):
+        for writer in self.exports.values():
+            writer.close()
+        self.exports = dict()
+        self.export_paths = dict()
+
+
+    def export_fields(self, item=None):
+        if self.FIELDS:
+            return self.FIELDS
+        return list((item or next(iter(self.data), {})).keys())
+
+
+    # 数据读取方法
+    def load_data(self):
+        # 文档字符串
+        '''
+        Reads the data dumped by the last crawl in json format one record at
+        a time.
+
+        :Returns:
+         - an iterable of records, empty if nothing has been dumped yet.
+        '''
+        # 方法实现
+        file_path = os.path.join(save_path, self.file_name+'.json')
+        if not os.path.exists(file_path):
+            return ()
+        return read_records(file_path, 'json')
+
+
+    # 页面元数据方法
+    def page_meta(self, url):
+        # 文档字符串
+        '''
+        Describes a fetched page for the archive index, subclasses return a
+        dict with `poi_id` and `kind` keys.
+
+        :Args:
+         - url : a str of fetched page's url.
+        '''
+        return dict()
+
+
     # HTTP请求页面方法
-    def request_html(self, method, url, **kwargs):
+    @profiled('request_html')
+    def request_html(self, method, url, expect=(), hedge=False, **kwargs):
         # 文档字符串
         '''
-        Requests website's HTML source code.
+        Requests website's HTML source code once, retries are left to
+        :meth:`fetch_page`.
 
-        If Timeout, ProxyError, HTTPError, ReadTimeout, TooManyRedirects
-        exception occured, retries HTTP Request 10 times; If retry exceeded 10
-        times or other exceptions occured, return None.
+        The response body is read as a stream and checked incrementally, the
+        request is aborted as soon as a ban marker shows up or the body
+        exceeds `MAX_PAGE_SIZE`, and fails if any expected marker is missing.
+        With `hedge`, a second request goes out through another proxy once the
+        first one runs past the observed p95 latency, the first response wins.
+        Requests to a broken host wait for its cooldown.
 
         :Args:
          - method : method for new HTTP Requests supported by the :class`Request`
            object in `requests` module.
          - url : URL for new HTTP Requests supported by the :class`Request` object
            in `requests` module.
+         - expect : a tuple of bytes markers the response body must contain.
+         - hedge : a bool of whether to hedge the request if hedging is enabled.
          - **kwargs : key words arguments supported by the :class:`Request` object
            in `requests` module.
 
         :Returns:
-         - html : a :class:`Response` if request suceeded or None if exceptions
-           occured.
+         - html : a :class:`Response`.
+
+        :Raises:
+         - RequestException : if the request failed or the page is bad.
+
+        '''
+        # 方法实现
+        self.wait_host(urlparse(url).netloc)
+        self.config_proxy()
+        if hedge and self.hedge_requests:
+            response = self.hedged_request(method, url, self.proxy_url,
+                                           expect, **kwargs)
+        else:
+            response = self.send_request(method, url, self.proxy_url,
+                                         expect, **kwargs)
+        self.proxy_url = response.proxy_url
+        logger.debug('>> Request Webpage Success.')
+        return response
+
+
+    # 单次请求方法
+    def send_request(self, method, url, proxy_url, expect=(), **kwargs):
+        # 文档字符串
+        '''
+        Sends a single HTTP Request through given proxy and reads its body,
+        with a timeout derived from the proxy's observed latencies if adaptive
+        timeout is enabled.
+
+        Records the proxy's latencies and success, or punishes the proxy if
+        any exception occured.
+
+        :Args:
+         - method : method for new HTTP Requests.
+         - url : URL for new HTTP Requests.
+         - proxy_url : a str of proxy url composed of ip and port.
+         - expect : a tuple of bytes markers the response body must contain.
+         - **kwargs : key words arguments supported by the :class:`Request` object
+           in `requests` module.
+
+        :Returns:
+         - response : a :class:`Response` with an extra `proxy_url` attribute.
+
+        :Raises:
+         - RequestException : if the request failed or the page is bad.
+        '''
+        # 方法实现
+        kwargs['timeout'] = self.request_timeout(proxy_url, kwargs.get('timeout'))
+        try:
+            response, elapsed = self.transfer(self.session_for(proxy_url), method, url,
+                                              proxy_url, expect, **kwargs)
+        except RequestException as e:
+            self.request_failed(url, proxy_url, e)
+            raise
+        return self.request_done(url, proxy_url, response, elapsed)
+
+
+    def request_timeout(self, proxy_url, timeout=None):
+        timeout = timeout or TIMEOUT
+        if self.adaptive_timeout:
+            timeout = self.latency.timeout(proxy_url, timeout)
+        return timeout
+
+
+    # 请求传输方法
+    def transfer(self, session, method, url, proxy_url, expect=(), **kwargs):
+        # 文档字符串
+        '''
+        Sends a request through a proxy's session and reads its body. Changes
+        no spider or proxy state, so it can run on hedge worker threads.
+
+        :Returns:
+         - a tuple of the :class:`Response` and its wall time in seconds.
+
+        :Raises:
+         - RequestException : if the request failed or the page is bad.
+        '''
+        # 方法实现
+        start = time.time()
+        response = session.request(method, url, proxies=self.proxy_dict(proxy_url),
+                                   stream=True, **kwargs)
+        # print(response.encoding)
+        response.raise_for_status()
+        self.read_body(response, expect)
+        return response, time.time() - start
+
+
+    def request_failed(self, url, proxy_url, error):
+        host = urlparse(url).netloc
+        metrics.inc('fetch_total', stage=self.page_meta(url).get('kind') or 'page',
+                    host=host, proxy=proxy_url, result=type(error).__name__)
+        self.punish_proxy(host, proxy_url)
+
+
+    def request_done(self, url, proxy_url, response, elapsed):
+        # 文档字符串
+        '''
+        Records a successful request's latencies and metrics, closes the
+        proxy's and the host's circuit breakers and archives the page.
+
+        :Returns:
+         - response : the :class:`Response` with an extra `proxy_url` attribute.
+        '''
+        # 方法实现
+        host = urlparse(url).netloc
+        stage = self.page_meta(url).get('kind') or 'page'
+        self.latency.record(proxy_url, response.elapsed.total_seconds(), elapsed)
+        metrics.inc('fetch_total', stage=stage, host=host, proxy=proxy_url,
+                    result='ok')
+        metrics.inc('fetch_bytes_total', len(response.content), stage=stage)
+        metrics.observe('fetch_seconds', elapsed, stage=stage, host=host)
+        metrics.observe('proxy_fetch_seconds', elapsed, proxy=proxy_url)
+        self.proxyer.breakers.success(proxy_url)
+        self.host_breakers.success(host)
+        response.encoding = 'utf-8'
+        response.proxy_url = proxy_url
+        if self.archive:
+            self.archive.append(response.url, response.content,
+                                status=response.status_code, proxy=proxy_url,
+                                **self.page_meta(response.url))
+        return response
+
+
+    # 对冲请求方法
+    def hedged_request(self, method, url, proxy_url, expect=(), **kwargs):
+        # 文档字符串
+        '''
+        Sends a request through `proxy_url`, and if it hasn't finished after
+        the observed p95 latency, sends the same request through another
+        proxy. The first successful response wins.
+
+        Worker threads only transfer the requests, proxy, breaker and sticky
+        state is updated here for the requests that finished before the
+        winner; the losing request finishes in the background unrecorded,
+        and gives back its proxy's half-open breaker trial if it held one.
+
+        Falls back to a single request until enough latencies are observed.
+
+        :Returns:
+         - response : a :class:`Response` with an extra `proxy_url` attribute.
+
+        :Raises:
+         - RequestException : if all sent requests failed.
+        '''
+        # 方法实现
+        delay = self.latency.hedge_delay()
+        if delay is None:
+            return self.send_request(method, url, proxy_url, expect, **kwargs)
+        if self.hedge_pool is None:
+            self.hedge_pool = ThreadPoolExecutor(HEDGE_WORKERS)
+
+        timeout = kwargs.pop('timeout', None)
+        def submit(proxy):
+            return self.hedge_pool.submit(self.transfer, self.session_for(proxy), method,
+                                          url, proxy, expect,
+                                          timeout=self.request_timeout(proxy, timeout),
+                                          **kwargs)
+        futures = {submit(proxy_url): proxy_url}
+        done, pending = wait(futures, timeout=delay)
+        if not done:
+            # 备用代理不能和第一个请求的代理相同
+            backup = self.proxyer.pop_proxy(exclude=proxy_url)
+            if backup is not None:
+                logger.debug('> hedging through proxy: %s', backup)
+                metrics.inc('hedged_total', host=urlparse(url).netloc)
+                futures[submit(backup)] = backup
+            pending = set(futures)
+        error = None
+        while True:
+            for future in done:
+                proxy = futures.pop(future)
+                if future.exception() is None:
+                    # 较慢的请求在后台自然结束，结果直接丢弃，但要交还熔断器的试探机会
+                    for loser in futures.values():
+                        self.proxyer.breakers.release(loser)
+                    return self.request_done(url, proxy, *future.result())
+                error = future.exception()
+                self.request_failed(url, proxy, error)
+            if not pending:
+                raise error
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+
+    # 页面获取方法
+    def fetch_page(self, method, url, validate, host_key=None, **kwargs):
+        # 文档字符串
+        '''
+        Requests a page and validates its content. This is the only place
+        requests are retried.
+
+        If Timeout, ProxyError, HTTPError, ReadTimeout, TooManyRedirects
+        exception occured, a bad page is recognized or validation fails,
+        retries HTTP Request with another proxy after an exponential backoff,
+        as long as the retry policy allows; If retries are exhausted or other
+        exceptions occured, return None. Failures are recorded in the proxy's
+        and the host's circuit breakers.
+
+        :Args:
+         - method : method for new HTTP Requests.
+         - url : URL for new HTTP Requests.
+         - validate : a function taking the :class:`Response` and returning
+           the extracted content, or a falsy value if the page is wrong, such
+           as a ban page.
+         - host_key : a key passed to `config_header` to build fresh headers
+           for every try.
+         - **kwargs : key words arguments passed to `request_html`.
 
+        :Returns:
+         - the value returned by `validate`, or None if the page can't be
+           fetched.
         '''
         # 方法实现
-        # html = None
-        error = False
+        host = urlparse(url).netloc
         num = 1
         while True:
+            if host_key is not None:
+                kwargs['headers'] = self.config_header(host_key)
             try:
-                response = requests.request(method, url,
-                                            proxies=self.config_proxy(),
-                                            **kwargs)
-                # print(response.encoding)
-                response.raise_for_status()
-                response.encoding = 'utf-8'
-                # html = response
-                print('>> Request Webpage Success.')
+                content = validate(self.request_html(method, url, **kwargs))
+                if content:
+                    return content
+                # 走到这里的时候说明代理ip被禁了，换新ip重新请求一次
+                metrics.inc('bad_pages_total', host=host, proxy=self.proxy_url)
+                self.punish_proxy(host)
+                raise BadPageError('wrong page content')
             except (Timeout, ProxyError, HTTPError,
-                    ReadTimeout, TooManyRedirects) as e:
-
-                print('>> Exceptions Occured:', e)
-                print(f'>> Retries {num} times.')
-                response = None
-                self.proxyer.counter[self.proxy_url] -= PROXY_PUNISH
-                num += 1
-                if num > 10:
-                    print('>> Exceed maximum retry times.')
+                    ReadTimeout, TooManyRedirects, BadPageError) as e:
+                logger.info('>> Exceptions Occured: %s', e)
+                if not self.retry.backoff(num):
+                    logger.warning('>> Exceed maximum retry times: %s', url)
                     # 日志记录
-                    error = True
+                    return None
+                logger.debug('>> Retries %s times.', num)
+                metrics.inc('retries_total', host=host)
+                num += 1
             except RequestException as e:
-                print('>> Exception Occured:', e)
+                logger.warning('>> Exception Occured: %s', e)
                 # 日志记录
-                response = None
-                self.proxyer.counter[self.proxy_url] -= PROXY_PUNISH
-                error = True
-            finally:
-                if response or error:   # 原来的response是html
-                    break
-                # timeout retry pause.
-                # time.sleep(1)
-                # time.sleep(random.randint(1,3))
-        return response
+                return None
+
+
+    # 代理惩罚方法
+    def punish_proxy(self, host=None, proxy_url=None):
+        # 文档字符串
+        '''
+        Punishes a proxy, the current one by default, and records a failure in
+        its circuit breaker and in the host's one.
+        '''
+        # 方法实现
+        proxy_url = proxy_url or self.proxy_url
+        if proxy_url == self.sticky_proxy:
+            self.release_sticky()
+        # 对冲请求可能在代理被删除后才失败
+        if proxy_url in self.proxyer.counter:
+            self.proxyer.counter[proxy_url] -= PROXY_PUNISH
+        self.proxyer.breakers.failure(proxy_url)
+        if host:
+            self.host_breakers.failure(host)
+
+
+    # 主机熔断等待方法
+    def wait_host(self, host):
+        # 文档字符串
+        '''
+        Sleeps until the host's circuit breaker lets a request through.
+        '''
+        # 方法实现
+        while not self.host_breakers.acquire(host):
+            wait = self.host_breakers.remaining(host) or 1
+            logger.warning('>> host %s is broken, waiting %.1fs.', host, wait)
+            time.sleep(wait)
+
+
+    # 响应体读取方法
+    def read_body(self, response, expect=()):
+        # 文档字符串
+        '''
+        Reads a streamed response body chunk by chunk and checks it at byte
+        level before anything is decoded.
+
+        :Args:
+         - response : a streamed :class:`Response`.
+         - expect : a tuple of bytes markers the body must contain.
+
+        :Raises:
+         - BadPageError : if a ban marker is found, the body is too large or
+           an expected marker is missing. The connection is closed at once.
+        '''
+        # 方法实现
+        chunks, size, tail = list(), 0, b''
+        pending = set(expect)
+        # 保留上一块的末尾，防止标记被切分在两块之间
+        keep = max(map(len, BAN_MARKERS + tuple(expect)), default=1) - 1
+        try:
+            for chunk in response.iter_content(PAGE_CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_PAGE_SIZE:
+                    raise BadPageError(f'page exceeds {MAX_PAGE_SIZE} bytes')
+                window = tail + chunk
+                for marker in BAN_MARKERS:
+                    if marker in window:
+                        raise BadPageError(f'ban marker {marker!r} found')
+                pending = {m for m in pending if m not in window}
+                tail = window[-keep:] if keep else b''
+                chunks.append(chunk)
+            if pending:
+                raise BadPageError(f'markers {sorted(pending)!r} missing')
+        except BadPageError:
+            response.close()
+            raise
+        response._content = b''.join(chunks)
 
 
 # 马蜂窝旅游爬虫子类：
@@ -176,16 +897,54 @@ class MafengwoSpider(BaseSpider):
     key_convert = {
         "交通": "transInfo", "门票": "ticketsInfo", "开放时间": "openInfo",
      }
+    # 各类页面必须包含的字节标记，用于流式读取时提前识别封禁页面
+    search_markers = (b'att-list',)
+    resort_markers = (b'row row-top', b'data-anchor="overview"')
+    location_markers = (b'controller_data',)
+    FIELDS = Resort.FIELDS
+    # 先爬取搜索页面得到景点链接，再爬取景点页面；景点页面和坐标接口走同一个代理
+    PAGES = {
+        'search': {'validate': 'valid_search', 'parse': 'parse_search',
+                   'host_key': 'www', 'expect': search_markers},
+        'resort': {'validate': 'valid_resort', 'parse': 'parse_page',
+                   'host_key': 'www', 'expect': resort_markers,
+                   'hedge': True, 'sticky': True},
+    }
 
 
     # 初始化方法
-    def __init__(self, area_name='海南'):
-        super(MafengwoSpider, self).__init__(area_name)
-        self.links = list()
+    def __init__(self, area_name='海南', sink=None, freshness=None,
+                 locations=None, archive=None, profiler=None, indexer=None):
+        # 文档字符串
+        '''
+        Initialize a new instance of the MafengwoSpider.
+
+        :Args:
+         - area_name : a str of Chinese area name which resorts are located in.
+         - sink : an optional :class:`SaverSink` which parsed resorts are
+           pushed into as soon as they are crawled.
+         - freshness : an optional :class:`FreshnessIndex`, resorts crawled
+           within its window, or beyond its request budget, are taken from
+           the last dumped data instead of being fetched again.
+         - locations : an optional :class:`LocationCache` consulted before
+           requesting the location API.
+         - archive : an optional :class:`PageArchive` which every fetched
+           response body is appended into.
+         - profiler : an optional :class:`Profiler` timing crawl stages.
+         - indexer : an optional :class:`TextIndex` which parsed resorts are
+           indexed into as soon as they are crawled.
+
+        '''
+        # 方法实现
+        super(MafengwoSpider, self).__init__(area_name, archive, profiler, load_resort)
+        self.sink = sink
+        self.freshness = freshness
+        self.locations = locations
+        self.indexer = indexer
 
 
     # 爬虫主程序
-    def run(self):
+    def run(self, pStart=1, pEnd=50):
         # 文档字符串
         '''
         Main spider method of MafengwoSpider.
@@ -193,55 +952,192 @@ class MafengwoSpider(BaseSpider):
         Fetches all resorts links, parses every resort website according to their
         links then packes all dictionary formatted resorts' info data into a data
         list.
+
+        :Args:
+         - pStart : An int of starting search page.
+         - pEnd : An int of ending search page.
         '''
-        # error counter variable
-        start = time.time()
-        num = 1
         # 方法实现
-        self.get_links()
-        for link in self.links:
-            print(f'>>>> getting resorts webpage:', link)
-            html = self.request_html('GET', link, timeout=TIMEOUT,
-                                     headers=self.config_header('www'))
-            # time.sleep(1)
-            # time.sleep(random.randint(1,3))
-            if html:
-                while True:
-                    test = etree.HTML(html.text).xpath(('//div[@class="row row-top" '
-                                                        'or @data-anchor="overview"]'))
-                    if len(test) == 2:
-                        print(f'>>>> Success getting resort {link}.')
-                        self.data.append(self.parse_resort(html.text))
-                        break
-                    # 走到这里的时候说明代理ip被禁了，换新ip重新请求一次
-                    # 相信代理ip池中一定有可靠ip，因此不会出现死循环
-                    self.proxyer.counter[self.proxy_url] -= PROXY_PUNISH
-                    print('>>>> getting wrong resort content. Retries again!')
-                    html = self.request_html('GET', link, timeout=TIMEOUT,
-                                             headers=self.config_header('www'))
-            else:
-                print(f'>>>> Failure getting resort {link}.')
-                # 防止网络不可靠情况下，爬虫一直运行下去：
-                if num == 1:
-                    num += 1
-                    lastLink = self.links.index(link)
-                else:
-                    if self.links.index(link) != lastLink + 1:
-                        num = 1
-                    elif num <= 10:
-                        num += 1
-                        lastLink = self.links.index(link)
-                    else:
-                        raise ValueError('NetWork Unavailable!')
-        print(len(self.links))
-        print(len(self.data))
-        end = time.time()
-        print(end-start)
+        super(MafengwoSpider, self).run(pStart, pEnd)
 
-        self.dump_data('json')
-        # print(self.data)
-        # print(len(self.links))
-        # print(len(self.data))
+
+    def prepare(self):
+        self.started = time.time()
+        self.previous, self.budget = SpillMap(dump_record, load_resort), None
+        if self.freshness:
+            # 最近爬取过的景点直接沿用上次的数据，其余按变化的可能性排序；
+            # 上次的数据存在临时文件中，内存中只保留poi_id和偏移量
+            self.previous.update((item['poi_id'], item) for item in self.load_data())
+            self.budget = self.freshness.budget
+
+
+    def finish(self):
+        logger.info('>>>> crawled %s resorts of %s links in %.1fs.',
+                    len(self.data), len(self.frontier['resort']), time.time()-self.started)
+        if self.sink:
+            self.sink.flush()
+        if self.indexer:
+            self.indexer.flush()
+        super(MafengwoSpider, self).finish()
+
+
+    # 种子任务方法
+    def seeds(self, pStart=1, pEnd=50):
+        # 文档字符串
+        '''
+        Generates the search page tasks of given pages.
+
+        :Args:
+         - pStart : An int of starting search page.
+         - pEnd : An int of ending search page.
+        '''
+        # 方法实现
+        for page in range(pStart, pEnd+1):
+            yield Task('search', self.base_url, {'p': page, 'q': self.area_name})
+
+
+    # 任务调度方法
+    def schedule(self, stage, tasks):
+        if stage == 'resort' and self.freshness:
+            return self.freshness.order(tasks, key=lambda task: self.link_poi_id(task.url))
+        return tasks
+
+
+    # 任务跳过方法
+    def skip(self, task):
+        # 文档字符串
+        '''
+        Takes a resort from the last dumped data instead of fetching it if it
+        was crawled within the freshness window, or if the request budget of
+        the freshness index is spent.
+        '''
+        # 方法实现
+        if task.stage != 'resort' or not self.freshness:
+            return None
+        poi_id = self.link_poi_id(task.url)
+        if poi_id in self.previous and self.freshness.is_fresh(poi_id):
+            logger.debug('>>>> skipping fresh resort %s.', task.url)
+            metrics.inc('fresh_skipped_total')
+            return [self.previous[poi_id]]
+        if self.budget is not None and self.freshness.get(poi_id) is not None:
+            # 请求预算用完后，爬取过的景点沿用上次的数据，不再请求
+            if self.budget <= 0:
+                metrics.inc('budget_skipped_total')
+                return [self.previous[poi_id]] if poi_id in self.previous else []
+            self.budget -= 1
+        return None
+
+
+    # 景点页面校验方法
+    def valid_resort(self, html):
+        # 文档字符串
+        '''
+        Checks a resort page has both its top row and its overview.
+
+        :Returns:
+         - a str of page's HTML, or None if the page is wrong.
+        '''
+        # 方法实现
+        test = etree.HTML(html.text).xpath(('//div[@class="row row-top" '
+                                            'or @data-anchor="overview"]'))
+        return html.text if len(test) == 2 else None
+
+
+    # 搜索页面校验方法
+    def valid_search(self, html):
+        # 文档字符串
+        '''
+        Checks a search page lists a full page of 15 results.
+
+        :Returns:
+         - a list of result link elements, or None if the page is wrong.
+        '''
+        # 方法实现
+        selector = etree.HTML(html.text)
+        elements = selector.xpath('//div[@class="att-list"]/ul/li/div/div[2]/h3/a')
+        logger.debug('>>> links count: %s', len(elements))
+        return elements if len(elements) == 15 else None
+
+
+    # 坐标接口校验方法
+    def valid_location(self, html):
+        # 文档字符串
+        '''
+        Checks a location API response holds the resort's coordinates.
+
+        :Returns:
+         - a dict of the resort's location data, or None if the response is
+           wrong.
+        '''
+        # 方法实现
+        try:
+            return html.json()['data']['controller_data']['poi']
+        except (KeyError, TypeError, ValueError):
+            return None
+
+
+    # 数据收集方法
+    def collect(self, item):
+        # 文档字符串
+        '''
+        Appends a resort's info data into the data list, the open export
+        writers, and the sink and the text index if there are.
+
+        :Args:
+         - item : a :class:`Resort` of resort's info data.
+        '''
+        # 方法实现
+        super(MafengwoSpider, self).collect(item)
+        if self.sink:
+            self.sink.put(dict(item))
+        if self.indexer:
+            self.indexer.put(item)
+
+
+    # 景点ID解析方法
+    @staticmethod
+    def link_poi_id(link):
+        # 文档字符串
+        '''
+        Extracts the poi id embedded in a resort's link, such as
+        http://www.mafengwo.cn/poi/1318.html.
+
+        :Args:
+         - link : a str of resort's link.
+
+        :Returns:
+         - an int of poi id, or None if the link contains no poi id.
+        '''
+        # 方法实现
+        match = re.search(r'/poi/(\d+)\.html', link)
+        return int(match[1]) if match else None
+
+
+    # 页面元数据方法
+    def page_meta(self, url):
+        # 文档字符串
+        '''
+        Describes a fetched Mafengwo page for the archive index.
+
+        :Args:
+         - url : a str of fetched page's url.
+
+        :Returns:
+         - a dict of page's `poi_id` and `kind`, kind is one of search,
+           resort and location.
+        '''
+        # 方法实现
+        parsed = urlparse(url)
+        if parsed.path.startswith('/search/'):
+            return {'poi_id': None, 'kind': 'search'}
+        if parsed.netloc == self.req_host['pagelet']:
+            try:
+                params = json.loads(parse_qs(parsed.query)['params'][0])
+                poi_id = int(params['poi_id'])
+            except (KeyError, IndexError, ValueError, TypeError):
+                poi_id = None
+            return {'poi_id': poi_id, 'kind': 'location'}
+        return {'poi_id': self.link_poi_id(url), 'kind': 'resort'}
 
 
     # HTTP请求头配置方法
@@ -259,7 +1155,7 @@ class MafengwoSpider(BaseSpider):
         # 方法实现
         # 可以使用python第三方库fake-useragent实现随机user-agent
         useragent = random.choice(USER_AGENTS)
-        print('> user agent:', useragent)
+        logger.debug('> user agent: %s', useragent)
         return {
             'Accept': ('text/html,application/xhtml+xml,application/xml;'
                        'q=0.9,image/webp,image/apng,*/*;q=0.8'),
@@ -271,67 +1167,30 @@ class MafengwoSpider(BaseSpider):
         }
 
 
-    # 获取所有景点链接方法
-    def get_links(self, pStart=1, pEnd=50):
+    # 搜索页面解析方法
+    def parse_search(self, elements):
         # 文档字符串
         '''
-        Fetches all resorts' links on Mafengwo website during given pages.
-
-        Uses xpath to parse fetched websites' HTML and iterates parsed HTML
-        elements, then updates the resorts' links container `self.links` if
-        element text contains resort type word.
+        Turns the result links of a search page whose text contains the
+        resort type word into resort tasks.
 
         :Args:
-         - pStart : An int of starting website page.
-         - pEnd : An int of ending website page.
+         - elements : a list of result link elements from `valid_search`.
         '''
-        # error counter variable
-        num = 1
         # 方法实现
-        for page in range(pStart, pEnd+1):
-            print(f'>>> Getting page {page}')
-            req_param = {'p': page, 'q': self.area_name}
-            html = self.request_html('GET', self.base_url, params=req_param,
-                                            timeout=TIMEOUT,
-                                            # proxies=self.config_proxy(),
-                                            headers=self.config_header('www'))
-            # time.sleep(random.randint(1,3))
-            # time.sleep(1)
-            if html:
-                while True:
-                    selector = etree.HTML(html.text)
-                    elements = selector.xpath('//div[@class="att-list"]/ul/li/div/div[2]/h3/a')
-                    print('>>> links count:', len(elements))
-                    if len(elements) == 15:
-                        print(f'>>> Success getting page {page}.')
-                        self.links.extend([e.get('href') for e in elements if '景点' in e.text])
-                        break
-                    # 走到这里的时候说明代理ip被禁了，换新ip重新请求一次
-                    # 相信代理ip池中一定有可靠ip，因此不会出现死循环
-                    self.proxyer.counter[self.proxy_url] -= PROXY_PUNISH
-                    print('>>> getting wrong page content. Retrise again!')
-                    html = self.request_html('GET', self.base_url, params=req_param,
-                                                    timeout=TIMEOUT,
-                                                    # proxies=self.config_proxy(),
-                                                    headers=self.config_header('www'))
-            else:
-                print(f'>>> Failure getting page {page}.')
-                # 防止网络不可靠情况下，爬虫一直运行下去：
-                if num == 1:
-                    num += 1
-                    lastPage = page
-                else:
-                    if page != lastPage + 1:
-                        num = 1
-                    elif num <= 10:
-                        num += 1
-                        lastPage = page
-                    else:
-                        raise ValueError('NetWork Unavailable!')
-        # print(self.links)
+        return [Task('resort', e.get('href'), None) for e in elements if '景点' in e.text]
+
+
+    # 景点页面解析方法
+    def parse_page(self, html):
+        item = self.parse_resort(html)
+        if item and self.freshness:
+            self.freshness.update(item['poi_id'], item['contentHash'])
+        return [item] if item else None
 
 
     # 解析景点数据方法
+    @profiled('parse_resort')
     def parse_resort(self, html):
         # 文档字符串
         '''
@@ -342,10 +1201,11 @@ class MafengwoSpider(BaseSpider):
          - html : a str of html source code of given resort.
 
         :Returns:
-         - item : a dict of parsed resort's info data.
+         - item : a :class:`Resort` of parsed resort's info data, or None if
+           the resort's coordinates can't be fetched.
         '''
         # 方法实现
-        print('>>> start parsing resort.')
+        logger.debug('>>> start parsing resort.')
         item = {
             'resortName': None,
             'poi_id': None,
@@ -367,56 +1227,128 @@ class MafengwoSpider(BaseSpider):
             'timeStamp': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
         }
 
-        row_top, overview = etree.HTML(html).xpath(('//div[@class="row row-top" '
-                                                    'or @data-anchor="overview"]'))
-
-        mod_detail = overview.xpath('//div[@class="mod mod-detail"]')
-        if len(mod_detail) == 1:
-            for dl in mod_detail[0].xpath('dl'):
-                dt, dd = dl
-                # transform keys and insert key-value pair into dict.
-                item[self.key_convert.get(dt.text)] = dd.xpath('string()').strip()
-
-            intro = mod_detail[0].xpath('div[@class="summary"]')
-            if len(intro) == 1:
-                item['introduction'] = intro[0].xpath('string()').strip()
-
-            base_info = mod_detail[0].xpath('ul[@class="baseinfo clearfix"]')
-            if len(base_info) == 1:
-                for li in base_info[0].xpath('li'):
-                    # print(li.get('class'))
-                    content = li.xpath('div[@class="content"]').pop()
-                    item[li.get('class').replace('-', '_')] = content.xpath('string()').strip()
-        # 后面可以改改
-        a = row_top.xpath('//div[@class="drop"]/span/a').pop()
-        item['resortName'] = row_top.xpath('//div[@class="title"]/h1/text()').pop()
-        item['areaName'] = a.text
-        item['areaId'] = int(re.search('(\d+)\.html', a.get('href'))[1])
-
-        mod_location = overview.xpath('div[@class="mod mod-location"]').pop()
-        poi = mod_location.xpath(('//div[contains(@data-api,"poiLocationApi")'
-                                  ']/@data-params')).pop()
-        while True:
-            try:
-                response = self.request_html('GET', self.location_api,
-                                             params={'params': poi},
-                                             timeout=TIMEOUT,
-                                             # proxies=self.config_proxy(),
-                                             headers=self.config_header('pagelet'))
-                apiData = response.json()['data']
-            except:
-                print('>> acquired location fail! Retries Again.')
-            else:
-                break
-        item['address'] = mod_location.xpath('//p[@class="sub"]/text()').pop()
-        item['poi_id'] = int(json.loads(poi)['poi_id'])
-        item['lat'] = apiData['controller_data']['poi']['lat']
-        item['lng'] = apiData['controller_data']['poi']['lng']
+        # 只统计页面解析耗时，坐标请求单独统计
+        with metrics.timer('stage_seconds', stage='parse'):
+            row_top, overview = etree.HTML(html).xpath(('//div[@class="row row-top" '
+                                                        'or @data-anchor="overview"]'))
+
+            mod_detail = overview.xpath('//div[@class="mod mod-detail"]')
+            if len(mod_detail) == 1:
+                for dl in mod_detail[0].xpath('dl'):
+                    dt, dd = dl
+                    # transform keys and insert key-value pair into dict.
+                    item[self.key_convert.get(dt.text)] = dd.xpath('string()').strip()
 
-        print('>>> end parsing resort.')
+                intro = mod_detail[0].xpath('div[@class="summary"]')
+                if len(intro) == 1:
+                    item['introduction'] = intro[0].xpath('string()').strip()
+
+                base_info = mod_detail[0].xpath('ul[@class="baseinfo clearfix"]')
+                if len(base_info) == 1:
+                    for li in base_info[0].xpath('li'):
+                        # print(li.get('class'))
+                        content = li.xpath('div[@class="content"]').pop()
+                        item[li.get('class').replace('-', '_')] = content.xpath('string()').strip()
+            # 后面可以改改
+            a = row_top.xpath('//div[@class="drop"]/span/a').pop()
+            item['resortName'] = row_top.xpath('//div[@class="title"]/h1/text()').pop()
+            item['areaName'] = a.text
+            item['areaId'] = int(re.search('(\d+)\.html', a.get('href'))[1])
+
+            mod_location = overview.xpath('div[@class="mod mod-location"]').pop()
+            poi = mod_location.xpath(('//div[contains(@data-api,"poiLocationApi")'
+                                      ']/@data-params')).pop()
+            item['address'] = mod_location.xpath('//p[@class="sub"]/text()').pop()
+            item['poi_id'] = int(json.loads(poi)['poi_id'])
+        location = self.get_location(item['poi_id'], poi)
+        if location is None:
+            logger.warning('>>> location of resort %s unavailable.', item['poi_id'])
+            return None
+        item['lat'], item['lng'] = location
+        item = Resort.from_dict(item)
+        item['contentHash'] = content_hash(item)
+
+        logger.debug('>>> end parsing resort.')
         return item
 
 
+    # 获取景点坐标方法
+    def get_location(self, poi_id, poi):
+        # 文档字符串
+        '''
+        Gets given resort's coordinates, from the location cache if it holds a
+        valid entry, otherwise from Mafengwo's location API.
+
+        :Args:
+         - poi_id : an int of resort's poi id.
+         - poi : a str of location API parameters embedded in resort's page.
+
+        :Returns:
+         - a tuple of (lat, lng), or None if the location API keeps failing.
+        '''
+        # 方法实现
+        if self.locations:
+            location = self.locations.get(poi_id)
+            if location:
+                logger.debug('>>> location cache hit: %s', poi_id)
+                metrics.inc('location_cache_total', result='hit')
+                return location
+            metrics.inc('location_cache_total', result='miss')
+        data = self.fetch_page('GET', self.location_api, self.valid_location,
+                               host_key='pagelet', params={'params': poi},
+                               expect=self.location_markers, hedge=True,
+                               timeout=TIMEOUT)
+        if not data:
+            logger.warning('>> Exceed maximum retry times of location: %s', poi_id)
+            return None
+        lat, lng = data['lat'], data['lng']
+        if self.locations:
+            self.locations.update(poi_id, lat, lng)
+        return lat, lng
+
+
+# 函数定义：
+def crawl_sites(jobs):
+    # 文档字符串
+    '''
+    Crawls several sites in one process through a single scheduler. The
+    spiders share the first one's proxy pool, pooled connections, circuit
+    breakers and retry budget, and their tasks are stepped round robin, so
+    all sites are throttled as one crawler. Give every spider its own
+    `file_name` so their dumps don't overwrite each other.
+
+    :Args:
+     - jobs : a list of (spider, args) tuples, args is a tuple passed to the
+       spider's `seeds`.
+
+    :Usage:
+        mafengwo = MafengwoSpider('海南')
+        other = OtherSiteSpider('海南')
+        other.file_name = 'HainanOtherResorts'
+        crawl_sites([(mafengwo, (1, 50)), (other, ())])
+    '''
+    # 方法实现
+    spiders = [spider for spider, _ in jobs]
+    for spider in spiders[1:]:
+        spider.share(spiders[0])
+    for spider in spiders:
+        spider.prepare()
+        spider.open_exports()
+    try:
+        queue = deque((spider, spider.tasks(*args)) for spider, args in jobs)
+        while queue:
+            spider, tasks = queue.popleft()
+            task = next(tasks, None)
+            # 任务取完或者爬虫要求停止时不再轮到它
+            if task is not None and spider.step(task):
+                queue.append((spider, tasks))
+    finally:
+        for spider in spiders:
+            spider.close_exports()
+    for spider in spiders:
+        spider.finish()
+
+
 # class MafengwoSpider(object):
 #     # 文档字符串
 #     '''
@@ -742,5 +1674,10 @@ class MafengwoSpider(BaseSpider):
 
 
 if __name__ == '__main__':
+    import metrics as exporter
+    from logger import setup_logging
+    setup_logging()
+    exporter.serve()
+    exporter.start_snapshots()
     spider = MafengwoSpider()
     spider.run()
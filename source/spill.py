@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Define a SpillList class, an append only list which keeps a bounded number of
+items in memory and spills the rest into a temporary file, and a SpillMap
+class, a mapping which keeps its values in a temporary file.
+'''
+
+# 导入模块：
+import json
+import tempfile
+
+from settings import SPILL_DIR
+
+
+# 全局变量：
+# 每次从溢出文件读取的字节数
+READ_CHUNK = 1 << 16
+
+
+# 类定义：
+class SpillList(object):
+    # 文档字符串
+    '''
+    SpillList class buffers appended items in memory, once `limit` items are
+    buffered they are serialized as lines into a temporary file and the buffer
+    starts over, so memory use stays bounded however many items are appended.
+    Iteration yields spilled items first, then buffered ones, in append order.
+
+    :Usage:
+        links = SpillList(100000)
+        links.extend(page_links)
+        for link in links:
+            ...
+
+    '''
+
+    # 初始化方法
+    def __init__(self, limit, dumps=json.dumps, loads=json.loads, folder=SPILL_DIR):
+        # 文档字符串
+        '''
+        Initialize a new instance of the SpillList.
+
+        :Args:
+         - limit : an int of items kept in memory, None never spills.
+         - dumps : a function serializing an item into a single line str.
+         - loads : a function restoring an item from its line.
+         - folder : a str of directory of the temporary file, defaults to the
+           system temporary directory.
+
+        '''
+        # 方法实现
+        self.limit = limit
+        self.dumps = dumps
+        self.loads = loads
+        self.folder = folder
+        self.buffer = list()
+        self.spilled = 0
+        self.file = None
+
+
+    def append(self, item):
+        self.buffer.append(item)
+        if self.limit is not None and len(self.buffer) >= self.limit:
+            self.spill()
+
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+
+    # 溢出写盘方法
+    def spill(self):
+        # 文档字符串
+        '''
+        Writes all buffered items into the temporary file.
+        '''
+        # 方法实现
+        if not self.buffer:
+            return
+        if self.file is None:
+            self.file = tempfile.TemporaryFile('w+b', dir=self.folder)
+        self.file.seek(0, 2)
+        self.file.write(''.join(self.dumps(item) + '\n'
+                                for item in self.buffer).encode('utf-8'))
+        self.spilled += len(self.buffer)
+        # 换成新列表而不是清空，正在进行的迭代不受影响
+        self.buffer = list()
+
+
+    def __iter__(self):
+        count, offset, buffer = self.spilled, 0, self.buffer
+        if count:
+            self.file.flush()
+        while count > 0:
+            self.file.seek(offset)
+            lines = self.file.readlines(READ_CHUNK)
+            offset = self.file.tell()
+            for line in lines[:count]:
+                yield self.loads(line.decode('utf-8'))
+            count -= len(lines)
+        yield from buffer
+
+
+    def __len__(self):
+        return self.spilled + len(self.buffer)
+
+
+    def close(self):
+        self.buffer = list()
+        self.spilled = 0
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+    def __del__(self):
+        self.close()
+
+
+class SpillMap(object):
+    # 文档字符串
+    '''
+    SpillMap class is a mapping which serializes every value as a line into a
+    temporary file and only keeps the keys and the values' offsets in memory,
+    for large lookups such as the records of the last crawl by poi id.
+
+    :Usage:
+        previous = SpillMap(dumps=dump_record, loads=load_resort)
+        previous.update((item['poi_id'], item) for item in records)
+        previous[1318]
+
+    '''
+
+    # 初始化方法
+    def __init__(self, dumps=json.dumps, loads=json.loads, folder=SPILL_DIR):
+        self.dumps = dumps
+        self.loads = loads
+        self.folder = folder
+        self.offsets = dict()
+        self.end = 0
+        self.file = None
+
+
+    def __setitem__(self, key, value):
+        if self.file is None:
+            self.file = tempfile.TemporaryFile('w+b', dir=self.folder)
+        line = (self.dumps(value) + '\n').encode('utf-8')
+        self.file.seek(self.end)
+        self.file.write(line)
+        # 重复的键指向最新写入的值
+        self.offsets[key] = self.end
+        self.end += len(line)
+
+
+    def update(self, pairs):
+        for key, value in pairs:
+            self[key] = value
+
+
+    def __getitem__(self, key):
+        self.file.seek(self.offsets[key])
+        return self.loads(self.file.readline().decode('utf-8'))
+
+
+    def __contains__(self, key):
+        return key in self.offsets
+
+
+    def __len__(self):
+        return len(self.offsets)
+
+
+    def close(self):
+        self.offsets = dict()
+        self.end = 0
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+    def __del__(self):
+        self.close()
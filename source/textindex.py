@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Defines a local full-text inverted index over resorts' text fields, which
+tokenizes Chinese text into character n-grams and ranks keyword queries with
+BM25, instead of `LIKE '%…%'` scans in the database.
+'''
+
+# 导入模块：
+import os
+import re
+import math
+import heapq
+import pickle
+import logging
+import argparse
+from collections import Counter
+
+from export import read_records
+from settings import save_path, file_name, TEXT_FIELDS, TEXT_NGRAM, \
+    BM25_K1, BM25_B
+
+
+# 全局变量：
+logger = logging.getLogger(__name__)
+# 连续的汉字，或者连续的字母数字
+TOKEN_PATTERN = re.compile(r'[㐀-鿿豈-﫿]+|[a-z0-9]+')
+INDEX_FILE = 'text_index.pkl'
+
+
+# 函数定义：
+def tokenize(text, ngram=TEXT_NGRAM, query=False):
+    # 文档字符串
+    '''
+    Splits text into index terms: latin words and numbers as a whole, and
+    Chinese runs as character n-grams of every size from 1 to `ngram`.
+
+    :Args:
+     - text : a str of text.
+     - ngram : an int of the longest n-gram.
+     - query : only keeps the longest n-grams of every run if True, so a
+       query matches its characters in order.
+
+    :Returns:
+     - a list of str terms.
+    '''
+    # 方法实现
+    terms = list()
+    for run in TOKEN_PATTERN.findall(text.lower()):
+        if run.isascii():
+            terms.append(run)
+            continue
+        sizes = [min(ngram, len(run))] if query else range(1, ngram + 1)
+        for size in sizes:
+            terms.extend(run[i:i+size] for i in range(len(run) - size + 1))
+    return terms
+
+
+# 类定义：
+class TextIndex(object):
+    # 文档字符串
+    '''
+    TextIndex class keeps an inverted index mapping every term to the poi ids
+    of resorts containing it and their term frequencies. Records are added or
+    replaced one by one, a record whose content hash didn't change is not
+    reindexed.
+
+    :Usage:
+        index = TextIndex.load()
+        spider = MafengwoSpider(indexer=index)
+        spider.run()
+        index.search('免费 开放')
+
+    '''
+
+    # 初始化方法
+    def __init__(self, fields=TEXT_FIELDS, ngram=TEXT_NGRAM, path=None):
+        # 文档字符串
+        '''
+        Initialize a new empty instance of the TextIndex.
+
+        :Args:
+         - fields : a sequence of indexed text field names.
+         - ngram : an int of the longest Chinese n-gram.
+         - path : a str of file path the index is saved to, defaults to
+           `INDEX_FILE` in `save_path`.
+
+        '''
+        # 方法实现
+        self.fields = tuple(fields)
+        self.ngram = ngram
+        self.path = path or os.path.join(save_path, INDEX_FILE)
+        # 词项 -> {poi_id: 词频}
+        self.postings = dict()
+        # poi_id -> (内容哈希, 文档长度, 词项元组)
+        self.docs = dict()
+        self.names = dict()
+        self.total = 0
+
+
+    @classmethod
+    def load(cls, path=None):
+        # 文档字符串
+        '''
+        Loads the index saved at `path`, or returns an empty index if there
+        is none.
+        '''
+        # 方法实现
+        index = cls(path=path)
+        if os.path.exists(index.path):
+            with open(index.path, 'rb') as file:
+                index.__dict__.update(pickle.load(file))
+        return index
+
+
+    def save(self):
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        # 只保存索引状态，先写临时文件再替换，避免中断时留下损坏的索引
+        state = {key: value for key, value in self.__dict__.items() if key != 'path'}
+        with open(self.path + '.tmp', 'wb') as file:
+            pickle.dump(state, file, pickle.HIGHEST_PROTOCOL)
+        os.replace(self.path + '.tmp', self.path)
+
+
+    def __len__(self):
+        return len(self.docs)
+
+
+    def __contains__(self, poi_id):
+        return poi_id in self.docs
+
+
+    # 记录索引方法
+    def add(self, item):
+        # 文档字符串
+        '''
+        Indexes a resort record, replacing its previous version.
+
+        :Args:
+         - item : a dict or :class:`Resort` of resort's info data.
+
+        :Returns:
+         - True if the record was (re)indexed, False if it was unchanged.
+        '''
+        # 方法实现
+        poi_id, digest = item['poi_id'], item.get('contentHash')
+        if digest and poi_id in self.docs and self.docs[poi_id][0] == digest:
+            return False
+        self.remove(poi_id)
+        text = '\n'.join(str(item.get(key) or '') for key in self.fields)
+        counts = Counter(tokenize(text, self.ngram))
+        for term, freq in counts.items():
+            self.postings.setdefault(term, dict())[poi_id] = freq
+        length = sum(counts.values())
+        self.docs[poi_id] = (digest, length, tuple(counts))
+        self.names[poi_id] = item.get('resortName')
+        self.total += length
+        return True
+
+
+    def remove(self, poi_id):
+        if poi_id not in self.docs:
+            return
+        _, length, terms = self.docs.pop(poi_id)
+        for term in terms:
+            posting = self.postings[term]
+            del posting[poi_id]
+            if not posting:
+                del self.postings[term]
+        self.names.pop(poi_id, None)
+        self.total -= length
+
+
+    def update(self, records, prune=False):
+        # 文档字符串
+        '''
+        Indexes a stream of records.
+
+        :Args:
+         - records : an iterable of resort records.
+         - prune : removes indexed resorts missing from `records` if True,
+           for `records` of a whole dataset.
+
+        :Returns:
+         - an int of records (re)indexed.
+        '''
+        # 方法实现
+        changed, seen = 0, set()
+        for item in records:
+            if item.get('poi_id') is None:
+                continue
+            seen.add(item['poi_id'])
+            changed += self.add(item)
+        if prune:
+            for poi_id in set(self.docs) - seen:
+                self.remove(poi_id)
+        return changed
+
+
+    # 收集接口，与SaverSink一致
+    def put(self, item):
+        self.add(item)
+
+
+    def flush(self):
+        self.save()
+
+
+    # 关键词检索方法
+    def search(self, query, k=10):
+        # 文档字符串
+        '''
+        Ranks indexed resorts against a keyword query with BM25.
+
+        :Args:
+         - query : a str of keywords.
+         - k : an int of results to return.
+
+        :Returns:
+         - a list of (poi_id, resortName, score) tuples, best first.
+        '''
+        # 方法实现
+        terms = set(tokenize(query, self.ngram, query=True))
+        if not terms or not self.docs:
+            return list()
+        count, avgdl = len(self.docs), self.total / len(self.docs)
+        scores = dict()
+        for term in terms:
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for poi_id, freq in posting.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.docs[poi_id][1] / avgdl)
+                scores[poi_id] = scores.get(poi_id, 0.0) + idf * freq * (BM25_K1 + 1) / (freq + norm)
+        best = heapq.nlargest(k, scores.items(), key=lambda pair: pair[1])
+        return [(poi_id, self.names.get(poi_id), score) for poi_id, score in best]
+
+
+# 函数定义：
+def build_index(name=file_name, fmt='json', path=None):
+    # 文档字符串
+    '''
+    Brings the saved index up to date with a dumped dataset, only records
+    whose content changed are reindexed and resorts no longer in the dataset
+    are removed.
+
+    :Returns:
+     - the updated :class:`TextIndex`.
+    '''
+    # 方法实现
+    index = TextIndex.load(path)
+    changed = index.update(read_records(os.path.join(save_path, name+'.'+fmt), fmt),
+                           prune=True)
+    index.save()
+    logger.info('>>> text index: %s resorts reindexed, %s resorts and %s terms in total.',
+                changed, len(index), len(index.postings))
+    return index
+
+
+# 测试代码：
+if __name__ == '__main__':
+    from logger import setup_logging
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('query', nargs='?', help='keywords to search, omit to build')
+    parser.add_argument('--name', default=file_name)
+    parser.add_argument('--fmt', default='json')
+    parser.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+    setup_logging()
+    if args.query:
+        for poi_id, name, score in TextIndex.load().search(args.query, args.k):
+            print(f'{score:8.3f}  {poi_id:<10} {name}')
+    else:
+        build_index(args.name, args.fmt)
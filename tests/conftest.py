@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Shared fixtures of the tests: puts `source` on the import path like running
+the scripts from there, and fakes the database drivers which are not needed
+to exercise the saver logic.
+'''
+
+# 导入模块：
+import os
+import sys
+import copy
+import types
+import threading
+
+import pytest
+
+
+# 全局变量：
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'source'))
+
+
+# 类定义：
+class FakeDatabase(object):
+    # 文档字符串
+    '''
+    FakeDatabase class is the shared state of a fake MySQL server, resort rows
+    by poi id and load versions by table name.
+    '''
+
+    def __init__(self):
+        self.rows = dict()
+        self.meta = dict()
+        self.lock = threading.Lock()
+
+
+class FakeConnection(object):
+    # 文档字符串
+    '''
+    FakeConnection class mimics a pymysql connection without autocommit under
+    InnoDB REPEATABLE READ: the first read of a transaction takes a snapshot,
+    later reads see it until the transaction ends by commit or rollback.
+    '''
+
+    def __init__(self, database):
+        self.database = database
+        self.snapshot = None
+
+
+    def view(self):
+        if self.snapshot is None:
+            with self.database.lock:
+                self.snapshot = copy.deepcopy({'rows': self.database.rows,
+                                               'meta': self.database.meta})
+        return self.snapshot
+
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+    def commit(self):
+        self.snapshot = None
+
+
+    def rollback(self):
+        self.snapshot = None
+
+
+    def close(self):
+        pass
+
+
+class FakeCursor(object):
+    # 文档字符串
+    '''
+    FakeCursor class understands the few statements the savers run.
+    '''
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.result = list()
+        self.description = None
+
+
+    def execute(self, sql, args=None):
+        sql = ' '.join(sql.split())
+        database = self.conn.database
+        if sql.startswith('SHOW COLUMNS'):
+            self.result = [('contentHash',)]
+        elif sql.startswith('INSERT INTO meta'):
+            with database.lock:
+                database.meta[args[0]] = args[1]
+        elif sql.startswith('SELECT loadVersion'):
+            meta = self.conn.view()['meta']
+            self.result = [(meta[args[0]],)] if args[0] in meta else []
+        elif sql.startswith('SELECT *'):
+            rows = [row for row in self.conn.view()['rows'].values()
+                    if row['poi_id'] == args[0]]
+            self.description = [(key,) for key in (rows[0] if rows else ())]
+            self.result = [tuple(row.values()) for row in rows]
+        elif sql.startswith('DELETE FROM') and args:
+            with database.lock:
+                for poi_id in args:
+                    database.rows.pop(poi_id, None)
+
+
+    def executemany(self, sql, data):
+        with self.conn.database.lock:
+            for row in data:
+                self.conn.database.rows[row['poi_id']] = dict(row)
+
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+
+    def fetchall(self):
+        return self.result
+
+
+# 测试夹具：
+@pytest.fixture
+def fake_mysql(monkeypatch):
+    database = FakeDatabase()
+    module = types.ModuleType('pymysql')
+    module.connect = lambda **kwargs: FakeConnection(database)
+    monkeypatch.setitem(sys.modules, 'pymysql', module)
+    return database
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Tests of the saver's concurrent writes recovering from a failed write.
+'''
+
+# 导入模块：
+import json
+import time
+import threading
+
+import pytest
+
+import database
+from database import MafengwoSaver
+
+
+# 测试代码：
+@pytest.fixture
+def saver(fake_mysql, tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'save_path', str(tmp_path))
+    records = [{'poi_id': i, 'resortName': f'景点{i}', 'contentHash': str(i)} for i in range(20)]
+    with open(tmp_path / 'resorts.json', 'w', encoding='utf-8') as file:
+        json.dump(records, file)
+    saver = MafengwoSaver('mysql', workers=2)
+    yield saver
+    saver.close()
+
+
+def test_submit_after_failed_write(saver, fake_mysql, monkeypatch):
+    write = saver.data_write
+    failures = [1]
+
+    def flaky_write(data):
+        if failures[0]:
+            failures[0] -= 1
+            raise RuntimeError('boom')
+        write(data)
+    monkeypatch.setattr(saver, 'data_write', flaky_write)
+
+    with pytest.raises(RuntimeError, match='boom'):
+        saver.data_save('resorts', batch_size=1)
+    # 失败的写入不能影响之后的写入
+    assert saver.error is None
+    assert saver.pending == []
+    assert saver.submit(lambda: 'ok').result() == 'ok'
+    saver.drain()
+    saver.data_save('resorts', batch_size=1)
+    assert len(fake_mysql.rows) == 20
+
+
+def test_failed_load_stops_prefetch_thread(saver, monkeypatch):
+    def failing_write(data):
+        raise RuntimeError('boom')
+    monkeypatch.setattr(saver, 'data_write', failing_write)
+
+    with pytest.raises(RuntimeError):
+        saver.data_save('resorts', batch_size=1)
+    deadline = time.time() + 2
+    while time.time() < deadline and any(t.name == 'prefetch' for t in threading.enumerate()):
+        time.sleep(0.05)
+    assert not any(t.name == 'prefetch' for t in threading.enumerate())
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Tests of the cached read API invalidating on writes of other processes.
+'''
+
+# 导入模块：
+import types
+
+import query
+from database import MafengwoSaver
+from query import ResortQuery
+
+
+# 测试代码：
+def test_query_sees_version_written_by_another_saver(fake_mysql):
+    # 两个存储器各有自己的连接，相当于读进程和写进程
+    writer, reader = MafengwoSaver('mysql', workers=1), MafengwoSaver('mysql', workers=1)
+    try:
+        query = ResortQuery(reader, interval=0)
+        assert query.by_poi(1318) is None
+        writer.data_write([{'poi_id': 1318, 'resortName': '亚龙湾', 'contentHash': 'x'}])
+        assert query.by_poi(1318)['resortName'] == '亚龙湾'
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_query_keeps_cache_until_interval(fake_mysql, monkeypatch):
+    writer, reader = MafengwoSaver('mysql', workers=1), MafengwoSaver('mysql', workers=1)
+    clock = [1000.0]
+    monkeypatch.setattr(query, 'time', types.SimpleNamespace(time=lambda: clock[0]))
+    try:
+        cached = ResortQuery(reader, interval=5)
+        assert cached.by_poi(1318) is None
+        writer.data_write([{'poi_id': 1318, 'resortName': '亚龙湾', 'contentHash': 'x'}])
+        clock[0] += 1
+        assert cached.by_poi(1318) is None
+        clock[0] += 5
+        assert cached.by_poi(1318)['resortName'] == '亚龙湾'
+    finally:
+        writer.close()
+        reader.close()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Tests of the circuit breaker state machine with a fake clock.
+'''
+
+# 导入模块：
+from retry import CircuitBreaker, BreakerBoard
+
+
+# 测试代码：
+def test_breaker_opens_and_half_opens_after_cooldown():
+    breaker = CircuitBreaker(threshold=2, cooldown=10)
+    breaker.failure(now=0)
+    assert breaker.available(now=0)
+    breaker.failure(now=0)
+    assert not breaker.available(now=5)
+    assert breaker.remaining(now=5) == 5
+    # 冷却结束后只放行一次试探请求
+    assert breaker.acquire(now=10)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.acquire(now=11)
+
+
+def test_half_open_trial_outcomes():
+    breaker = CircuitBreaker(threshold=1, cooldown=10)
+    breaker.failure(now=0)
+    assert breaker.acquire(now=10)
+    breaker.failure(now=12)
+    assert not breaker.available(now=15)
+    assert breaker.acquire(now=22)
+    breaker.success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_abandoned_half_open_trial_is_given_back():
+    breaker = CircuitBreaker(threshold=1, cooldown=10)
+    breaker.failure(now=0)
+    assert breaker.acquire(now=10)
+    # 试探请求被放弃时既没有成功也没有失败，不能一直停留在半开状态
+    assert not breaker.available(now=100)
+    assert breaker.remaining(now=100) == 0
+    breaker.release()
+    assert breaker.available(now=100)
+    assert breaker.acquire(now=100)
+
+
+def test_board_release_ignores_closed_and_unknown_keys():
+    board = BreakerBoard(threshold=1, cooldown=0)
+    board.release('unknown')
+    board.get('closed')
+    board.release('closed')
+    assert board.available('closed')
+    board.failure('trial')
+    assert board.acquire('trial')
+    assert not board.available('trial')
+    board.release('trial')
+    assert board.available('trial')
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 模块字符串
+'''
+Tests of BaseSpider's hedged requests keeping the proxies' breakers usable.
+'''
+
+# 导入模块：
+import types
+import threading
+
+from retry import BreakerBoard
+from spider import BaseSpider
+
+
+# 测试代码：
+def test_abandoned_hedge_gives_back_half_open_trial():
+    spider = BaseSpider()
+    breakers = BreakerBoard(threshold=1, cooldown=0)
+    spider._proxyer = types.SimpleNamespace(breakers=breakers, counter={'a': 1, 'b': 1},
+                                            pop_proxy=lambda exclude=None: 'b')
+    spider.latency.hedge_delay = lambda: 0.01
+    spider.request_done = lambda url, proxy, response, elapsed: proxy
+    slow = threading.Event()
+
+    def transfer(session, method, url, proxy, expect=(), **kwargs):
+        if proxy == 'a':
+            slow.wait(5)
+        return object(), 0.0
+    spider.transfer = transfer
+
+    # 代理a的熔断器冷却结束后放行一次试探请求
+    breakers.failure('a')
+    assert breakers.acquire('a')
+    assert not breakers.available('a')
+    try:
+        assert spider.hedged_request('GET', 'http://www.mafengwo.cn/', 'a') == 'b'
+        assert breakers.available('a')
+    finally:
+        slow.set()
+        spider.hedge_pool.shutdown(wait=True)